@@ -0,0 +1,72 @@
+# app/adapters/call_metrics.py
+
+"""
+Per-node accounting of adapter calls.
+
+The graph's node wrapper opens a NodeCalls scope (a context variable) for
+the duration of a node; every adapter call made inside it is counted
+there, along with the tokens it used and the time spent waiting on it.
+Cache hits are counted apart from the calls that reached the API, and a
+cacheable call that missed counts as both a call and a cache miss.
+Outside a scope recording is a no-op.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+
+class NodeCalls:
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.adapter_seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "adapter_calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "adapter_seconds": round(self.adapter_seconds, 6),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+_current: ContextVar[Optional[NodeCalls]] = ContextVar("node_calls", default=None)
+
+
+@contextmanager
+def node_scope() -> Iterator[NodeCalls]:
+    calls = NodeCalls()
+    token = _current.set(calls)
+    try:
+        yield calls
+    finally:
+        _current.reset(token)
+
+
+def record_call(usage=None, cached: bool = False, seconds: float = 0.0, cacheable: bool = False):
+    """
+    Counts one adapter call in the current node scope. `cached` marks a
+    response served from the cache (no API call); `cacheable` marks an API
+    call made after a cache miss. `usage` is the SDK usage object
+    (input_tokens/output_tokens), if the call has one; `seconds` is the
+    time spent waiting on the API.
+    """
+    calls = _current.get()
+    if calls is None:
+        return
+    if cached:
+        calls.cache_hits += 1
+        return
+    calls.calls += 1
+    calls.adapter_seconds += seconds
+    if cacheable:
+        calls.cache_misses += 1
+    if usage is not None:
+        calls.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        calls.output_tokens += getattr(usage, "output_tokens", 0) or 0
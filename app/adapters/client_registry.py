@@ -0,0 +1,243 @@
+# app/adapters/client_registry.py
+
+import logging
+import os
+import threading
+from importlib.util import find_spec
+from typing import Any, Dict, Optional
+
+from openai import AsyncOpenAI, OpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient
+from pydantic import BaseModel
+
+try:  # openai>=3 runs on httpx2; earlier releases on httpx
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+class PoolConfig(BaseModel):
+    """
+    Keep-alive pool + timeout settings shared by every OpenAI client in
+    the process. Each field can be overridden through an OPENAI_POOL_* /
+    OPENAI_*_TIMEOUT environment variable.
+    """
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        defaults = cls()
+        return cls(
+            max_connections=int(os.getenv("OPENAI_POOL_MAX_CONNECTIONS", defaults.max_connections)),
+            max_keepalive_connections=int(
+                os.getenv("OPENAI_POOL_MAX_KEEPALIVE", defaults.max_keepalive_connections)
+            ),
+            keepalive_expiry=float(os.getenv("OPENAI_POOL_KEEPALIVE_EXPIRY", defaults.keepalive_expiry)),
+            http2=_env_bool("OPENAI_HTTP2", defaults.http2),
+            connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", defaults.connect_timeout)),
+            read_timeout=float(os.getenv("OPENAI_READ_TIMEOUT", defaults.read_timeout)),
+            write_timeout=float(os.getenv("OPENAI_WRITE_TIMEOUT", defaults.write_timeout)),
+            pool_timeout=float(os.getenv("OPENAI_POOL_TIMEOUT", defaults.pool_timeout)),
+        )
+
+    def limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self):
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+class _PoolCounters:
+    """
+    Request-level counters shared by the sync and async transports.
+    A request "waits" when it starts while every connection slot is taken.
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.requests = 0
+        self.waits = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.in_flight >= self.max_connections:
+                self.waits += 1
+            self.in_flight += 1
+            self.requests += 1
+
+    def finish(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class _InstrumentedTransport(httpx.HTTPTransport):
+    def __init__(self, counters: _PoolCounters, **kwargs):
+        super().__init__(**kwargs)
+        self.counters = counters
+
+    def handle_request(self, request):
+        self.counters.start()
+        try:
+            return super().handle_request(request)
+        finally:
+            self.counters.finish()
+
+    def connection_states(self):
+        return [conn.is_idle() for conn in self._pool.connections]
+
+
+class _AsyncInstrumentedTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, counters: _PoolCounters, **kwargs):
+        super().__init__(**kwargs)
+        self.counters = counters
+
+    async def handle_async_request(self, request):
+        self.counters.start()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            self.counters.finish()
+
+    def connection_states(self):
+        return [conn.is_idle() for conn in self._pool.connections]
+
+
+class ClientRegistry:
+    """
+    Process-wide owner of the OpenAI clients.
+
+    All adapters draw from the same sync/async client pair, so a graph run
+    reuses warm TLS connections instead of opening one pool per service.
+    Clients are built on first request.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        self.config = config or PoolConfig.from_env()
+        self.counters = _PoolCounters(self.config.max_connections)
+
+        self._lock = threading.Lock()
+        self._transport = None
+        self._async_transport = None
+        self._client: Optional[OpenAI] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+
+    def _http2_enabled(self) -> bool:
+        if self.config.http2 and find_spec("h2") is None:
+            logger.warning("OPENAI_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1")
+            return False
+        return self.config.http2
+
+    def _transport_kwargs(self) -> Dict[str, Any]:
+        return {"limits": self.config.limits(), "http2": self._http2_enabled()}
+
+    def openai_client(self) -> OpenAI:
+        with self._lock:
+            if self._client is None:
+                self._transport = _InstrumentedTransport(self.counters, **self._transport_kwargs())
+                self._client = OpenAI(
+                    http_client=DefaultHttpxClient(
+                        transport=self._transport,
+                        timeout=self.config.timeout(),
+                    ),
+                    timeout=self.config.timeout(),
+                    max_retries=0,  # CallPolicy owns retries
+                )
+            return self._client
+
+    def async_openai_client(self) -> AsyncOpenAI:
+        with self._lock:
+            if self._async_client is None:
+                self._async_transport = _AsyncInstrumentedTransport(
+                    self.counters, **self._transport_kwargs()
+                )
+                self._async_client = AsyncOpenAI(
+                    http_client=DefaultAsyncHttpxClient(
+                        transport=self._async_transport,
+                        timeout=self.config.timeout(),
+                    ),
+                    timeout=self.config.timeout(),
+                    max_retries=0,
+                )
+            return self._async_client
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Snapshot for monitoring: open connections split into in-use/idle,
+        plus request-level in-flight, total and wait counters.
+        """
+        idle_flags = []
+        for transport in (self._transport, self._async_transport):
+            if transport is not None:
+                idle_flags.extend(transport.connection_states())
+
+        idle = sum(1 for is_idle in idle_flags if is_idle)
+
+        return {
+            "max_connections": self.config.max_connections,
+            "max_keepalive_connections": self.config.max_keepalive_connections,
+            "keepalive_expiry": self.config.keepalive_expiry,
+            "http2": self.config.http2,
+            "connections_in_use": len(idle_flags) - idle,
+            "connections_idle": idle,
+            "requests_in_flight": self.counters.in_flight,
+            "requests_total": self.counters.requests,
+            "requests_waited": self.counters.waits,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+            self._transport = None
+
+    async def aclose(self):
+        client = self._async_client
+        with self._lock:
+            self._async_client = None
+            self._async_transport = None
+        if client is not None:
+            await client.close()
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    """
+    Returns the process-wide registry, creating it from the environment
+    on first call.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+        return _registry
@@ -0,0 +1,37 @@
+# app/adapters/histogram.py
+
+import bisect
+import threading
+from typing import Any, Dict, Sequence
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, thread-safe.
+
+    Buckets are upper bounds; `snapshot` reports cumulative counts per
+    bound (Prometheus style, with a final "+Inf" bucket) plus count and sum.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative, running = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running += count
+            cumulative[bound] = running
+        return {"buckets": cumulative, "count": running, "sum": round(total, 6)}
@@ -0,0 +1,218 @@
+# app/adapters/moderation_batcher.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from openai import OpenAI
+from pydantic import BaseModel
+
+from app.adapters.client_registry import get_registry
+from app.adapters.histogram import Histogram
+from app.adapters.resilience import get_call_policy
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+_STOP = object()
+
+
+class BatcherConfig(BaseModel):
+    """
+    Moderation micro-batching settings, overridable via MODERATION_BATCH_*
+    env vars.
+    """
+    enabled: bool = True
+    max_batch_size: int = 32
+    max_wait_ms: float = 5.0
+    max_in_flight: int = 4  # concurrent moderation calls
+
+    @classmethod
+    def from_env(cls) -> "BatcherConfig":
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("MODERATION_BATCH_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on"),
+            max_batch_size=int(os.getenv("MODERATION_BATCH_MAX_SIZE", defaults.max_batch_size)),
+            max_wait_ms=float(os.getenv("MODERATION_BATCH_MAX_WAIT_MS", defaults.max_wait_ms)),
+            max_in_flight=int(os.getenv("MODERATION_BATCH_MAX_IN_FLIGHT", defaults.max_in_flight)),
+        )
+
+
+class ModerationBatcher:
+    """
+    Collects moderation requests from every in-flight graph run and sends
+    them as one list-input moderation call.
+
+    A collector thread takes the first pending text, then keeps gathering
+    until the batch is full or `max_wait_ms` has passed since that first
+    text arrived. The batch is dispatched on a small pool (so a slow call
+    doesn't stall the next batch) and each caller's Future receives its
+    own entry of `results`. A failed call fails every Future in its batch.
+
+    Sync callers block on the Future; async callers await it with
+    asyncio.wrap_future.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        client_factory: Optional[Callable[[], OpenAI]] = None,
+        config: Optional[BatcherConfig] = None,
+    ):
+        self.model = model
+        self.config = config or BatcherConfig.from_env()
+        self._client_factory = client_factory or (lambda: get_registry().openai_client())
+        self._client: Optional[OpenAI] = None
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.config.max_in_flight, thread_name_prefix="moderation"
+                )
+                self._thread = threading.Thread(
+                    target=self._run, name="moderation-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queues `text` for the next batch; the Future resolves to its
+        moderation result (same object as `results[i]` of a direct call).
+        """
+        self._start()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def close(self):
+        """
+        Stops the collector and waits for batches in flight. Texts still
+        queued behind the stop (submitted while closing) fail right away
+        instead of leaving their callers to time out.
+        """
+        with self._lock:
+            thread, pool = self._thread, self._pool
+            self._thread = self._pool = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and not item[1].done():
+                item[1].set_exception(RuntimeError("moderation batcher closed"))
+
+    # ---------------------------------------------------------
+    # Collector thread
+    # ---------------------------------------------------------
+    def _run(self):
+        max_wait = self.config.max_wait_ms / 1000
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            deadline = first[2] + max_wait
+            stop = False
+            while len(batch) < self.config.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._pool.submit(self._dispatch, batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: List[Tuple[str, Future, float]]):
+        flushed = time.perf_counter()
+        for _, _, queued in batch:
+            self.wait_ms.observe((flushed - queued) * 1000)
+        self.batch_sizes.observe(len(batch))
+        with self._lock:
+            self.calls += 1
+
+        try:
+            texts = [text for text, _, _ in batch]
+            resp = get_call_policy().call(
+                "moderations.batch",
+                lambda timeout: self.client.moderations.create(
+                    model=self.model,
+                    input=texts,
+                    timeout=timeout,
+                ),
+            )
+            results = resp.results
+            if len(results) != len(batch):
+                raise RuntimeError(f"moderation returned {len(results)} results for {len(batch)} inputs")
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.config.enabled,
+            "max_batch_size": self.config.max_batch_size,
+            "max_wait_ms": self.config.max_wait_ms,
+            "pending": self._queue.qsize(),
+            "calls": self.calls,
+            "errors": self.errors,
+            "batch_size": self.batch_sizes.snapshot(),
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+_batcher: Optional[ModerationBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_moderation_batcher(model: str) -> Optional[ModerationBatcher]:
+    """
+    Returns the process-wide batcher on the registry's client, or None
+    when MODERATION_BATCH_ENABLED is off.
+    """
+    global _batcher
+    config = BatcherConfig.from_env()
+    if not config.enabled:
+        return None
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = ModerationBatcher(model, config=config)
+        return _batcher
@@ -1,43 +1,459 @@
 # app/adapters/openai_adapter.py
 
-from dotenv import load_dotenv
-from openai import OpenAI
+import asyncio
+import concurrent.futures
+import json
+import time
+from typing import Any, Callable, Dict, Optional
 
-load_dotenv()
+from openai import AsyncOpenAI, OpenAI
+from openai.types import Moderation
+from openai.types.responses import ResponseUsage
+
+from app.adapters.call_metrics import record_call
+from app.adapters.client_registry import get_registry
+from app.adapters.moderation_batcher import ModerationBatcher, get_moderation_batcher
+from app.adapters.rate_limiter import RateLimitScheduler, get_rate_limiter
+from app.adapters.resilience import CallPolicy, DeadlineExceeded, get_call_policy, remaining
+from app.adapters.response_cache import ResponseCache, cache_key, get_response_cache
+
+MODERATION_MODEL = "omni-moderation-latest"
+
+
+# Cached values are stored as plain JSON; these rebuild the SDK objects
+# so a cache hit looks exactly like a live response to the services.
+def _dump_generation(result: Dict[str, Any]) -> Dict[str, Any]:
+    usage = result["usage"]
+    return {"text": result["text"], "usage": usage.model_dump(mode="json") if usage else None}
+
+
+def _load_generation(value: Dict[str, Any]) -> Dict[str, Any]:
+    usage = value["usage"]
+    return {
+        "text": value["text"],
+        "usage": ResponseUsage.model_construct(**usage) if usage else None,
+    }
+
+
+def _json_format(schema: Dict[str, Any], name: str) -> Dict[str, Any]:
+    return {"format": {"type": "json_schema", "name": name, "schema": schema, "strict": True}}
+
+
+def _json_payload(prompt: str, schema: Dict[str, Any]) -> str:
+    # the schema is part of the request, so it is part of the cache key
+    return json.dumps([prompt, schema], sort_keys=True)
+
+
+def _batch_timeout() -> Optional[float]:
+    # a batched caller waits at most until its run's deadline
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("run deadline passed")
+    return left
+
+
+def _dump_moderation(result) -> Dict[str, Any]:
+    return result.model_dump(mode="json", by_alias=True)
+
+
+def _load_moderation(value: Dict[str, Any]):
+    return Moderation.model_construct(**value)
 
 
 class OpenAIAdapter:
     """
     Thin wrapper around the OpenAI client.
     For now, only text generation is exposed.
+
+    Without an explicit client it uses the process-wide one from the
+    client registry, so every adapter shares a single connection pool.
+
+    Calls made with use_cache=True go through the response cache, keyed on
+    model + full prompt. Only pure evaluator calls should opt in.
+
+    On the shared client, moderation cache misses go through the
+    process-wide ModerationBatcher, which folds concurrent calls into one
+    list-input request. An explicit client is called directly unless a
+    batcher is passed too.
+
+    Network calls run under a CallPolicy: per-attempt timeouts bounded by
+    the run's deadline, jittered backoff on 429/5xx and, for idempotent
+    evaluator calls, optional hedging.
+
+    Responses API calls on the shared client also queue on the process-wide
+    RateLimitScheduler (RPM + TPM buckets, served by the priority of the
+    node making the call).
     """
 
-    def __init__(self, model: str = "gpt-4o-mini"):
-        self.client = OpenAI()
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        client: Optional[OpenAI] = None,
+        cache: Optional[ResponseCache] = None,
+        batcher: Optional[ModerationBatcher] = None,
+        policy: Optional[CallPolicy] = None,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+    ):
+        self.batcher = batcher or (None if client else get_moderation_batcher(MODERATION_MODEL))
+        self.rate_limiter = rate_limiter or (None if client else get_rate_limiter())
+        self._client = client
         self.model = model
+        self.cache = cache or get_response_cache()
+        self.policy = policy or get_call_policy()
 
-    def generate_text(self, prompt: str):
+    @property
+    def client(self) -> OpenAI:
+        # fetched on first call, so building services doesn't need an API key
+        if self._client is None:
+            self._client = get_registry().openai_client()
+        return self._client
+
+    def _key(self, kind: str, model: str, payload: str) -> str:
+        return cache_key(kind, model, payload, str(self.client.base_url))
+
+    def _reserve(self, prompt: str) -> int:
+        return self.rate_limiter.estimate(prompt) if self.rate_limiter else 0
+
+    def _limited(self, reserved: int, fn):
+        """
+        One attempt that first waits for its share of the account's RPM/TPM,
+        then settles it against the response's usage. A failed attempt is
+        refunded, so retries and hedges don't keep the tokens reserved.
+        """
+        if self.rate_limiter is None:
+            return fn
+
+        def attempt(timeout):
+            self.rate_limiter.acquire(reserved)
+            try:
+                response = fn(timeout)
+            except BaseException:
+                self.rate_limiter.settle(reserved, 0)
+                raise
+            self._settle(reserved, response.usage)
+            return response
+        return attempt
+
+    def _settle(self, reserved: int, usage):
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(reserved, getattr(usage, "total_tokens", None))
+
+    def generate_text(self, prompt: str, use_cache: bool = False):
         """
         Equivalent to the client.responses.create(...) call in llm_generate_node.
         Returns text and the raw usage object so cost calculation stays identical.
         """
-        response = self.client.responses.create(
-            model=self.model,
-            input=prompt,
+        key = self._key("responses", self.model, prompt) if use_cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                record_call(cached=True)
+                return _load_generation(cached)
+
+        started = time.perf_counter()
+        reserved = self._reserve(prompt)
+        response = self.policy.call(
+            "responses",
+            self._limited(reserved, lambda timeout: self.client.responses.create(
+                model=self.model,
+                input=prompt,
+                timeout=timeout,
+            )),
+            hedge=use_cache,  # only evaluator calls are safe to duplicate
         )
 
-        return {
+        result = {
             "text": response.output_text,
             "usage": response.usage,  # same shape as in your current nodes.py
         }
+        record_call(result["usage"], seconds=time.perf_counter() - started, cacheable=key is not None)
+        if key:
+            self.cache.set(key, _dump_generation(result))
+        return result
 
-    def moderate_text(self, text: str):
+    def generate_json(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        name: str = "result",
+        use_cache: bool = False,
+    ):
+        """
+        Structured-output generation: the response is constrained to the
+        given JSON schema. Returns the same {text, usage} dict as
+        generate_text; callers parse the JSON themselves.
+        """
+        key = self._key("responses.json", self.model, _json_payload(prompt, schema)) if use_cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                record_call(cached=True)
+                return _load_generation(cached)
+
+        started = time.perf_counter()
+        reserved = self._reserve(prompt)
+        response = self.policy.call(
+            "responses.json",
+            self._limited(reserved, lambda timeout: self.client.responses.create(
+                model=self.model,
+                input=prompt,
+                text=_json_format(schema, name),
+                timeout=timeout,
+            )),
+            hedge=True,
+        )
+
+        result = {
+            "text": response.output_text,
+            "usage": response.usage,
+        }
+        record_call(result["usage"], seconds=time.perf_counter() - started, cacheable=key is not None)
+        if key:
+            self.cache.set(key, _dump_generation(result))
+        return result
+
+    def moderate_text(self, text: str, use_cache: bool = False):
         """
         Calls the OpenAI moderation endpoint.
         Returns an object with .category_scores, matching the original API.
         """
-        resp = self.client.moderations.create(
-            model="omni-moderation-latest",
-            input=text
+        key = self._key("moderations", MODERATION_MODEL, text) if use_cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                record_call(cached=True)
+                return _load_moderation(cached)
+
+        started = time.perf_counter()
+        if self.batcher is not None:
+            try:
+                result = self.batcher.submit(text).result(timeout=_batch_timeout())
+            except concurrent.futures.TimeoutError:
+                raise DeadlineExceeded("run deadline passed while waiting on moderation") from None
+        else:
+            resp = self.policy.call(
+                "moderations",
+                lambda timeout: self.client.moderations.create(
+                    model=MODERATION_MODEL,
+                    input=text,
+                    timeout=timeout,
+                ),
+                hedge=True,
+            )
+            result = resp.results[0]
+        record_call(seconds=time.perf_counter() - started, cacheable=key is not None)
+        if key:
+            self.cache.set(key, _dump_moderation(result))
+        return result
+
+
+class AsyncOpenAIAdapter:
+    """
+    Same surface as OpenAIAdapter, built on AsyncOpenAI so graph nodes can
+    await network calls instead of holding a worker thread.
+
+    The shared registry client is fetched on first use: every service gets
+    one of these by default, and sync-only callers should never pay for it.
+
+    Moderation batching, rate limiting and the call policy work as in
+    OpenAIAdapter; batched calls are awaited without blocking the event
+    loop, and a losing hedge is cancelled.
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        client: Optional[AsyncOpenAI] = None,
+        cache: Optional[ResponseCache] = None,
+        batcher: Optional[ModerationBatcher] = None,
+        policy: Optional[CallPolicy] = None,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+    ):
+        self._client = client
+        self.model = model
+        self.cache = cache or get_response_cache()
+        self.batcher = batcher or (None if client else get_moderation_batcher(MODERATION_MODEL))
+        self.rate_limiter = rate_limiter or (None if client else get_rate_limiter())
+        self.policy = policy or get_call_policy()
+
+    def _reserve(self, prompt: str) -> int:
+        return self.rate_limiter.estimate(prompt) if self.rate_limiter else 0
+
+    def _limited(self, reserved: int, afn, settle: bool = True):
+        """
+        Async counterpart of OpenAIAdapter._limited. With settle off the
+        caller settles a successful attempt itself (a stream's usage only
+        arrives at its end); failed or cancelled attempts are always refunded.
+        """
+        if self.rate_limiter is None:
+            return afn
+
+        async def attempt(timeout):
+            await self.rate_limiter.aacquire(reserved)
+            try:
+                response = await afn(timeout)
+            except BaseException:
+                self.rate_limiter.settle(reserved, 0)
+                raise
+            if settle:
+                self._settle(reserved, response.usage)
+            return response
+        return attempt
+
+    def _settle(self, reserved: int, usage):
+        if self.rate_limiter is not None:
+            self.rate_limiter.settle(reserved, getattr(usage, "total_tokens", None))
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = get_registry().async_openai_client()
+        return self._client
+
+    def _key(self, kind: str, model: str, payload: str) -> str:
+        return cache_key(kind, model, payload, str(self.client.base_url))
+
+    async def generate_text(self, prompt: str, use_cache: bool = False):
+        """
+        Async counterpart of OpenAIAdapter.generate_text.
+        """
+        key = self._key("responses", self.model, prompt) if use_cache else None
+        if key:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                record_call(cached=True)
+                return _load_generation(cached)
+
+        started = time.perf_counter()
+        reserved = self._reserve(prompt)
+        response = await self.policy.acall(
+            "responses",
+            self._limited(reserved, lambda timeout: self.client.responses.create(
+                model=self.model,
+                input=prompt,
+                timeout=timeout,
+            )),
+            hedge=use_cache,
         )
-        return resp.results[0]
\ No newline at end of file
+
+        result = {
+            "text": response.output_text,
+            "usage": response.usage,
+        }
+        record_call(result["usage"], seconds=time.perf_counter() - started, cacheable=key is not None)
+        if key:
+            await self.cache.aset(key, _dump_generation(result))
+        return result
+
+    async def generate_json(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        name: str = "result",
+        use_cache: bool = False,
+    ):
+        """
+        Async counterpart of OpenAIAdapter.generate_json.
+        """
+        key = self._key("responses.json", self.model, _json_payload(prompt, schema)) if use_cache else None
+        if key:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                record_call(cached=True)
+                return _load_generation(cached)
+
+        started = time.perf_counter()
+        reserved = self._reserve(prompt)
+        response = await self.policy.acall(
+            "responses.json",
+            self._limited(reserved, lambda timeout: self.client.responses.create(
+                model=self.model,
+                input=prompt,
+                text=_json_format(schema, name),
+                timeout=timeout,
+            )),
+            hedge=True,
+        )
+
+        result = {
+            "text": response.output_text,
+            "usage": response.usage,
+        }
+        record_call(result["usage"], seconds=time.perf_counter() - started, cacheable=key is not None)
+        if key:
+            await self.cache.aset(key, _dump_generation(result))
+        return result
+
+    async def stream_text(self, prompt: str, on_delta: Callable[[str], None]):
+        """
+        Streams a generation from the Responses API, calling on_delta with
+        each text fragment as it arrives. Returns the same {text, usage}
+        dict as generate_text once the response completes.
+
+        Only opening the stream is retried; once fragments have been
+        forwarded the call can't be replayed.
+        """
+        started = time.perf_counter()
+        reserved = self._reserve(prompt)
+        stream = await self.policy.acall(
+            "responses.stream",
+            self._limited(reserved, lambda timeout: self.client.responses.create(
+                model=self.model,
+                input=prompt,
+                stream=True,
+                timeout=timeout,
+            ), settle=False),
+        )
+
+        chunks = []
+        usage = None
+        try:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    chunks.append(event.delta)
+                    on_delta(event.delta)
+                elif event.type == "response.completed":
+                    usage = event.response.usage
+        finally:
+            # a stream cut short keeps its estimate: some tokens were spent
+            self._settle(reserved, usage)
+        record_call(usage, seconds=time.perf_counter() - started)
+        return {
+            "text": "".join(chunks),
+            "usage": usage,
+        }
+
+    async def moderate_text(self, text: str, use_cache: bool = False):
+        """
+        Async counterpart of OpenAIAdapter.moderate_text.
+        """
+        key = self._key("moderations", MODERATION_MODEL, text) if use_cache else None
+        if key:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                record_call(cached=True)
+                return _load_moderation(cached)
+
+        started = time.perf_counter()
+        if self.batcher is not None:
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.wrap_future(self.batcher.submit(text)), timeout=_batch_timeout()
+                )
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("run deadline passed while waiting on moderation") from None
+        else:
+            resp = await self.policy.acall(
+                "moderations",
+                lambda timeout: self.client.moderations.create(
+                    model=MODERATION_MODEL,
+                    input=text,
+                    timeout=timeout,
+                ),
+                hedge=True,
+            )
+            result = resp.results[0]
+        record_call(seconds=time.perf_counter() - started, cacheable=key is not None)
+        if key:
+            await self.cache.aset(key, _dump_moderation(result))
+        return result
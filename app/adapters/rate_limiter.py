@@ -0,0 +1,342 @@
+# app/adapters/rate_limiter.py
+
+"""
+Client-side rate limiting for the shared OpenAI account.
+
+One RateLimitScheduler sits in front of every Responses API call. It keeps
+two token buckets, requests per minute and tokens per minute, and a
+priority queue of waiting calls. When the buckets run dry, the waiting
+call with the best priority goes first: user-facing generation, then
+the evaluator judges. Moderation calls have their own limits upstream and
+don't go through the scheduler.
+
+A call's token cost isn't known until it returns, so it reserves an
+estimate (prompt chars / 4 + `expected_output_tokens`) and `settle()`
+corrects the TPM bucket once the real usage is known. Every attempt
+settles its own reservation, and a failed or cancelled one (a retry, a
+losing hedge) gets its tokens back.
+
+`admit()` is the server's admission check: when the queue is full, or
+draining it would take longer than `max_queue_wait_seconds`, a new run is
+turned away at once with a Retry-After instead of queueing until it
+times out.
+
+The queue has no dedicated thread. Waiters sleep until the head of the
+queue could be served and then serve it themselves.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from app.adapters.histogram import Histogram
+from app.adapters.resilience import DeadlineExceeded, remaining
+
+WAIT_MS_BUCKETS = (1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Priority(IntEnum):
+    """Lower is served first."""
+    INTERACTIVE = 0  # the user is waiting on it: generate, make_emoji
+    DEFAULT = 1      # nodes without a listed priority
+    EVALUATOR = 2    # hallucination / emoji judges
+
+
+_priority: ContextVar[Priority] = ContextVar("call_priority", default=Priority.DEFAULT)
+
+
+@contextmanager
+def priority_scope(priority: Priority) -> Iterator[None]:
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+def with_priority(priority: Priority, func: Callable, afunc: Callable):
+    """Wraps a node's (func, afunc) so its adapter calls queue at `priority`."""
+    def wrapped(state: Dict[str, Any]):
+        with priority_scope(priority):
+            return func(state)
+
+    async def awrapped(state: Dict[str, Any]):
+        with priority_scope(priority):
+            return await afunc(state)
+
+    return wrapped, awrapped
+
+
+class Overloaded(Exception):
+    """A new run was refused; retry after `retry_after` seconds."""
+
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RateLimitConfig(BaseModel):
+    """
+    Account limits and queue bounds, overridable via OPENAI_RATE_LIMIT_*
+    env vars.
+    """
+    enabled: bool = True
+    requests_per_minute: float = 500
+    tokens_per_minute: float = 200_000
+    expected_output_tokens: int = 256
+    max_queue: int = 256                 # waiting calls before runs get a 503
+    max_queue_wait_seconds: float = 10.0  # estimated drain time before a 429
+
+    @classmethod
+    def from_env(cls) -> "RateLimitConfig":
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("OPENAI_RATE_LIMIT_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on"),
+            requests_per_minute=float(os.getenv("OPENAI_RATE_LIMIT_RPM", defaults.requests_per_minute)),
+            tokens_per_minute=float(os.getenv("OPENAI_RATE_LIMIT_TPM", defaults.tokens_per_minute)),
+            expected_output_tokens=int(
+                os.getenv("OPENAI_RATE_LIMIT_EXPECTED_OUTPUT_TOKENS", defaults.expected_output_tokens)
+            ),
+            max_queue=int(os.getenv("OPENAI_RATE_LIMIT_MAX_QUEUE", defaults.max_queue)),
+            max_queue_wait_seconds=float(
+                os.getenv("OPENAI_RATE_LIMIT_MAX_QUEUE_WAIT", defaults.max_queue_wait_seconds)
+            ),
+        )
+
+
+class TokenBucket:
+    """
+    Refills continuously at `per_minute / 60` per second up to `per_minute`.
+    The level can go negative when a settled call cost more than reserved.
+    Not thread-safe on its own; the scheduler holds its lock.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it already is)."""
+        self._refill()
+        amount = min(amount, self.capacity)  # an oversized call must still get through
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def give(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "enqueued", "granted", "cancelled", "wake")
+
+    def __init__(self, priority: Priority, seq: int, tokens: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.enqueued = time.perf_counter()
+        self.granted = False
+        self.cancelled = False
+        self.wake = wake
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RateLimitScheduler:
+    """
+    Shared RPM + TPM token buckets in front of the Responses API, with a
+    priority queue of waiting calls. See the module docstring.
+    """
+
+    def __init__(self, config: Optional[RateLimitConfig] = None, clock: Callable[[], float] = time.monotonic):
+        self.config = config or RateLimitConfig.from_env()
+        self.requests = TokenBucket(self.config.requests_per_minute, clock)
+        self.tokens = TokenBucket(self.config.tokens_per_minute, clock)
+        self._lock = threading.Lock()
+        self._sync_wake = threading.Condition(self._lock)
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+
+        self.wait_ms = {p.name.lower(): Histogram(WAIT_MS_BUCKETS) for p in Priority}
+        self.granted = 0
+        self.shed = 0
+
+    def estimate(self, prompt: str) -> int:
+        return len(prompt) // 4 + self.config.expected_output_tokens
+
+    # -- queue (callers hold self._lock) --------------------------------
+    def _head_wait(self) -> float:
+        """Seconds until the head waiter could be served; 0 when nothing waits."""
+        while self._queue and self._queue[0].cancelled:
+            heapq.heappop(self._queue)
+        if not self._queue:
+            return 0.0
+        head = self._queue[0]
+        return max(self.requests.wait_for(1), self.tokens.wait_for(head.tokens))
+
+    def _grant(self):
+        """Serves waiters in priority order while the buckets allow it."""
+        while self._queue:
+            if self._head_wait() > 0 or not self._queue:
+                return
+            waiter = heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(waiter.tokens)
+            waiter.granted = True
+            self.granted += 1
+            self.wait_ms[waiter.priority.name.lower()].observe((time.perf_counter() - waiter.enqueued) * 1000)
+            waiter.wake()
+
+    def _enqueue(self, tokens: int, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(current_priority(), next(self._seq), tokens, wake)
+        heapq.heappush(self._queue, waiter)
+        self._grant()
+        return waiter
+
+    def _poll_delay(self, waiter: _Waiter) -> float:
+        """How long `waiter` sleeps before serving the queue itself."""
+        left = remaining()
+        if left is not None and left <= 0:
+            waiter.cancelled = True
+            raise DeadlineExceeded("run deadline passed while queued for the rate limiter")
+        delay = max(self._head_wait(), 0.001)
+        return delay if left is None else min(delay, left)
+
+    # -- public -----------------------------------------------------------
+    def acquire(self, tokens: int):
+        """Blocks until one request and `tokens` tokens are granted."""
+        with self._lock:
+            waiter = self._enqueue(tokens, self._sync_wake.notify_all)
+            while not waiter.granted:
+                self._sync_wake.wait(self._poll_delay(waiter))
+                self._grant()
+
+    async def aacquire(self, tokens: int):
+        """Async acquire; waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(event.set)
+
+        with self._lock:
+            waiter = self._enqueue(tokens, wake)
+        try:
+            while not waiter.granted:
+                with self._lock:
+                    delay = self._poll_delay(waiter)
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                with self._lock:
+                    self._grant()
+        except BaseException:
+            with self._lock:
+                if waiter.granted:  # granted while we were being cancelled
+                    self.requests.give(1)
+                    self.tokens.give(waiter.tokens)
+                waiter.cancelled = True
+            raise
+
+    def settle(self, reserved: int, actual: Optional[int]):
+        """Corrects the TPM bucket once a call's real token usage is known."""
+        if actual is None:
+            return
+        with self._lock:
+            if actual > reserved:
+                self.tokens.take(actual - reserved)
+            else:
+                self.tokens.give(reserved - actual)
+
+    def admit(self):
+        """
+        Admission check for a new run. Raises Overloaded (503 when the queue
+        is full, 429 when it would take too long to drain) with a
+        Retry-After estimate.
+        """
+        with self._lock:
+            self._head_wait()  # drops cancelled waiters
+            queued = [w for w in self._queue if not w.cancelled]
+            requests_wait = self.requests.wait_for(len(queued) + 1)
+            tokens_wait = self.tokens.wait_for(
+                sum(w.tokens for w in queued) + self.config.expected_output_tokens
+            )
+            drain = max(requests_wait, tokens_wait)
+
+            if len(queued) >= self.config.max_queue:
+                self.shed += 1
+                raise Overloaded(503, max(drain, 1.0), f"OpenAI call queue is full ({len(queued)} waiting)")
+            if drain > self.config.max_queue_wait_seconds:
+                self.shed += 1
+                raise Overloaded(429, drain, f"rate limit queue needs ~{math.ceil(drain)}s to drain")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._head_wait()
+            queued = {p.name.lower(): 0 for p in Priority}
+            for waiter in self._queue:
+                if not waiter.cancelled:
+                    queued[waiter.priority.name.lower()] += 1
+            requests_left = self.requests.level
+            tokens_left = self.tokens.level
+        return {
+            "enabled": self.config.enabled,
+            "requests_per_minute": self.config.requests_per_minute,
+            "tokens_per_minute": self.config.tokens_per_minute,
+            "requests_available": round(requests_left, 2),
+            "tokens_available": round(tokens_left, 2),
+            "queued": queued,
+            "granted": self.granted,
+            "shed": self.shed,
+            "wait_ms": {name: h.snapshot() for name, h in self.wait_ms.items()},
+        }
+
+
+_config: Optional[RateLimitConfig] = None
+_scheduler: Optional[RateLimitScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimitScheduler]:
+    """
+    Returns the process-wide scheduler, or None when
+    OPENAI_RATE_LIMIT_ENABLED is off. The env is read once per process.
+    """
+    global _config, _scheduler
+    with _scheduler_lock:
+        if _config is None:
+            _config = RateLimitConfig.from_env()
+        if not _config.enabled:
+            return None
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler(_config)
+        return _scheduler
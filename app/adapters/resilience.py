@@ -0,0 +1,306 @@
+# app/adapters/resilience.py
+
+"""
+Timeouts, retries, deadlines and hedging for OpenAI calls.
+
+- Every attempt gets a timeout: the smaller of `timeout_seconds` and the
+  time left until the run's deadline.
+- 429s, 5xx, timeouts and connection errors are retried with full-jitter
+  exponential backoff (or the server's Retry-After, if longer), as long
+  as the deadline allows.
+- Hedging (opt-in, idempotent calls only): if an attempt hasn't answered
+  after the p95 latency seen for that kind of call, a duplicate is sent
+  and whichever answers first wins.
+
+The run deadline is an absolute time.time() value. The graph's node
+wrapper (`with_deadline`) copies it from state["deadline"] into a context
+variable, so adapters pick it up without every service passing it along.
+"""
+
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, TypeVar
+
+import openai
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("run_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run's deadline passed before the call could be (re)tried."""
+
+
+# ---------------------------------------------------------
+# Deadline propagation
+# ---------------------------------------------------------
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[None]:
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def with_deadline(func: Callable, afunc: Callable):
+    """
+    Wraps a node's (func, afunc) so adapter calls inside it see the run's
+    state["deadline"].
+    """
+    def wrapped(state: Dict[str, Any]):
+        with deadline_scope(state.get("deadline")):
+            return func(state)
+
+    async def awrapped(state: Dict[str, Any]):
+        with deadline_scope(state.get("deadline")):
+            return await afunc(state)
+
+    return wrapped, awrapped
+
+
+# ---------------------------------------------------------
+# Policy
+# ---------------------------------------------------------
+class CallPolicyConfig(BaseModel):
+    """
+    Retry / timeout / hedging settings, overridable via OPENAI_RETRY_*,
+    OPENAI_CALL_TIMEOUT and OPENAI_HEDGE_* env vars.
+    """
+    timeout_seconds: float = 30.0
+    max_attempts: int = 3
+    backoff_base_seconds: float = 0.25
+    backoff_max_seconds: float = 4.0
+
+    hedge_enabled: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_initial_delay_seconds: float = 2.0  # until enough samples are in
+    latency_window: int = 200
+
+    @classmethod
+    def from_env(cls) -> "CallPolicyConfig":
+        defaults = cls()
+        return cls(
+            timeout_seconds=float(os.getenv("OPENAI_CALL_TIMEOUT", defaults.timeout_seconds)),
+            max_attempts=int(os.getenv("OPENAI_RETRY_MAX_ATTEMPTS", defaults.max_attempts)),
+            backoff_base_seconds=float(os.getenv("OPENAI_RETRY_BACKOFF_BASE", defaults.backoff_base_seconds)),
+            backoff_max_seconds=float(os.getenv("OPENAI_RETRY_BACKOFF_MAX", defaults.backoff_max_seconds)),
+            hedge_enabled=os.getenv("OPENAI_HEDGE_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on"),
+            hedge_quantile=float(os.getenv("OPENAI_HEDGE_QUANTILE", defaults.hedge_quantile)),
+            hedge_min_samples=int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", defaults.hedge_min_samples)),
+            hedge_initial_delay_seconds=float(
+                os.getenv("OPENAI_HEDGE_INITIAL_DELAY", defaults.hedge_initial_delay_seconds)
+            ),
+        )
+
+
+def _retryable(error: BaseException) -> bool:
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: BaseException) -> float:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+class CallPolicy:
+    """
+    Runs one logical API call: timeouts, retries and optional hedging.
+
+    `fn` receives the timeout (seconds) for the attempt and performs it;
+    `kind` groups calls for the hedge's latency quantile.
+    """
+
+    def __init__(self, config: Optional[CallPolicyConfig] = None, rng: Optional[random.Random] = None):
+        self.config = config or CallPolicyConfig.from_env()
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    # -- bookkeeping --------------------------------------------------
+    def _observe(self, kind: str, seconds: float):
+        with self._lock:
+            window = self._latencies.setdefault(kind, deque(maxlen=self.config.latency_window))
+            window.append(seconds)
+
+    def hedge_delay(self, kind: str) -> float:
+        """The configured latency quantile for `kind`, once enough samples exist."""
+        with self._lock:
+            samples = sorted(self._latencies.get(kind, ()))
+        if len(samples) < self.config.hedge_min_samples:
+            return self.config.hedge_initial_delay_seconds
+        index = min(len(samples) - 1, math.ceil(self.config.hedge_quantile * len(samples)) - 1)
+        return samples[index]
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _attempt_timeout(self) -> float:
+        left = remaining()
+        if left is not None and left <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded("run deadline passed")
+        return self.config.timeout_seconds if left is None else min(self.config.timeout_seconds, left)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        Delay before retry number `attempt` (1-based). Raises `error` when
+        out of attempts, or DeadlineExceeded (chained from `error`) when the
+        delay would cross the deadline.
+        """
+        if attempt >= self.config.max_attempts or not _retryable(error):
+            raise error
+        cap = min(self.config.backoff_max_seconds, self.config.backoff_base_seconds * 2 ** (attempt - 1))
+        delay = max(self._rng.uniform(0, cap), _retry_after(error))
+        left = remaining()
+        if left is not None and delay >= left:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded("run deadline would pass before the next retry") from error
+        self._count("retries")
+        return delay
+
+    # -- sync ----------------------------------------------------------
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+            return self._pool
+
+    def _hedged(self, kind: str, fn: Callable[[float], T], timeout: float) -> T:
+        pool = self._executor()
+        context = copy_context()  # keep the deadline / node scope in the workers
+        primary = pool.submit(context.copy().run, fn, timeout)
+        done, _ = wait([primary], timeout=min(self.hedge_delay(kind), timeout))
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = pool.submit(context.copy().run, fn, timeout)
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(self, kind: str, fn: Callable[[float], T], hedge: bool = False) -> T:
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._attempt_timeout()
+            started = time.perf_counter()
+            try:
+                if hedge and self.config.hedge_enabled:
+                    result = self._hedged(kind, fn, timeout)
+                else:
+                    result = fn(timeout)
+            except Exception as e:
+                time.sleep(self._backoff(attempt, e))
+                continue
+            self._observe(kind, time.perf_counter() - started)
+            return result
+
+    # -- async ---------------------------------------------------------
+    async def _ahedged(self, kind: str, afn: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        primary = asyncio.ensure_future(afn(timeout))
+        done, _ = await asyncio.wait({primary}, timeout=min(self.hedge_delay(kind), timeout))
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = asyncio.ensure_future(afn(timeout))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()  # the loser's connection is released right away
+
+    async def acall(self, kind: str, afn: Callable[[float], Awaitable[T]], hedge: bool = False) -> T:
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = self._attempt_timeout()
+            started = time.perf_counter()
+            try:
+                if hedge and self.config.hedge_enabled:
+                    result = await self._ahedged(kind, afn, timeout)
+                else:
+                    result = await afn(timeout)
+            except Exception as e:
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+            self._observe(kind, time.perf_counter() - started)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadline_exceeded": self.deadline_exceeded,
+            "hedge_delay_seconds": {
+                kind: round(self.hedge_delay(kind), 4) for kind in list(self._latencies)
+            },
+        }
+
+
+_policy: Optional[CallPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_call_policy() -> CallPolicy:
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = CallPolicy()
+        return _policy
@@ -0,0 +1,256 @@
+# app/adapters/response_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+
+def cache_key(kind: str, model: str, payload: str, base_url: str = "") -> str:
+    """
+    Content address of a call: the API base URL, the endpoint kind, the
+    model and the full prompt/text. Identical inputs always map to the same
+    key; responses from different servers (e.g. a local stub) never mix.
+    """
+    raw = json.dumps([base_url, kind, model, payload], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheConfig(BaseModel):
+    """
+    Response cache settings, overridable via RESPONSE_CACHE_* env vars.
+    """
+    enabled: bool = True
+    max_entries: int = 1024
+    db_path: Optional[str] = "app/storage/cache/responses.sqlite3"
+    ttl_seconds: float = 7 * 24 * 3600
+    max_db_bytes: int = 64 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> "CacheConfig":
+        defaults = cls()
+        db_path = os.getenv("RESPONSE_CACHE_PATH", defaults.db_path)
+        return cls(
+            enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on"),
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", defaults.max_entries)),
+            db_path=db_path or None,  # empty string disables the disk tier
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", defaults.ttl_seconds)),
+            max_db_bytes=int(os.getenv("RESPONSE_CACHE_MAX_DB_BYTES", defaults.max_db_bytes)),
+        )
+
+
+class ResponseCache:
+    """
+    Two-tier cache for deterministic evaluator calls.
+
+    Tier 1 is a bounded in-memory LRU. Tier 2 is a local SQLite file with a
+    TTL and a total-size cap; a disk hit is promoted back into memory.
+    Values are JSON-serialisable dicts, so callers own (de)serialisation.
+
+    The tiers have separate locks, so a memory hit never waits on disk I/O.
+    A disk hit is a read only: its recency update is queued and written with
+    the next insert or eviction. `aget`/`aset` serve async callers: memory
+    on the event loop, the disk tier in a worker thread.
+    """
+
+    _EVICT_EVERY = 64  # disk writes between size checks
+
+    def __init__(self, config: Optional[CacheConfig] = None):
+        self.config = config or CacheConfig.from_env()
+
+        self._lock = threading.Lock()  # memory tier
+        self._db_lock = threading.Lock()  # disk tier
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self._touched: Dict[str, float] = {}  # disk hits not yet written back
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---------------------------------------------------------
+    # Disk tier
+    # ---------------------------------------------------------
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if not self.config.db_path:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.config.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.config.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            self._evict()
+        return self._db
+
+    def _flush_touches(self, db: sqlite3.Connection):
+        if self._touched:
+            db.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        db = self._db
+        self._flush_touches(db)
+        now = time.time()
+        db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.config.ttl_seconds,))
+
+        (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total > self.config.max_db_bytes:
+            # drop least recently used rows until we are back under the cap
+            excess = total - self.config.max_db_bytes
+            freed = 0
+            stale = []
+            for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                stale.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            db.executemany("DELETE FROM responses WHERE key = ?", stale)
+        db.commit()
+        self._writes_since_evict = 0
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return value
+
+    def _get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            db = self._conn()
+            row = None
+            if db is not None:
+                row = db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or row[1] < time.time() - self.config.ttl_seconds:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            self.disk_hits += 1
+
+        value = json.loads(row[0])
+        with self._lock:
+            self._remember(key, value)
+        return value
+
+    def _set_disk(self, key: str, value: Dict[str, Any]):
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._db_lock:
+            db = self._conn()
+            if db is None:
+                return
+
+            now = time.time()
+            self._flush_touches(db)
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now),
+            )
+            db.commit()
+
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= self._EVICT_EVERY:
+                self._evict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.config.enabled:
+            return None
+        value = self._get_memory(key)
+        return value if value is not None else self._get_disk(key)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.config.enabled:
+            return
+        with self._lock:
+            self._remember(key, value)
+        self._set_disk(key, value)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.config.enabled:
+            return None
+        value = self._get_memory(key)
+        if value is not None or not self.config.db_path:
+            if value is None:
+                self.misses += 1
+            return value
+        return await asyncio.to_thread(self._get_disk, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]):
+        if not self.config.enabled:
+            return
+        with self._lock:
+            self._remember(key, value)
+        if self.config.db_path:
+            await asyncio.to_thread(self._set_disk, key, value)
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.config.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._flush_touches(self._db)
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Returns the process-wide response cache, built from the environment
+    on first call. The SQLite file is only opened on first lookup.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
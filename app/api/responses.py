@@ -0,0 +1,51 @@
+# app/api/responses.py
+
+"""
+Response serialization for the run endpoints.
+
+Final states are plain dicts of str/float/int/list/dict, so they can skip
+FastAPI's jsonable_encoder walk and go straight to orjson. `project` trims
+a state to the keys a caller asked for before anything is serialized.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from app.domain.state import STATE_FIELDS
+
+
+def dumps(content: Any) -> bytes:
+    # orjson serialises datetime, UUID, enum and dataclass values itself
+    # (datetimes as RFC 3339, not str()); default=str only sees the types it
+    # can't handle, e.g. an SDK object. Integers wider than 64 bits still raise.
+    return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parses a `fields=llm_output,toxicity_score` query value. Returns None
+    for "everything"; unknown keys are a 422.
+    """
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = sorted(set(names) - STATE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"unknown state fields: {', '.join(unknown)}")
+    return names
+
+
+def project(state: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return state
+    return {key: state[key] for key in fields if key in state}
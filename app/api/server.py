@@ -1,21 +1,188 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
 
-from app.domain.workflow_graph import build_graph
+from dotenv import load_dotenv
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
-# init fastApi and state graph
-app = FastAPI(title="LangGraph Observer API (Refactored)")
-graph = build_graph()
+from app.adapters.client_registry import get_registry
+from app.adapters.moderation_batcher import get_moderation_batcher
+from app.adapters.openai_adapter import MODERATION_MODEL
+from app.adapters.rate_limiter import Overloaded, get_rate_limiter
+from app.adapters.resilience import DeadlineExceeded, get_call_policy
+from app.api.responses import ORJSONResponse, dumps, parse_fields, project
+from app.api.single_flight import get_single_flight
+from app.adapters.response_cache import get_response_cache
+from app.domain.instrumentation import get_metrics_registry
+from app.domain.state import merge_dicts
+from app.domain.checkpoints import new_run_id, open_checkpointer, resume_run, thread_config
+from app.services.artifact_writer import get_artifact_writer
+from app.services.evaluation_policy import METRICS
+from app.services.history_store import INDEXED_COLUMNS, get_history_store
+from app.services.job_queue import JobConfig, JobQueue, JobWorkers
+
+
+def _get_graph(evaluators=None, checkpointer=None):
+    # langgraph, langchain and the services load with the first graph, not
+    # with this module, so importing the app stays cheap
+    from app.domain import workflow_graph
+
+    return workflow_graph.get_graph(evaluators, checkpointer)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warmup: opens the checkpointer, compiles the default graph (off the
+    event loop) and starts the job workers; /ready answers 200 from then
+    until shutdown.
+    """
+    global graph, checkpointer, jobs
+    async with open_checkpointer() as saver:
+        checkpointer = saver
+        graph = await asyncio.to_thread(_get_graph, None, saver)
+        config = JobConfig.from_env()
+        jobs = JobWorkers(JobQueue(config.db_path, config.lease_seconds, config.max_attempts), _run_job, config)
+        await jobs.start()
+        yield
+        # unfinished jobs stay in the queue and resume on the next start
+        await jobs.stop()
+        jobs.queue.close()
+        jobs = None
+        graph = None
+        checkpointer = None
+    # flush queued artifacts and moderation batches, then release the
+    # shared connection pool
+    await asyncio.to_thread(get_artifact_writer().close)
+    batcher = get_moderation_batcher(MODERATION_MODEL)
+    if batcher is not None:
+        await asyncio.to_thread(batcher.close)
+    registry = get_registry()
+    registry.close()
+    await registry.aclose()
+
+
+router = APIRouter()
+graph = None  # the default compiled graph; built by the lifespan or on first use
+checkpointer = None  # the SQLite checkpointer, once the lifespan has opened it
+jobs: Optional[JobWorkers] = None  # the /jobs worker pool, started by the lifespan
+
+# ?fields= projection, shared by every endpoint that returns a run's state
+FIELDS_QUERY = Query(None, description="Comma-separated state keys to return, e.g. llm_output,toxicity_score")
 
 
 # like @controller in Spring Boot
 class RunRequest(BaseModel):
     input: str
     emoji_mode: bool = False
+    cache_bypass: bool = False  # force fresh evaluator calls for this run
+    # end-to-end budget; retries and timeouts of every call are cut to fit
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
+    # continue this earlier run from its saved generation instead of
+    # generating again (e.g. "Make More Emoji")
+    run_id: Optional[str] = None
+    # score only these metrics; by default the evaluation policy decides
+    evaluators: Optional[List[Literal[METRICS]]] = None
+
+
+class BatchRunRequest(BaseModel):
+    items: List[RunRequest]
+    max_concurrency: int = Field(default=8, ge=1, le=64)
+
+
+def _initial_state(payload: RunRequest) -> dict:
+    state = {
+        "run_id": new_run_id(),
+        "user_input": payload.input,
+        "emoji_mode": payload.emoji_mode,
+        "cache_bypass": payload.cache_bypass,
+        "evaluators": payload.evaluators,  # None: the evaluation policy decides
+        "start_time": time.time(),
+    }
+    if payload.deadline_seconds is not None:
+        state["deadline"] = state["start_time"] + payload.deadline_seconds
+    return state
+
+
+def _graph_for(payload: RunRequest):
+    # explicit evaluator lists run on a graph holding only those scorers,
+    # compiled once per set
+    global graph
+    if payload.evaluators is None:
+        if graph is None:
+            graph = _get_graph(None, checkpointer)
+        return graph
+    return _get_graph(payload.evaluators, checkpointer)
+
+
+def _admit():
+    """
+    Sheds load up front: when the OpenAI call queue is full or would take
+    too long to drain, the run is refused with 429/503 and a Retry-After
+    instead of queueing until it times out.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return
+    try:
+        limiter.admit()
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+
+def _coalesce_key(payload: RunRequest) -> Optional[tuple]:
+    # fresh-call and deadline-bound runs always get their own execution
+    if payload.cache_bypass or payload.deadline_seconds is not None:
+        return None
+    evaluators = None if payload.evaluators is None else tuple(sorted(set(payload.evaluators)))
+    return (payload.input, payload.emoji_mode, payload.run_id, evaluators)
+
+
+async def _execute(payload: RunRequest) -> dict:
+    """
+    Runs the graph for one request. With the checkpointer attached, a
+    request naming an earlier run_id (same input) resumes that run after
+    `generate`; anything else is a fresh run saved under a new run_id.
+    """
+    state = _initial_state(payload)
+    workflow = _graph_for(payload)
+    if checkpointer is None:
+        return await workflow.ainvoke(state)
 
+    if payload.run_id:
+        resumed = await resume_run(workflow, payload.run_id, payload.input, state)
+        if resumed is not None:
+            return resumed
+    return await workflow.ainvoke(state, thread_config(state["run_id"]), durability="exit")
 
-@app.post("/run-graph", summary="Run the workflow", response_description="Final state")
-def run_graph(payload: RunRequest):
+
+async def _run(payload: RunRequest) -> dict:
+    """
+    One graph run. With RUN_COALESCING_ENABLED, identical concurrent
+    requests share a single in-flight execution and its final state.
+    """
+    flights = get_single_flight()
+    key = _coalesce_key(payload) if flights else None
+    if key is None:
+        return await _execute(payload)
+    return await flights.run(key, lambda: _execute(payload))
+
+
+async def _run_job(request: dict) -> dict:
+    return await _run(RunRequest(**request))
+
+
+@router.post("/run-graph", summary="Run the workflow", response_description="Final state")
+async def run_graph(payload: RunRequest, fields: Optional[str] = FIELDS_QUERY):
     """
     Runs the LangGraph pipeline.
 
@@ -23,26 +190,252 @@ def run_graph(payload: RunRequest):
     - Computes toxicity, hallucination, emoji metrics
     - Saves artifact + history
 
-    Returns the final state as a JSON object.
+    The final state carries a `run_id`. Sending it back with the same input
+    (e.g. emoji_mode=true for "Make More Emoji") continues that run from its
+    saved generation: only make_emoji, the scorers and the artifact run.
+
+    Returns the final state as a JSON object (only the `fields` keys, if
+    given), or 429/503 with Retry-After when the server is shedding load.
     """
+    keys = parse_fields(fields)
+    _admit()
     try:
-        # Base state
-        state = {
-            "user_input": payload.input,
-            "emoji_mode": payload.emoji_mode,
-        }
+        # Execute LangGraph; async nodes keep the event loop free while
+        # the OpenAI calls are in flight
+        result = await _run(payload)
 
-        # Execute LangGraph
-        result = graph.invoke(state)
-
-        # Return final output state
-        return {"state": result}
+        # Return final output state; a ready-made response skips
+        # FastAPI's jsonable_encoder pass over the whole state
+        return ORJSONResponse({"state": project(result, keys)})
 
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get(
+@router.post(
+    "/run-graph/batch",
+    summary="Run the workflow over many inputs",
+    response_description="One NDJSON line per item, in completion order",
+)
+async def run_graph_batch(payload: BatchRunRequest, fields: Optional[str] = FIELDS_QUERY):
+    """
+    Runs every item through the compiled graph with at most
+    `max_concurrency` runs in flight.
+
+    Results stream back as newline-delimited JSON in completion order.
+    Each line carries the item's `index` plus either `state` or `error`,
+    so one failing item never fails the batch. Admission is checked once
+    for the whole batch; `fields` projects every state.
+    """
+    keys = parse_fields(fields)
+    _admit()
+    semaphore = asyncio.Semaphore(payload.max_concurrency)
+
+    async def run_one(index: int, item: RunRequest) -> dict:
+        async with semaphore:
+            try:
+                result = await _run(item)
+                return {"index": index, "state": project(result, keys)}
+            except Exception as e:
+                return {"index": index, "error": str(e)}
+
+    async def results():
+        tasks = [
+            asyncio.create_task(run_one(i, item))
+            for i, item in enumerate(payload.items)
+        ]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield dumps(await done) + b"\n"
+        finally:
+            # client went away mid-stream: stop the remaining runs
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+@router.post(
+    "/run-graph/stream",
+    summary="Run the workflow with live progress",
+    response_description="Server-sent events",
+)
+async def run_graph_stream(payload: RunRequest, fields: Optional[str] = FIELDS_QUERY):
+    """
+    Runs the workflow and streams progress as server-sent events:
+
+    - `token`: a fragment of the generation, as the model produces it
+    - `node`: a node finished; carries `node`, `elapsed_seconds` since the
+      run started and the `updated_keys` it wrote
+    - `done`: the final state
+    - `error`: the run failed; the stream ends after it
+
+    Streamed runs are checkpointed too, so their `run_id` can be resumed
+    through /run-graph; a stream always starts a new run, so `run_id` is
+    rejected here. `fields` projects the `done` state.
+    """
+    if payload.run_id:
+        raise HTTPException(status_code=422, detail="run_id cannot be resumed over a stream; use /run-graph")
+    keys = parse_fields(fields)
+    _admit()
+    state = _initial_state(payload)
+    # token streaming is a property of this call, not of the run, so it
+    # travels in the config and never lands in a checkpoint
+    config = {"configurable": {"stream_tokens": True}}
+    saving = {"durability": "exit"} if checkpointer else {}
+    if checkpointer:
+        config["configurable"].update(thread_config(state["run_id"])["configurable"])
+
+    async def events():
+        started = time.perf_counter()
+        final_state = dict(state)
+        try:
+            async for mode, chunk in _graph_for(payload).astream(
+                state, config, stream_mode=["custom", "updates"], **saving
+            ):
+                if mode == "custom":
+                    yield _sse("token", {"delta": chunk["token"]})
+                    continue
+
+                for node, update in chunk.items():
+                    update = update or {}
+                    final_state.update({
+                        **update,
+                        "node_metrics": merge_dicts(final_state.get("node_metrics"), update.get("node_metrics")),
+                    })
+                    yield _sse("node", {
+                        "node": node,
+                        "elapsed_seconds": round(time.perf_counter() - started, 4),
+                        "updated_keys": sorted(update),
+                    })
+
+            yield _sse("done", {"state": project(final_state, keys)})
+
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/jobs",
+    status_code=202,
+    summary="Queue a workflow run",
+    response_description="The job id to poll",
+)
+async def submit_job(payload: RunRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    Queues a run and returns its `job_id` right away; poll
+    GET /jobs/{job_id} for the result.
+
+    Jobs are kept in a local SQLite queue and run by an in-process worker
+    pool (JOB_WORKERS), so queued and interrupted jobs survive a restart.
+    Resending a request with the same `Idempotency-Key` header returns the
+    original job instead of queueing another. Returns 503 with Retry-After
+    when the queue is full.
+    """
+    if jobs is None:
+        raise HTTPException(status_code=503, detail="job workers are not running")
+    counts = await asyncio.to_thread(jobs.queue.counts)
+    if counts["queued"] >= jobs.config.max_pending:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{counts['queued']} jobs already queued",
+            headers={"Retry-After": str(math.ceil(jobs.config.poll_interval_seconds))},
+        )
+    job = await asyncio.to_thread(jobs.queue.enqueue, payload.model_dump(), idempotency_key)
+    jobs.notify()
+    return ORJSONResponse(
+        {"job_id": job["job_id"], "status": job["status"]},
+        status_code=202,
+        headers={"Location": f"/jobs/{job['job_id']}"},
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Job status",
+    response_description="Status, and the final state once succeeded",
+)
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to long-poll for the job to finish"),
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    """
+    Returns the job's `status` (queued, running, succeeded, failed) and its
+    timestamps, plus the final `state` once it succeeded or the `error`
+    once it failed. With `wait`, the request is held until the job
+    finishes or `wait` seconds (capped at JOB_MAX_WAIT_SECONDS) pass.
+    """
+    keys = parse_fields(fields)
+    if jobs is None:
+        raise HTTPException(status_code=503, detail="job workers are not running")
+    if wait:
+        job = await jobs.wait(job_id, wait)
+    else:
+        job = await asyncio.to_thread(jobs.queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"unknown job {job_id}")
+
+    job.pop("request")
+    if "state" in job:
+        job["state"] = project(job["state"], keys)
+    return ORJSONResponse(job)
+
+
+@router.get(
+    "/history",
+    summary="Run history",
+    response_description="One page of past runs",
+)
+def history(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    sort_by: Literal[INDEXED_COLUMNS] = "timestamp",
+    order: Literal["asc", "desc"] = "desc",
+    since: Optional[str] = Query(None, description="Earliest timestamp, YYYYmmdd_HHMMSS"),
+    until: Optional[str] = Query(None, description="Latest timestamp, YYYYmmdd_HHMMSS"),
+    min_cost: Optional[float] = None,
+    max_cost: Optional[float] = None,
+    min_toxicity: Optional[float] = None,
+    max_toxicity: Optional[float] = None,
+    min_hallucination: Optional[float] = None,
+    max_hallucination: Optional[float] = None,
+    min_emoji: Optional[float] = None,
+    max_emoji: Optional[float] = None,
+):
+    """
+    Pages through past runs from the indexed history store.
+    Sorting and every filter run on indexed columns.
+    """
+    ranges = {
+        "timestamp": (since, until),
+        "cost": (min_cost, max_cost),
+        "toxicity_score": (min_toxicity, max_toxicity),
+        "hallucination_score": (min_hallucination, max_hallucination),
+        "emoji_score": (min_emoji, max_emoji),
+    }
+    return get_history_store().query(
+        limit=limit,
+        offset=offset,
+        sort_by=sort_by,
+        descending=order == "desc",
+        ranges={k: v for k, v in ranges.items() if v != (None, None)},
+    )
+
+
+@router.get(
     "/health",
     summary="Health check",
     response_description="API status"
@@ -51,4 +444,112 @@ def health():
     """
     Returns basic API availability status.
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get(
+    "/ready",
+    summary="Readiness check",
+    response_description="Whether the API can serve runs",
+)
+def ready():
+    """
+    Returns 200 once warmup is done and runs can be served: the graph is
+    compiled, the job workers are running and OpenAI credentials are set.
+    Otherwise 503 with the failing checks, e.g. while starting up or
+    shutting down. Unlike /health, which only says the process is up,
+    this is what a load balancer should route on.
+    """
+    checks = {
+        "graph": graph is not None,
+        "job_workers": jobs is not None,
+        "openai_credentials": bool(os.getenv("OPENAI_API_KEY")),
+    }
+    ok = all(checks.values())
+    return ORJSONResponse(
+        {"status": "ready" if ok else "not_ready", "checks": checks},
+        status_code=200 if ok else 503,
+    )
+
+
+@router.get(
+    "/stats",
+    summary="Runtime stats",
+    response_description="Connection pool and other runtime counters"
+)
+def stats():
+    """
+    Returns runtime counters for monitoring:
+
+    - `pool`: the shared OpenAI connection pool (in use, idle, waits)
+    - `cache`: the evaluator response cache
+    - `artifact_writer`: queue depth, flush latency, failed batches
+    - `moderation_batcher`: batch-size and wait-time histograms
+    - `call_policy`: retries, hedges, deadline misses
+    - `rate_limiter`: bucket levels, queue depth per priority, shed runs
+    - `coalescing`: runs folded into an identical in-flight one
+    - `jobs`: jobs per status, busy workers
+    """
+    batcher = get_moderation_batcher(MODERATION_MODEL)
+    limiter = get_rate_limiter()
+    flights = get_single_flight()
+    return {
+        "pool": get_registry().pool_stats(),
+        "cache": get_response_cache().stats(),
+        "artifact_writer": get_artifact_writer().stats(),
+        "moderation_batcher": batcher.stats() if batcher else {"enabled": False},
+        "call_policy": get_call_policy().stats(),
+        "rate_limiter": limiter.stats() if limiter else {"enabled": False},
+        "coalescing": flights.stats() if flights else {"enabled": False},
+        "jobs": jobs.stats() if jobs else {"enabled": False},
+    }
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    response_class=PlainTextResponse,
+)
+def metrics():
+    """
+    Prometheus text exposition: per-node latency histograms
+    (graph_node_duration_seconds{node=...}), run/error/adapter-call/token
+    counters per node, the moderation batcher's histograms and the rate
+    limiter's queue wait per priority.
+    """
+    extra = {}
+    batcher = get_moderation_batcher(MODERATION_MODEL)
+    if batcher is not None:
+        extra["moderation_batch_size"] = ("Texts per moderation call.", batcher.batch_sizes)
+        extra["moderation_batch_wait_ms"] = ("Queueing delay before a text's batch was sent.", batcher.wait_ms)
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        for priority, histogram in limiter.wait_ms.items():
+            extra[f"rate_limit_wait_ms_{priority}"] = (
+                f"Time {priority}-priority calls waited for the rate limiter.", histogram
+            )
+    return PlainTextResponse(
+        get_metrics_registry().render(extra),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+def create_app() -> FastAPI:
+    """
+    Builds the API. Nothing heavy happens here, and no API key is needed:
+    clients, the graph and the job workers are set up by the lifespan's
+    warmup (or lazily on first use).
+
+        uvicorn --factory app.api.server:create_app
+    """
+    load_dotenv()
+    app = FastAPI(
+        title="LangGraph Observer API (Refactored)",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+    app.include_router(router)
+    return app
+
+
+app = create_app()
@@ -0,0 +1,62 @@
+# app/api/single_flight.py
+
+"""
+Single-flight coalescing for identical concurrent runs.
+
+The first request for a key starts the work; requests for the same key
+that arrive while it is in flight await the same task instead of starting
+their own, and all of them receive its result (or its exception). The key
+is forgotten as soon as the task finishes, so nothing is cached: a request
+arriving afterwards runs again.
+
+The shared task is shielded, so a leader whose client disconnects does not
+cancel the run for everyone else.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "enabled": True,
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """
+    Returns the process-wide SingleFlight, or None unless
+    RUN_COALESCING_ENABLED is on. Only used from the event loop.
+    """
+    global _single_flight
+    if os.getenv("RUN_COALESCING_ENABLED", "false").strip().lower() not in ("1", "true", "yes", "on"):
+        return None
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
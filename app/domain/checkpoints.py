@@ -0,0 +1,142 @@
+# app/domain/checkpoints.py
+
+"""
+Run checkpoints, so a follow-up request can continue a finished run
+instead of starting over.
+
+Each API run is a LangGraph thread keyed on its run_id. The graph is
+invoked with durability="exit": only the final state is written, once per
+run. A follow-up ("Make More Emoji") forks that final state as if
+`generate` had just produced its llm_output, so only make_emoji, the
+scorers and artifact run again. Because llm_output is then the previous
+transform's result, repeated transforms iterate on it.
+
+The store is SQLite through langgraph-checkpoint-sqlite (the `checkpoint`
+extra). Without that package, or with CHECKPOINT_ENABLED=false, runs are
+not checkpointed and follow-ups run the full graph. Runs whose last
+checkpoint is older than CHECKPOINT_RETENTION_SECONDS are pruned each time
+the store is opened, so the file stops growing once traffic is steady.
+"""
+
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from importlib.util import find_spec
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PATH = "app/storage/cache/checkpoints.sqlite3"
+CHECKPOINT_RETENTION_SECONDS = 7 * 24 * 3600
+
+# UUIDv6 timestamps count 100 ns ticks from 1582-10-15
+_GREGORIAN_TO_UNIX_SECONDS = 12219292800
+
+# written over the resumed run's keys so its artifact only accounts for
+# what actually ran this time: usage and cost start at zero, and every
+# per-run output is cleared, so a scorer the new plan skips doesn't report
+# the previous output's score. node_metrics bypasses its merge reducer.
+# Caller inputs are reset too; the follow-up's own values go on top.
+_REUSED_GENERATION = {
+    "token_usage": {"input": 0, "output": 0, "total": 0},
+    "cost": 0.0,
+    "evaluation_plan": None,
+    "toxicity_score": None,
+    "toxicity_source": None,
+    "hallucination_score": None,
+    "emoji_score": None,
+    "judge_fallbacks": None,
+    "duration_seconds": None,
+    "artifact_path": None,
+    "deadline": None,  # an absolute time; the old one has likely passed
+    "evaluators": None,
+}
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def thread_config(run_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": run_id}}
+
+
+def checkpointing_enabled() -> bool:
+    enabled = os.getenv("CHECKPOINT_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+    # optional: pip install -e ".[checkpoint]"
+    return enabled and find_spec("langgraph.checkpoint.sqlite") is not None
+
+
+def _checkpoint_time(checkpoint_id: str) -> float:
+    # LangGraph checkpoint ids are UUIDv6, which lead with their timestamp
+    value = uuid.UUID(checkpoint_id).int
+    ticks = ((value >> 80) << 12) | ((value >> 64) & 0xFFF)
+    return ticks / 1e7 - _GREGORIAN_TO_UNIX_SECONDS
+
+
+async def prune_checkpoints(saver, older_than_seconds: float) -> int:
+    """
+    Deletes every run whose latest checkpoint is older than
+    `older_than_seconds`. Returns how many runs were deleted.
+    """
+    await saver.setup()
+    cutoff = time.time() - older_than_seconds
+    # UUIDv6 ids sort by time, so MAX() is the latest checkpoint
+    async with saver.conn.execute(
+        "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+    ) as cursor:
+        rows = await cursor.fetchall()
+    stale = [thread_id for thread_id, latest in rows if _checkpoint_time(latest) < cutoff]
+    for thread_id in stale:
+        await saver.adelete_thread(thread_id)
+    return len(stale)
+
+
+@asynccontextmanager
+async def open_checkpointer(path: Optional[str] = None) -> AsyncIterator[Optional[Any]]:
+    """
+    Yields the SQLite checkpointer for the app's lifetime, or None when
+    checkpointing is off or the package isn't installed. Expired runs are
+    pruned first.
+    """
+    if not checkpointing_enabled():
+        yield None
+        return
+
+    # imported here: the saver pulls in aiosqlite, which only the server needs
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    path = path or os.getenv("CHECKPOINT_PATH", CHECKPOINT_PATH)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        retention = float(os.getenv("CHECKPOINT_RETENTION_SECONDS", CHECKPOINT_RETENTION_SECONDS))
+        pruned = await prune_checkpoints(saver, retention)
+        if pruned:
+            logger.info("pruned %d checkpointed runs older than %.0f s", pruned, retention)
+        yield saver
+
+
+async def resume_run(graph, run_id: str, user_input: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Continues a checkpointed run from its post-`generate` state with
+    `updates` applied (emoji_mode, start_time, ...). Returns the new final
+    state, or None when there's no saved run for `run_id` and `user_input`
+    (the caller then starts a fresh run).
+    """
+    from langgraph.types import Overwrite  # loaded with the graph, not the server
+
+    config = thread_config(run_id)
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values or snapshot.values.get("user_input") != user_input:
+        return None
+
+    values = {
+        **_REUSED_GENERATION,
+        **updates,
+        "node_metrics": Overwrite({"generate": {"reused": True}}),
+        "run_id": run_id,
+    }
+    config = await graph.aupdate_state(config, values, as_node="generate")
+    return await graph.ainvoke(None, config, durability="exit")
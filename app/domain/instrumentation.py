@@ -0,0 +1,171 @@
+# app/domain/instrumentation.py
+
+"""
+Per-node instrumentation for the workflow graph.
+
+`instrument` wraps a node's sync and async implementations. Each run of a
+node records its wall time plus the adapter calls and tokens made inside
+it (see app.adapters.call_metrics), writes that under
+`node_metrics[<node>]` in the state (and so into the artifact), and feeds
+the process-wide MetricsRegistry that backs GET /metrics.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.adapters.call_metrics import NodeCalls, node_scope
+from app.adapters.histogram import Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class MetricsRegistry:
+    """
+    Aggregate per-node latency histograms and call/token/error counters.
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.latency: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+
+    def _histogram(self, node: str) -> Histogram:
+        with self._lock:
+            if node not in self.latency:
+                self.latency[node] = Histogram(self.buckets)
+            return self.latency[node]
+
+    def _add(self, node: str, counter: str, value: float):
+        with self._lock:
+            self.counters[(node, counter)] = self.counters.get((node, counter), 0) + value
+
+    def observe(self, node: str, seconds: float, calls: NodeCalls, error: bool = False):
+        self._histogram(node).observe(seconds)
+        self._add(node, "runs", 1)
+        self._add(node, "adapter_calls", calls.calls)
+        self._add(node, "cache_hits", calls.cache_hits)
+        self._add(node, "cache_misses", calls.cache_misses)
+        self._add(node, "adapter_seconds", calls.adapter_seconds)
+        self._add(node, "input_tokens", calls.input_tokens)
+        self._add(node, "output_tokens", calls.output_tokens)
+        if error:
+            self._add(node, "errors", 1)
+
+    def render(self, extra_histograms: Optional[Dict[str, Tuple[str, Histogram]]] = None) -> str:
+        """
+        Prometheus text exposition of every node metric, plus any
+        `extra_histograms` ({metric name: (help, histogram)}).
+        """
+        lines: List[str] = []
+
+        lines += [
+            "# HELP graph_node_duration_seconds Wall time of one node run.",
+            "# TYPE graph_node_duration_seconds histogram",
+        ]
+        with self._lock:
+            latency = sorted(self.latency.items())
+            counters = dict(self.counters)
+        for node, histogram in latency:
+            lines += _histogram_lines("graph_node_duration_seconds", histogram, f'node="{node}"')
+
+        for counter, help_text in (
+            ("runs", "Node runs."),
+            ("errors", "Node runs that raised."),
+            ("adapter_calls", "API calls made by the node; cache hits are not included."),
+            ("cache_hits", "Adapter calls served from the response cache."),
+            ("cache_misses", "Cacheable adapter calls that had to reach the API."),
+            ("adapter_seconds", "Time the node spent waiting on adapter calls."),
+        ):
+            name = f"graph_node_{counter}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (node, key), value in sorted(counters.items()):
+                if key == counter:
+                    lines.append(f'{name}{{node="{node}"}} {_number(value)}')
+
+        lines += [
+            "# HELP graph_node_tokens_total Tokens used by the node's adapter calls.",
+            "# TYPE graph_node_tokens_total counter",
+        ]
+        for (node, key), value in sorted(counters.items()):
+            if key in ("input_tokens", "output_tokens"):
+                direction = key.removesuffix("_tokens")
+                lines.append(f'graph_node_tokens_total{{node="{node}",direction="{direction}"}} {_number(value)}')
+
+        for name, (help_text, histogram) in (extra_histograms or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            lines += _histogram_lines(name, histogram)
+
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str = "") -> List[str]:
+    snapshot = histogram.snapshot()
+    sep = "," if labels else ""
+    lines = [
+        f'{name}_bucket{{{labels}{sep}le="{bound}"}} {count}'
+        for bound, count in snapshot["buckets"].items()
+    ]
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {_number(snapshot['sum'])}")
+    lines.append(f"{name}_count{suffix} {snapshot['count']}")
+    return lines
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+def _entry(seconds: float, calls: NodeCalls) -> Dict[str, Any]:
+    return {"wall_seconds": round(seconds, 6), **calls.to_dict()}
+
+
+def instrument(
+    name: str,
+    func: Callable[[Dict[str, Any]], Dict[str, Any]],
+    afunc: Callable[[Dict[str, Any]], Any],
+    registry: Optional[MetricsRegistry] = None,
+):
+    """
+    Returns (func, afunc) wrapped with timing and call accounting.
+    """
+    registry = registry or get_metrics_registry()
+
+    def wrapped(state: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with node_scope() as calls:
+            try:
+                update = func(state)
+            except Exception:
+                registry.observe(name, time.perf_counter() - started, calls, error=True)
+                raise
+        seconds = time.perf_counter() - started
+        registry.observe(name, seconds, calls)
+        return {**(update or {}), "node_metrics": {name: _entry(seconds, calls)}}
+
+    async def awrapped(state: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with node_scope() as calls:
+            try:
+                update = await afunc(state)
+            except Exception:
+                registry.observe(name, time.perf_counter() - started, calls, error=True)
+                raise
+        seconds = time.perf_counter() - started
+        registry.observe(name, seconds, calls)
+        return {**(update or {}), "node_metrics": {name: _entry(seconds, calls)}}
+
+    return wrapped, awrapped
@@ -1,17 +1,60 @@
-from typing import Optional, Dict, Any
-from pydantic import BaseModel
+from typing import Annotated, Optional, Dict, Any, List, TypedDict
 
-class GraphState(BaseModel):
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reducer for keys that parallel nodes write at the same time:
+    each node contributes its own sub-keys.
+    """
+    return {**(left or {}), **(right or {})}
+
+
+class WorkflowState(TypedDict, total=False):
+    """
+    Schema the LangGraph workflow runs on.
+
+    Every key is its own channel, so nodes return only the keys they
+    change and LangGraph merges them per key. That is what lets the
+    scoring nodes run in parallel without clobbering each other's writes.
+
+    Reducers, per field:
+    - inputs and per-node outputs have no reducer: each has one writer per
+      step, and LangGraph rejects a second concurrent write instead of
+      silently keeping one of them
+    - node_metrics is written by every node and merged with merge_dicts
+    """
+    # -- inputs, set by the caller -----------------------------------------
+    run_id: str  # checkpoint thread id; follow-ups resume it
     user_input: str
-    llm_output: Optional[str] = None
+    emoji_mode: bool
+    cache_bypass: bool
+    evaluators: Optional[List[str]]  # explicit metric selection; None = policy decides
+    start_time: float
+    deadline: float  # absolute time.time(); adapter calls give up past it
+
+    # -- generate / make_emoji ---------------------------------------------
+    llm_output: str
+    emoji_transformed: bool
+    token_usage: Dict[str, int]
+    cost: float
+
+    # -- plan_evaluation and the scorers -----------------------------------
+    # {"run": [...], "skipped": {metric: reason}, "risk": float}
+    evaluation_plan: Dict[str, Any]
+    toxicity_score: float
+    toxicity_source: str
+    hallucination_score: float
+    emoji_score: float
+    judge_fallbacks: List[str]
+
+    # -- artifact ----------------------------------------------------------
+    duration_seconds: float
+    artifact_path: str
 
-    toxicity_score: Optional[float] = None
-    hallucination_score: Optional[float] = None
-    emoji_score: Optional[int] = None
+    # -- every node --------------------------------------------------------
+    # {node name: {wall_seconds, adapter_calls, cache_hits/misses, input/output_tokens}}
+    node_metrics: Annotated[Dict[str, Dict[str, Any]], merge_dicts]
 
-    token_usage: Optional[Dict[str, Any]] = None
-    cost: Optional[float] = None
 
-    start_time: Optional[float] = None
-    duration_seconds: Optional[float] = None
-    artifact_path: Optional[str] = None
\ No newline at end of file
+# Keys a caller may project a response onto (?fields=...)
+STATE_FIELDS = frozenset(WorkflowState.__annotations__)
@@ -1,39 +1,181 @@
 # app/domain/workflow_graph.py
 
+import os
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
+from app.adapters.openai_adapter import AsyncOpenAIAdapter, OpenAIAdapter
+from app.adapters.rate_limiter import Priority, with_priority
+from app.adapters.resilience import with_deadline
+from app.domain.instrumentation import instrument
+from app.domain.state import WorkflowState
 from app.services.llm_service import LLMService
 from app.services.toxicity_service import ToxicityService
 from app.services.hallucination_service import HallucinationService
 from app.services.artifact_service import ArtifactService
+from app.services.artifact_writer import get_artifact_writer
 from app.services.emoji_service import EmojiService
+from app.services.evaluation_policy import METRICS, EvaluationPolicy
+from app.services.judge_service import EMOJI, HALLUCINATION, JudgeService
+
+# "combined": hallucination (and the LLM emoji score, if enabled) are graded
+# by one structured-output judge call in a "judge" node.
+# "separate": one node and one call per metric.
+JUDGE_MODES = ("combined", "separate")
+
+
+# Queue order at the rate limiter when the OpenAI account runs dry: the
+# user-facing generation first, the judges last. Nodes without Responses
+# API calls (plan_evaluation; toxicity, whose moderation calls aren't
+# rate-limited) aren't listed.
+NODE_PRIORITIES = {
+    "generate": Priority.INTERACTIVE,
+    "make_emoji": Priority.INTERACTIVE,
+    "judge": Priority.EVALUATOR,
+    "hallucination": Priority.EVALUATOR,
+    "score_emoji": Priority.EVALUATOR,
+}
+
+
+_services: Optional[Dict[str, Any]] = None
+_services_lock = threading.Lock()
+
+
+def default_services() -> Dict[str, Any]:
+    """
+    The services behind get_graph(), built on first use rather than at
+    import. One adapter pair serves all of them; both sit on the
+    registry's shared pool and only open a client on their first call.
+    """
+    global _services
+    with _services_lock:
+        if _services is None:
+            adapter = OpenAIAdapter()
+            async_adapter = AsyncOpenAIAdapter()
+            _services = {
+                "llm": LLMService(adapter=adapter, async_adapter=async_adapter),
+                "tox": ToxicityService(adapter=adapter, async_adapter=async_adapter),
+                "hal": HallucinationService(adapter=adapter, async_adapter=async_adapter),
+                "art": ArtifactService(writer=get_artifact_writer()),
+                "emoji": EmojiService(adapter=adapter, async_adapter=async_adapter),
+            }
+        return _services
+
+
+def _node(name: str, func, afunc) -> RunnableLambda:
+    func, afunc = with_priority(NODE_PRIORITIES.get(name, Priority.DEFAULT), func, afunc)
+    func, afunc = instrument(name, *with_deadline(func, afunc))
+    return RunnableLambda(func, afunc=afunc, name=name)
 
-_llm = LLMService()
-_tox = ToxicityService()
-_hal = HallucinationService()
-_art = ArtifactService()
-_emoji = EmojiService()
 
+def build_graph(
+    llm: Optional[LLMService] = None,
+    tox: Optional[ToxicityService] = None,
+    hal: Optional[HallucinationService] = None,
+    art: Optional[ArtifactService] = None,
+    emoji: Optional[EmojiService] = None,
+    judge: Optional[JudgeService] = None,
+    judge_mode: Optional[str] = None,
+    checkpointer=None,
+    evaluators: Optional[Iterable[str]] = None,
+    policy: Optional[EvaluationPolicy] = None,
+):
+    """
+    Compiles the workflow. `evaluators` limits the graph to those metrics
+    (default: all of METRICS); within it, `policy` picks per run which of
+    them are actually scored.
+    """
+    if None in (llm, tox, hal, art, emoji):
+        defaults = default_services()
+        llm = llm or defaults["llm"]
+        tox = tox or defaults["tox"]
+        hal = hal or defaults["hal"]
+        art = art or defaults["art"]
+        emoji = emoji or defaults["emoji"]
+    policy = policy or EvaluationPolicy()
+    metrics = tuple(m for m in METRICS if evaluators is None or m in evaluators)
 
-def build_graph():
-    workflow = StateGraph(dict)
+    judge_mode = judge_mode or os.getenv("EVAL_JUDGE", "combined")
+    if judge_mode not in JUDGE_MODES:
+        raise ValueError(f"judge_mode must be one of {JUDGE_MODES}, got {judge_mode!r}")
 
-    #nodeset
-    workflow.add_node("generate", _llm.generate)
-    workflow.add_node("make_emoji", _emoji.make_emoji)
-    workflow.add_node("score_emoji", _emoji.score_emoji)
-    workflow.add_node("toxicity", _tox.score_toxicity)
-    workflow.add_node("hallucination", _hal.score_hallucination)
-    workflow.add_node("artifact", _art.save_artifact)
+    if judge is None and judge_mode == "combined":
+        # the local emoji scorer needs no call; only an LLM one joins the judge
+        judged = [HALLUCINATION] if "hallucination" in metrics else []
+        if emoji.scorer == "llm" and "emoji" in metrics:
+            judged.append(EMOJI)
+        if judged:
+            judge = JudgeService(hal.adapter, hal.async_adapter, evaluators=judged)
+
+    # metric -> the node that scores it
+    judge_keys = judge.state_keys if judge is not None else ()
+    metric_nodes = {
+        "toxicity": "toxicity",
+        "hallucination": "judge" if "hallucination_score" in judge_keys else "hallucination",
+        "emoji": "judge" if "emoji_score" in judge_keys else "score_emoji",
+    }
+    scoring_nodes = list(dict.fromkeys(metric_nodes[m] for m in metrics))
+
+    workflow = StateGraph(WorkflowState)
+
+    def add(name: str, func, afunc):
+        workflow.add_node(name, _node(name, func, afunc))
+
+    #nodeset; each node carries a sync and an async implementation so the
+    # same compiled graph serves both invoke() and ainvoke(), and is
+    # instrumented (wall time, adapter calls, tokens -> node_metrics)
+    add("generate", llm.generate, llm.agenerate)
+    add("make_emoji", emoji.make_emoji, emoji.amake_emoji)
+    add("plan_evaluation", *policy.plan_node(metrics))
+    if "toxicity" in scoring_nodes:
+        add("toxicity", tox.score_toxicity, tox.ascore_toxicity)
+    if "score_emoji" in scoring_nodes:
+        add("score_emoji", emoji.score_emoji, emoji.ascore_emoji)
+    if "hallucination" in scoring_nodes:
+        add("hallucination", hal.score_hallucination, hal.ascore_hallucination)
+    if "judge" in scoring_nodes:
+        add("judge", judge.judge, judge.ajudge)
+    add("artifact", art.save_artifact, art.asave_artifact)
+
+    def after_generate(state) -> str:
+        return "make_emoji" if state.get("emoji_mode") else "plan_evaluation"
+
+    def planned(state) -> List[str]:
+        # the scorers chosen for this run fan out in one step; with none
+        # chosen the run goes straight to its artifact
+        run = state.get("evaluation_plan", {}).get("run", metrics)
+        nodes = list(dict.fromkeys(metric_nodes[m] for m in run if m in metrics))
+        return nodes or ["artifact"]
 
     workflow.set_entry_point("generate")
 
-    # edgeset; Main linear chain
-    workflow.add_edge("generate", "make_emoji")
-    workflow.add_edge("make_emoji", "score_emoji")
-    workflow.add_edge("score_emoji", "toxicity")
-    workflow.add_edge("toxicity", "hallucination")
-    workflow.add_edge("hallucination", "artifact")
+    # edgeset; generate -> (make_emoji) -> plan_evaluation, then
+    # fan-out/fan-in over the planned scorers
+    workflow.add_conditional_edges("generate", after_generate, ["make_emoji", "plan_evaluation"])
+    workflow.add_edge("make_emoji", "plan_evaluation")
+    workflow.add_conditional_edges("plan_evaluation", planned, scoring_nodes + ["artifact"])
+    for node in scoring_nodes:
+        workflow.add_edge(node, "artifact")
     workflow.add_edge("artifact", END)
 
-    return workflow.compile()
\ No newline at end of file
+    return workflow.compile(checkpointer=checkpointer)
+
+
+_variants: Dict[Tuple[FrozenSet[str], int], Any] = {}
+_variants_lock = threading.Lock()
+
+
+def get_graph(evaluators: Optional[Iterable[str]] = None, checkpointer=None):
+    """
+    Compiled graph over the default services for one evaluator set,
+    compiled on first use and reused after that, so per-request evaluator
+    selection costs no compile.
+    """
+    key = (frozenset(METRICS if evaluators is None else evaluators), id(checkpointer))
+    with _variants_lock:
+        if key not in _variants:
+            _variants[key] = build_graph(evaluators=key[0], checkpointer=checkpointer)
+        return _variants[key]
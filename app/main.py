@@ -2,6 +2,8 @@
 
 from pprint import pprint
 
+from dotenv import load_dotenv
+
 from app.services.llm_service import LLMService
 from app.domain.workflow_graph import build_graph
 
@@ -13,6 +15,8 @@ def run_example():
         Right-click -> Run 'main'
     """
 
+    load_dotenv()
+
     # Build the graph
     graph = build_graph()
     print(graph.nodes)
@@ -3,28 +3,55 @@
 import os
 import json
 import time
+import asyncio
+import itertools
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from app.services.artifact_writer import ArtifactWriter
+from app.services.history_log import history_path
+from app.services.history_store import HistoryStore
+
+# Monotonic per-process run counter; with the pid it keeps artifact
+# filenames unique even when several runs land in the same second.
+_run_ids = itertools.count(1)
+
+
+def _run_cache(node_metrics: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, int]:
+    # this run's own response-cache use, summed over its nodes
+    metrics = (node_metrics or {}).values()
+    return {
+        "hits": sum(m.get("cache_hits", 0) for m in metrics),
+        "misses": sum(m.get("cache_misses", 0) for m in metrics),
+    }
 
 
 # Saves per-run artifacts and appends run history.
+# With a writer, the file I/O is handed to its background thread;
+# without one, everything (including the optional history store) is
+# written inline.
 class ArtifactService:
-    def __init__(self):
-        base_dir = "app/storage"
-        self.artifact_dir = os.path.join(base_dir, "artifacts")
-        self.log_dir = os.path.join(base_dir, "logs")
+    def __init__(
+        self,
+        writer: Optional[ArtifactWriter] = None,
+        history_store: Optional[HistoryStore] = None,
+    ):
+        self.writer = writer
+        self.history_store = history_store
 
-        os.makedirs(self.artifact_dir, exist_ok=True)
-        os.makedirs(self.log_dir, exist_ok=True)
+        self.artifact_dir = os.getenv("ARTIFACT_DIR", "app/storage/artifacts")
+        # the same log the history store backfills from and the dashboard tails
+        self.history_path = history_path()
 
-        self.history_path = os.path.join(self.log_dir, "history.jsonl")
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(self.history_path) or ".", exist_ok=True)
 
     def save_artifact(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         - computes duration
         - writes JSON artifact
         - appends JSONL log
-        - returns updated state
+        - returns the artifact path and duration
         """
 
         start = state.get("start_time", time.time())
@@ -32,33 +59,55 @@ class ArtifactService:
         duration = end - start
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"run_{timestamp}.json"
+        filename = f"run_{timestamp}_{os.getpid()}_{next(_run_ids):06d}.json"
         artifact_path = os.path.join(self.artifact_dir, filename)
 
         artifact = {
             "timestamp": timestamp,
+            "run_id": state.get("run_id"),
             "input": state.get("user_input"),
             "output": state.get("llm_output"),
             "toxicity_score": state.get("toxicity_score"),
+            "toxicity_source": state.get("toxicity_source"),
             "hallucination_score": state.get("hallucination_score"),
             "emoji_score": state.get("emoji_score"),
+            "judge_fallbacks": state.get("judge_fallbacks"),
+            "evaluation_plan": state.get("evaluation_plan"),
             "token_usage": state.get("token_usage"),
             "cost": state.get("cost"),
             "duration_seconds": round(duration, 4),
+            "node_metrics": state.get("node_metrics"),
+            "cache": _run_cache(state.get("node_metrics")),
         }
 
-        # Write JSON artifact file
-        with open(artifact_path, "w") as f:
-            json.dump(artifact, f, indent=4)
-
-        # Append to history.jsonl
         history_entry = {**artifact, "artifact_path": artifact_path}
 
-        with open(self.history_path, "a") as f:
-            f.write(json.dumps(history_entry) + "\n")
+        if self.writer is not None:
+            # Enqueue only; the writer group-commits the history lines
+            self.writer.submit(artifact_path, artifact, self.history_path, history_entry)
+        else:
+            # Write JSON artifact file
+            with open(artifact_path, "w") as f:
+                json.dump(artifact, f, indent=4)
 
-        # Update state for downstream nodes
-        state["artifact_path"] = artifact_path
-        state["duration_seconds"] = round(duration, 4)
+            # Append to history.jsonl
+            with open(self.history_path, "a") as f:
+                f.write(json.dumps(history_entry) + "\n")
 
-        return state
\ No newline at end of file
+            if self.history_store is not None:
+                self.history_store.insert(history_entry)
+
+        return {
+            "artifact_path": artifact_path,
+            "duration_seconds": round(duration, 4),
+        }
+
+    async def asave_artifact(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async variant of save_artifact. With a writer, save_artifact only
+        enqueues; otherwise the file I/O runs in a worker thread so it
+        doesn't block the event loop.
+        """
+        if self.writer is not None:
+            return self.save_artifact(state)
+        return await asyncio.to_thread(self.save_artifact, state)
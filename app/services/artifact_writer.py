@@ -0,0 +1,228 @@
+# app/services/artifact_writer.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.history_log import SegmentedHistoryLog
+from app.services.history_store import HistoryStore, get_history_store
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("never", "batch", "always")
+
+_STOP = object()
+_STORE = "<history store>"  # marks the store insert done in a batch's progress
+
+
+class ArtifactWriter:
+    """
+    Background writer that takes artifact I/O off the request path.
+
+    Nodes enqueue (artifact file, history line) records; a dedicated thread
+    drains the queue in batches, writes each artifact file and group-commits
+    all history lines of a batch with one append per history file. Each
+    history file is a SegmentedHistoryLog, so appends rotate and compress
+    it as it grows. When a history store is attached, the batch is
+    inserted there in one transaction as well.
+
+    fsync policy:
+    - "never":  leave durability to the OS page cache
+    - "batch":  one fsync per history group commit (default)
+    - "always": also fsync every artifact file
+
+    A batch that fails is logged and retried once after `retry_delay`
+    seconds, resuming after the steps that already went through, so the
+    retry doesn't append history lines twice. If the retry fails too, the
+    batch is dropped and counted in `records_dropped`.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 256,
+        fsync: str = "batch",
+        history_store: Optional[HistoryStore] = None,
+        retry_delay: float = 0.5,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.history_store = history_store
+        self.retry_delay = retry_delay
+
+        self._logs: Dict[str, SegmentedHistoryLog] = {}
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.records_written = 0
+        self.errors = 0
+        self.records_dropped = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, history_store: Optional[HistoryStore] = None) -> "ArtifactWriter":
+        return cls(
+            max_batch=int(os.getenv("ARTIFACT_WRITER_MAX_BATCH", 256)),
+            fsync=os.getenv("ARTIFACT_FSYNC", "batch"),
+            history_store=history_store,
+        )
+
+    # ---------------------------------------------------------
+    # Producer side
+    # ---------------------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="artifact-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(
+        self,
+        artifact_path: str,
+        artifact: Dict[str, Any],
+        history_path: str,
+        history_entry: Dict[str, Any],
+    ):
+        self.start()
+        self._queue.put((artifact_path, artifact, str(history_path), history_entry))
+
+    def flush(self):
+        """
+        Blocks until every record submitted so far is on disk.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Flushes pending records and stops the writer thread.
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    # ---------------------------------------------------------
+    # Writer thread
+    # ---------------------------------------------------------
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+
+            batch = [first]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+    def _write_with_retry(self, batch: List[Tuple[str, Dict[str, Any], str, Dict[str, Any]]]):
+        done: Set[str] = set()
+        for attempt in (1, 2):
+            try:
+                self._write_batch(batch, done)
+                return
+            except Exception:
+                self.errors += 1
+                logger.exception("artifact batch of %d records failed (attempt %d of 2)", len(batch), attempt)
+            if attempt == 1:
+                time.sleep(self.retry_delay)
+        self.records_dropped += len(batch)
+
+    def _write_batch(self, batch: List[Tuple[str, Dict[str, Any], str, Dict[str, Any]]], done: Set[str]):
+        """Writes a batch; `done` collects the history files and store already committed."""
+        started = time.perf_counter()
+
+        lines_by_history = defaultdict(list)
+        for artifact_path, artifact, history_path, history_entry in batch:
+            with open(artifact_path, "w") as f:
+                json.dump(artifact, f, indent=4)
+                if self.fsync == "always":
+                    f.flush()
+                    os.fsync(f.fileno())
+            lines_by_history[history_path].append(json.dumps(history_entry) + "\n")
+
+        # group commit: one write (and at most one fsync) per history file
+        for history_path, lines in lines_by_history.items():
+            if history_path in done:
+                continue
+            log = self._logs.get(history_path)
+            if log is None:
+                log = self._logs[history_path] = SegmentedHistoryLog(history_path)
+            log.append(lines, fsync=self.fsync != "never")
+            done.add(history_path)
+
+        if self.history_store is not None and _STORE not in done:
+            self.history_store.insert_many(entry for _, _, _, entry in batch)
+            done.add(_STORE)
+
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.records_written += len(batch)
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self._total_flush_seconds += elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "records_written": self.records_written,
+            "errors": self.errors,
+            "records_dropped": self.records_dropped,
+            "fsync": self.fsync,
+            "last_flush_seconds": round(self.last_flush_seconds, 6),
+            "max_flush_seconds": round(self.max_flush_seconds, 6),
+            "avg_flush_seconds": round(self._total_flush_seconds / self.batches, 6)
+            if self.batches else 0.0,
+        }
+
+
+_writer: Optional[ArtifactWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_artifact_writer() -> ArtifactWriter:
+    """
+    Returns the process-wide writer, configured from the environment.
+    Pending records are flushed at interpreter exit.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ArtifactWriter.from_env(history_store=get_history_store())
+            atexit.register(_writer.close)
+        return _writer
@@ -0,0 +1,117 @@
+# app/services/emoji_scoring.py
+
+"""
+Local, deterministic emoji scoring.
+
+Counts emoji as grapheme clusters rather than code points, so a family
+(👨‍👩‍👧), a thumbs-up with a skin tone (👍🏽), a flag (🇯🇵, 🏴 England) or
+a keycap (#️⃣) each count as one symbol, the same way a reader sees them.
+
+Presentation follows the text as written: symbols that render as text by
+default (©, ®, ™, arrows, most of U+2600–27BF) count only with the emoji
+selector U+FE0F, and anything followed by the text selector U+FE0E does
+not count.
+
+The score is the fraction of visible symbols that are emoji:
+
+    emoji clusters / (non-whitespace symbols)
+"""
+
+import bisect
+import re
+from typing import List, Sequence
+
+# Extended_Pictographic, condensed to the ranges that render as emoji,
+# split by default presentation (Emoji_Presentation).
+_EMOJI_DEFAULT = (
+    "\u231A\u231B\u23E9-\u23EC\u23F0\u23F3\u25FD\u25FE\u2614\u2615"
+    "\u2648-\u2653\u267F\u2693\u26A1\u26AA\u26AB\u26BD\u26BE\u26C4\u26C5"
+    "\u26CE\u26D4\u26EA\u26F2\u26F3\u26F5\u26FA\u26FD\u2705\u270A\u270B"
+    "\u2728\u274C\u274E\u2753-\u2755\u2757\u2795-\u2797\u27B0\u27BF"
+    "\u2B1B\u2B1C\u2B50\u2B55"
+    "\U0001F000-\U0001F1E5\U0001F200-\U0001F3FA\U0001F400-\U0001FAFF"
+)
+_TEXT_DEFAULT = (
+    "\u00A9\u00AE\u203C\u2049\u2122\u2139\u2194-\u2199\u21A9\u21AA"
+    "\u2328\u23CF\u23ED-\u23EF\u23F1\u23F2\u23F8-\u23FA\u24C2"
+    "\u25AA\u25AB\u25B6\u25C0\u25FB\u25FC\u2600-\u27BF\u2934\u2935"
+    "\u2B05-\u2B07\u3030\u303D\u3297\u3299"
+)
+_SKIN_TONE = "\U0001F3FB-\U0001F3FF"
+_TEXT_STYLE = "\uFE0E"
+_EMOJI_STYLE = "\uFE0F"
+_ZWJ = "\u200D"
+
+# an emoji-default symbol unless restyled as text, or a text-default one
+# restyled as emoji
+_ELEMENT = (
+    f"(?:[{_EMOJI_DEFAULT}](?!{_TEXT_STYLE}){_EMOJI_STYLE}?|[{_TEXT_DEFAULT}]{_EMOJI_STYLE})"
+    f"[{_SKIN_TONE}]?"
+)
+# after a ZWJ the sequence is already an emoji, so the selector is optional
+_JOINED = f"[{_EMOJI_DEFAULT}{_TEXT_DEFAULT}]{_EMOJI_STYLE}?[{_SKIN_TONE}]?"
+
+EMOJI_CLUSTER = re.compile(
+    "|".join([
+        # subdivision flags: black flag + tag letters + cancel tag
+        "\U0001F3F4[\U000E0020-\U000E007E]+\U000E007F",
+        # country flags: pair of regional indicators
+        "[\U0001F1E6-\U0001F1FF]{2}",
+        # keycaps: 1️⃣ #️⃣ *️⃣
+        "[0-9#*]\uFE0F?\u20E3",
+        # ZWJ sequences (also matches a single element)
+        f"{_ELEMENT}(?:{_ZWJ}{_JOINED})*",
+        # lone skin-tone swatch
+        f"[{_SKIN_TONE}]",
+    ])
+)
+
+_SEPARATOR = "\x00"  # never part of an emoji cluster
+
+
+def _ratio(visible_chars: int, emoji_chars: int, emoji_clusters: int) -> float:
+    # each cluster spans several code points but reads as one symbol
+    symbols = visible_chars - emoji_chars + emoji_clusters
+    return emoji_clusters / symbols if symbols else 0.0
+
+
+def _visible_chars(text: str) -> int:
+    return len("".join(text.split()))
+
+
+def emoji_ratio(text: str) -> float:
+    """
+    Fraction (0–1) of the visible symbols in `text` that are emoji.
+    """
+    if not text:
+        return 0.0
+    clusters = EMOJI_CLUSTER.findall(text)
+    return _ratio(_visible_chars(text), sum(map(len, clusters)), len(clusters))
+
+
+def emoji_ratios(texts: Sequence[str]) -> List[float]:
+    """
+    Batch form of emoji_ratio: the texts are joined into one buffer and
+    scanned with a single regex pass; matches are assigned back to their
+    text by offset.
+    """
+    if not texts:
+        return []
+
+    starts, offset = [], 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + len(_SEPARATOR)
+    buffer = _SEPARATOR.join(texts)
+
+    clusters = [0] * len(texts)
+    chars = [0] * len(texts)
+    for match in EMOJI_CLUSTER.finditer(buffer):
+        i = bisect.bisect_right(starts, match.start()) - 1
+        clusters[i] += 1
+        chars[i] += match.end() - match.start()
+
+    return [
+        _ratio(_visible_chars(text), chars[i], clusters[i])
+        for i, text in enumerate(texts)
+    ]
@@ -1,31 +1,65 @@
 # app/services/emoji_service.py
 
+import os
 from typing import Dict, Any, Optional
-from app.adapters.openai_adapter import OpenAIAdapter
+from app.adapters.openai_adapter import AsyncOpenAIAdapter, OpenAIAdapter
+from app.services.emoji_scoring import emoji_ratio
+
+SCORERS = ("local", "llm")
 
 
 class EmojiService:
     """
     Handles:
     - Transforming the text to make it have more emojis (optional).
-    - Scoring emojiness (always).
+    - Scoring emojiness (always). The default "local" scorer counts emoji
+      grapheme clusters in-process; the "llm" scorer asks the model and is
+      cached unless the state sets cache_bypass. Pick one with the
+      scorer argument or EMOJI_SCORER. The transform is never cached.
     """
 
-    def __init__(self, adapter: Optional[OpenAIAdapter] = None):
+    def __init__(
+        self,
+        adapter: Optional[OpenAIAdapter] = None,
+        async_adapter: Optional[AsyncOpenAIAdapter] = None,
+        scorer: Optional[str] = None,
+    ):
         self.adapter = adapter or OpenAIAdapter()
+        self.async_adapter = async_adapter or AsyncOpenAIAdapter()
+
+        self.scorer = scorer or os.getenv("EMOJI_SCORER", "local")
+        if self.scorer not in SCORERS:
+            raise ValueError(f"scorer must be one of {SCORERS}, got {self.scorer!r}")
 
     # ---------------------------------------------------------
     # 1) Make the text emojified ONLY if emoji_mode==True
     # ---------------------------------------------------------
     def make_emoji(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._make_emoji_prompt(state)
+        if prompt is None:
+            return {}
+
+        resp = self.adapter.generate_text(prompt)
+        return self._make_emoji_update(resp)
+
+    async def amake_emoji(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = self._make_emoji_prompt(state)
+        if prompt is None:
+            return {}
+
+        resp = await self.async_adapter.generate_text(prompt)
+        return self._make_emoji_update(resp)
+
+    @staticmethod
+    def _make_emoji_prompt(state: Dict[str, Any]) -> Optional[str]:
         if not state.get("emoji_mode"):
-            return state  # skip if not requested
+            return None  # skip if not requested
 
         output = state.get("llm_output", "")
         if not output:
-            return state
+            return None
 
-        prompt = f"""
+        return f"""
 Your job is to take the following output and emojify it.
 
 Rules:
@@ -37,13 +71,10 @@ Text:
 \"\"\"{output}\"\"\"
 """
 
-        resp = self.adapter.generate_text(prompt)
+    @staticmethod
+    def _make_emoji_update(resp: Dict[str, Any]) -> Dict[str, Any]:
         new_text = resp["text"].strip()
-
-        state["llm_output"] = new_text
-        state["emoji_transformed"] = True
-
-        return state
+        return {"llm_output": new_text, "emoji_transformed": True}
 
     # ---------------------------------------------------------
     # 2) Score emojiness for every output (0–1 float)
@@ -52,23 +83,48 @@ Text:
         output = state.get("llm_output", "")
 
         if not output:
-            state["emoji_score"] = 0.0
-            return state
+            return {"emoji_score": 0.0}
 
-        prompt = f"""
-Rate how emoji-ey the following text is. What percentage roughly of the input is Emoji?
-Respond ONLY with a FLOAT from 0 to 1.
+        if self.scorer == "local":
+            return {"emoji_score": round(emoji_ratio(output), 3)}
 
-Text:
-\"\"\"{output}\"\"\"
-"""
+        try:
+            resp = self.adapter.generate_text(
+                self._score_prompt(output), use_cache=not state.get("cache_bypass")
+            )
+            raw = resp["text"].strip()
+            score = float(raw)
+        except Exception:
+            score = 0.0
+
+        return {"emoji_score": round(score, 3)}
+
+    async def ascore_emoji(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        output = state.get("llm_output", "")
+
+        if not output:
+            return {"emoji_score": 0.0}
+
+        if self.scorer == "local":
+            return {"emoji_score": round(emoji_ratio(output), 3)}
 
         try:
-            resp = self.adapter.generate_text(prompt)
+            resp = await self.async_adapter.generate_text(
+                self._score_prompt(output), use_cache=not state.get("cache_bypass")
+            )
             raw = resp["text"].strip()
             score = float(raw)
         except Exception:
             score = 0.0
 
-        state["emoji_score"] = round(score, 3)
-        return state
\ No newline at end of file
+        return {"emoji_score": round(score, 3)}
+
+    @staticmethod
+    def _score_prompt(output: str) -> str:
+        return f"""
+Rate how emoji-ey the following text is. What percentage roughly of the input is Emoji?
+Respond ONLY with a FLOAT from 0 to 1.
+
+Text:
+\"\"\"{output}\"\"\"
+"""
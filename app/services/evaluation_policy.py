@@ -0,0 +1,148 @@
+# app/services/evaluation_policy.py
+
+import os
+import random
+import re
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from pydantic import BaseModel
+
+from app.services.toxicity_prefilter import ToxicityPrefilter, get_toxicity_prefilter
+
+# The metrics a run can be scored on; RunRequest.evaluators picks from these
+METRICS = ("toxicity", "hallucination", "emoji")
+
+_FACT_CUES = re.compile(
+    r"\b(who|when|where|which|what year|how many|how much|capital|president|born|founded|population)\b",
+    re.IGNORECASE,
+)
+_TOKEN = re.compile(r"[A-Za-z0-9][\w'-]*")
+
+
+def factual_risk(user_input: str, output: str) -> float:
+    """
+    Cheap 0-1 hallucination risk: the share of tokens that look like
+    factual claims (numbers, capitalized names), or 0.5 when the prompt
+    asks for a specific fact.
+    """
+    tokens = _TOKEN.findall(output or "")
+    if not tokens:
+        return 0.0
+    claims = sum(1 for i, t in enumerate(tokens) if t[0].isdigit() or (i > 0 and t[0].isupper()))
+    density = min(1.0, 4 * claims / len(tokens))
+    cue = 0.5 if _FACT_CUES.search(user_input or "") else 0.0
+    return max(density, cue)
+
+
+def _rates(value: str) -> Dict[str, float]:
+    # "hallucination=0.1,emoji=0.5"
+    rates = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        metric, _, rate = part.partition("=")
+        rates[metric.strip()] = float(rate)
+    return rates
+
+
+class EvaluationPolicyConfig(BaseModel):
+    """
+    Which metrics a run is scored on, overridable via EVAL_* env vars.
+
+    - sample_rates: share of runs each metric is scored on (default 1.0)
+    - risk_gated: metrics that only run when the run's risk signal
+      reaches `risk_threshold`
+    """
+    sample_rates: Dict[str, float] = {}
+    risk_gated: FrozenSet[str] = frozenset()
+    risk_threshold: float = 0.3
+
+    @classmethod
+    def from_env(cls) -> "EvaluationPolicyConfig":
+        defaults = cls()
+        gated = os.getenv("EVAL_RISK_GATED", "")
+        return cls(
+            sample_rates=_rates(os.getenv("EVAL_SAMPLE_RATES", "")),
+            risk_gated=frozenset(m.strip() for m in gated.split(",") if m.strip()),
+            risk_threshold=float(os.getenv("EVAL_RISK_THRESHOLD", defaults.risk_threshold)),
+        )
+
+
+class EvaluationPolicy:
+    """
+    Decides, per run, which metrics get scored.
+
+    Explicitly requested metrics (state["evaluators"]) always run. Every
+    other metric is subject to its sample rate, then, if risk-gated, to the
+    run's risk signal: the larger of the local toxicity pre-classifier's
+    score and `factual_risk`. Both are computed in-process, so planning
+    costs no API calls.
+
+    Sampling is seeded by run_id, so replaying a run picks the same
+    metrics. The plan is written to state["evaluation_plan"] and the graph
+    routes on it.
+    """
+
+    def __init__(
+        self,
+        config: Optional[EvaluationPolicyConfig] = None,
+        prefilter: Optional[ToxicityPrefilter] = None,
+    ):
+        self.config = config or EvaluationPolicyConfig.from_env()
+        self.prefilter = prefilter or get_toxicity_prefilter()
+
+    def risk(self, state: Dict[str, Any]) -> float:
+        output = state.get("llm_output", "")
+        toxicity, _ = self.prefilter.score(output)
+        return max(toxicity, factual_risk(state.get("user_input", ""), output))
+
+    def _sampled(self, metric: str, run_id: Optional[str]) -> bool:
+        rate = self.config.sample_rates.get(metric, 1.0)
+        if rate >= 1.0:
+            return True
+        rng = random.Random(f"{run_id}:{metric}") if run_id else random
+        return rng.random() < rate
+
+    def plan(self, state: Dict[str, Any], available: Iterable[str] = METRICS) -> Dict[str, Any]:
+        requested = state.get("evaluators")
+        run, skipped = [], {}
+        risk = None
+
+        for metric in available:
+            if requested is not None:
+                if metric in requested:
+                    run.append(metric)
+                else:
+                    skipped[metric] = "not_requested"
+                continue
+
+            if not self._sampled(metric, state.get("run_id")):
+                skipped[metric] = "sampled_out"
+                continue
+
+            if metric in self.config.risk_gated:
+                if risk is None:
+                    risk = self.risk(state)
+                if risk < self.config.risk_threshold:
+                    skipped[metric] = "low_risk"
+                    continue
+
+            run.append(metric)
+
+        plan = {"run": run, "skipped": skipped}
+        if risk is not None:
+            plan["risk"] = round(risk, 4)
+        return plan
+
+    # ---------------------------------------------------------
+    # LangGraph node
+    # ---------------------------------------------------------
+    def plan_node(self, available: Iterable[str] = METRICS):
+        """Returns the (func, afunc) pair for the graph's planning node."""
+        available = tuple(available)
+
+        def plan(state: Dict[str, Any]) -> Dict[str, Any]:
+            return {"evaluation_plan": self.plan(state, available)}
+
+        async def aplan(state: Dict[str, Any]) -> Dict[str, Any]:
+            return plan(state)
+
+        return plan, aplan
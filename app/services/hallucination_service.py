@@ -1,7 +1,7 @@
 # app/services/hallucination_service.py
 
 from typing import Dict, Any, Optional
-from app.adapters.openai_adapter import OpenAIAdapter
+from app.adapters.openai_adapter import AsyncOpenAIAdapter, OpenAIAdapter
 
 
 class HallucinationService:
@@ -9,10 +9,16 @@ class HallucinationService:
     Computes a hallucination score (0–1) by prompting the LLM to evaluate
     whether its own answer is factual or unsupported.
     This replaces hallucination_score_node from the original code.
+    Judge responses are cached unless the state sets cache_bypass.
     """
 
-    def __init__(self, adapter: Optional[OpenAIAdapter] = None):
+    def __init__(
+        self,
+        adapter: Optional[OpenAIAdapter] = None,
+        async_adapter: Optional[AsyncOpenAIAdapter] = None,
+    ):
         self.adapter = adapter or OpenAIAdapter()
+        self.async_adapter = async_adapter or AsyncOpenAIAdapter()
 
     def score_hallucination(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -23,10 +29,44 @@ class HallucinationService:
         user = state.get("user_input", "")
 
         if not output:
-            state["hallucination_score"] = 0.0
-            return state
+            return {"hallucination_score": 0.0}
 
-        prompt = f"""
+        try:
+            resp = self.adapter.generate_text(
+                self._prompt(user, output), use_cache=not state.get("cache_bypass")
+            )
+            score_raw = resp["text"].strip()
+            score = float(score_raw)
+        except Exception:
+            score = 0.5  # fallback if model responds strangely
+
+        return {"hallucination_score": round(score, 3)}
+
+    async def ascore_hallucination(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async variant of score_hallucination.
+        """
+
+        output = state.get("llm_output", "")
+        user = state.get("user_input", "")
+
+        if not output:
+            return {"hallucination_score": 0.0}
+
+        try:
+            resp = await self.async_adapter.generate_text(
+                self._prompt(user, output), use_cache=not state.get("cache_bypass")
+            )
+            score_raw = resp["text"].strip()
+            score = float(score_raw)
+        except Exception:
+            score = 0.5  # fallback if model responds strangely
+
+        return {"hallucination_score": round(score, 3)}
+
+    @staticmethod
+    def _prompt(user: str, output: str) -> str:
+        return f"""
 Evaluate whether the model's response contains hallucinations.
 
 Consider two types of hallucinations:
@@ -44,13 +84,3 @@ Respond ONLY with a number 0–1:
   0 = fully factual / properly handled
   1 = strongly hallucinated
 """
-
-        try:
-            resp = self.adapter.generate_text(prompt)
-            score_raw = resp["text"].strip()
-            score = float(score_raw)
-        except Exception:
-            score = 0.5  # fallback if model responds strangely
-
-        state["hallucination_score"] = round(score, 3)
-        return state
\ No newline at end of file
@@ -0,0 +1,440 @@
+# app/services/history_log.py
+
+"""
+Segmented run-history log.
+
+The active segment is the familiar history.jsonl. Once it passes a size
+or age bound it is rotated into segments/ and compressed (gzip, or zstd
+when the `zstandard` package is installed). A compaction job turns cold
+segments into Parquet files partitioned by day:
+
+    app/storage/logs/
+        history.jsonl                          <- active segment
+        segments/history-<ns>.jsonl.gz         <- cold, compressed
+        parquet/day=2025-12-06/history-<ns>.parquet
+
+`iter_records` walks all three tiers as a generator, so memory stays flat
+no matter how long the history is. `HistoryTail` follows just the newest
+records of the active segment, for dashboards.
+
+Run the compaction job with:
+
+    python -m app.services.history_log compact [--older-than-hours N]
+"""
+
+import argparse
+import gzip
+import importlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+# Flat columnar layout used for the Parquet tier. The typed columns serve
+# analytics scans; `record` keeps the whole JSON record, so compaction
+# loses nothing (run_id, cache, node_metrics, evaluation_plan, ...).
+PARQUET_COLUMNS = (
+    "timestamp",
+    "input",
+    "output",
+    "toxicity_score",
+    "hallucination_score",
+    "emoji_score",
+    "cost",
+    "duration_seconds",
+    "artifact_path",
+    "input_tokens",
+    "output_tokens",
+    "total_tokens",
+    "record",
+)
+_RECORD_COLUMNS = PARQUET_COLUMNS[:9]  # stored as-is; token_usage is flattened
+
+DEFAULT_HISTORY_PATH = "app/storage/logs/history.jsonl"
+
+
+def history_path() -> str:
+    """The active history segment runs are logged to (HISTORY_PATH)."""
+    return os.getenv("HISTORY_PATH", DEFAULT_HISTORY_PATH)
+
+
+def _require(module: str, extra: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise RuntimeError(
+            f"'{module}' is required for {extra}; install it with `pip install {module}`"
+        ) from e
+
+
+def _day_of(record: Dict[str, Any]) -> str:
+    try:
+        return datetime.strptime(record["timestamp"], "%Y%m%d_%H%M%S").strftime("%Y-%m-%d")
+    except (KeyError, TypeError, ValueError):
+        return "unknown"
+
+
+def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+    usage = record.get("token_usage") or {}
+    row = {column: record.get(column) for column in _RECORD_COLUMNS}
+    row["input_tokens"] = usage.get("input")
+    row["output_tokens"] = usage.get("output")
+    row["total_tokens"] = usage.get("total")
+    row["record"] = json.dumps(record, ensure_ascii=False)
+    return row
+
+
+def _unflatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    if row.get("record") is not None:
+        return json.loads(row["record"])
+    # files compacted before the `record` column: typed columns only
+    record = {column: row.get(column) for column in _RECORD_COLUMNS}
+    record["token_usage"] = {
+        "input": row.get("input_tokens"),
+        "output": row.get("output_tokens"),
+        "total": row.get("total_tokens"),
+    }
+    return record
+
+
+def _read_jsonl(handle) -> Iterator[Dict[str, Any]]:
+    for line in handle:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue  # torn write at the tail of a crashed segment
+
+
+class HistoryLogConfig(BaseModel):
+    """
+    Rotation settings, overridable via HISTORY_* env vars.
+    """
+    max_segment_bytes: int = 64 * 1024 * 1024
+    max_segment_age_seconds: float = 24 * 3600
+    compression: str = "gzip"  # or "zstd"
+
+    @classmethod
+    def from_env(cls) -> "HistoryLogConfig":
+        defaults = cls()
+        return cls(
+            max_segment_bytes=int(os.getenv("HISTORY_MAX_SEGMENT_BYTES", defaults.max_segment_bytes)),
+            max_segment_age_seconds=float(
+                os.getenv("HISTORY_MAX_SEGMENT_AGE_SECONDS", defaults.max_segment_age_seconds)
+            ),
+            compression=os.getenv("HISTORY_COMPRESSION", defaults.compression),
+        )
+
+
+class SegmentedHistoryLog:
+    """
+    Append-only history split into an active JSONL segment, compressed
+    cold segments and a day-partitioned Parquet tier.
+    """
+
+    def __init__(self, active_path: str, config: Optional[HistoryLogConfig] = None):
+        self.active_path = str(active_path)
+        self.config = config or HistoryLogConfig.from_env()
+
+        base = os.path.dirname(self.active_path)
+        self.segment_dir = os.path.join(base, "segments")
+        self.parquet_dir = os.path.join(base, "parquet")
+
+        self._lock = threading.Lock()
+        self._segment_started: Optional[float] = None
+
+    # ---------------------------------------------------------
+    # Writing + rotation
+    # ---------------------------------------------------------
+    def append(self, lines: Sequence[str], fsync: bool = False):
+        """
+        Appends already-serialised JSON lines to the active segment,
+        rotating it first if it is over its size or age bound.
+        """
+        with self._lock:
+            self._maybe_rotate()
+            with open(self.active_path, "a") as f:
+                f.write("".join(lines))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if self._segment_started is None:
+                self._segment_started = time.time()
+
+    def _segment_age(self) -> float:
+        if self._segment_started is None:
+            # first touch after a restart: age the segment by its first record
+            with open(self.active_path) as f:
+                first = next(_read_jsonl(f), None)
+            try:
+                started = datetime.strptime(first["timestamp"], "%Y%m%d_%H%M%S").timestamp()
+            except (TypeError, KeyError, ValueError):
+                started = os.path.getmtime(self.active_path)
+            self._segment_started = started
+        return time.time() - self._segment_started
+
+    def _maybe_rotate(self):
+        if not os.path.exists(self.active_path):
+            return
+        size = os.path.getsize(self.active_path)
+        if size == 0:
+            return
+        if size >= self.config.max_segment_bytes or self._segment_age() >= self.config.max_segment_age_seconds:
+            self.rotate()
+
+    def rotate(self) -> Optional[str]:
+        """
+        Closes the active segment: moves it into segments/ and compresses
+        it. Returns the path of the compressed segment.
+        """
+        if not os.path.exists(self.active_path) or os.path.getsize(self.active_path) == 0:
+            return None
+
+        os.makedirs(self.segment_dir, exist_ok=True)
+        raw = os.path.join(self.segment_dir, f"history-{time.time_ns():020d}.jsonl")
+        os.replace(self.active_path, raw)
+        self._segment_started = None
+
+        compressed = self._compress(raw)
+        os.remove(raw)
+        return compressed
+
+    def _compress(self, path: str) -> str:
+        if self.config.compression == "zstd":
+            zstandard = _require("zstandard", "zstd-compressed history segments")
+            target = path + ".zst"
+            with open(path, "rb") as src, open(target, "wb") as dst:
+                zstandard.ZstdCompressor().copy_stream(src, dst)
+            return target
+
+        target = path + ".gz"
+        with open(path, "rb") as src, gzip.open(target, "wb") as dst:
+            while chunk := src.read(1024 * 1024):
+                dst.write(chunk)
+        return target
+
+    # ---------------------------------------------------------
+    # Reading
+    # ---------------------------------------------------------
+    def cold_segments(self) -> List[str]:
+        if not os.path.isdir(self.segment_dir):
+            return []
+        return sorted(
+            os.path.join(self.segment_dir, name)
+            for name in os.listdir(self.segment_dir)
+            if name.endswith((".jsonl.gz", ".jsonl.zst"))
+        )
+
+    def _open_segment(self, path: str):
+        if path.endswith(".zst"):
+            zstandard = _require("zstandard", "zstd-compressed history segments")
+            return zstandard.open(path, "rt")
+        return gzip.open(path, "rt")
+
+    def parquet_files(self) -> List[str]:
+        files = []
+        if os.path.isdir(self.parquet_dir):
+            for day in sorted(os.listdir(self.parquet_dir)):
+                day_dir = os.path.join(self.parquet_dir, day)
+                files.extend(
+                    os.path.join(day_dir, name)
+                    for name in sorted(os.listdir(day_dir))
+                    if name.endswith(".parquet")
+                )
+        return files
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every record, oldest tier first: Parquet, then compressed
+        segments, then the active segment. Reads stream in bounded chunks.
+        """
+        parquet = self.parquet_files()
+        if parquet:
+            pq = _require("pyarrow.parquet", "reading compacted history")
+            for path in parquet:
+                for batch in pq.ParquetFile(path).iter_batches(batch_size=1024):
+                    for row in batch.to_pylist():
+                        yield _unflatten(row)
+
+        for path in self.cold_segments():
+            with self._open_segment(path) as f:
+                yield from _read_jsonl(f)
+
+        if os.path.exists(self.active_path):
+            with open(self.active_path) as f:
+                yield from _read_jsonl(f)
+
+    def scan(self, columns: Optional[Sequence[str]] = None, days: Optional[Sequence[str]] = None):
+        """
+        Analytics entry point over the Parquet tier: yields pyarrow
+        RecordBatches holding only `columns`, from only the `days`
+        partitions (YYYY-MM-DD) asked for.
+        """
+        pq = _require("pyarrow.parquet", "history analytics")
+        wanted = set(days) if days else None
+        if not os.path.isdir(self.parquet_dir):
+            return
+        for partition in sorted(os.listdir(self.parquet_dir)):
+            if wanted is not None and partition.removeprefix("day=") not in wanted:
+                continue
+            day_dir = os.path.join(self.parquet_dir, partition)
+            for name in sorted(os.listdir(day_dir)):
+                if name.endswith(".parquet"):
+                    yield from pq.ParquetFile(os.path.join(day_dir, name)).iter_batches(
+                        columns=list(columns) if columns else None
+                    )
+
+    # ---------------------------------------------------------
+    # Compaction
+    # ---------------------------------------------------------
+    def compact(self, older_than_seconds: float = 0.0) -> Dict[str, int]:
+        """
+        Rewrites cold segments last modified more than `older_than_seconds`
+        ago into day-partitioned Parquet, then deletes them.
+        """
+        pa = _require("pyarrow", "history compaction")
+        pq = _require("pyarrow.parquet", "history compaction")
+
+        schema = pa.schema([
+            ("timestamp", pa.string()),
+            ("input", pa.string()),
+            ("output", pa.string()),
+            ("toxicity_score", pa.float64()),
+            ("hallucination_score", pa.float64()),
+            ("emoji_score", pa.float64()),
+            ("cost", pa.float64()),
+            ("duration_seconds", pa.float64()),
+            ("artifact_path", pa.string()),
+            ("input_tokens", pa.int64()),
+            ("output_tokens", pa.int64()),
+            ("total_tokens", pa.int64()),
+            ("record", pa.string()),
+        ])
+
+        cutoff = time.time() - older_than_seconds
+        compacted = records = 0
+
+        for path in self.cold_segments():
+            if os.path.getmtime(path) > cutoff:
+                continue
+
+            by_day: Dict[str, List[Dict[str, Any]]] = {}
+            with self._open_segment(path) as f:
+                for record in _read_jsonl(f):
+                    by_day.setdefault(_day_of(record), []).append(_flatten(record))
+
+            stem = os.path.basename(path).split(".")[0]
+            for day, rows in by_day.items():
+                day_dir = os.path.join(self.parquet_dir, f"day={day}")
+                os.makedirs(day_dir, exist_ok=True)
+                table = pa.Table.from_pylist(rows, schema=schema)
+                pq.write_table(table, os.path.join(day_dir, f"{stem}.parquet"), compression="zstd")
+                records += len(rows)
+
+            os.remove(path)
+            compacted += 1
+
+        return {"segments": compacted, "records": records}
+
+
+class HistoryTail:
+    """
+    Incremental reader of the newest records in the active segment.
+
+    It remembers how far it has parsed, the file's (inode, size, mtime)
+    and its first bytes. `refresh` stats the file and, when it grew, parses only the
+    appended bytes; a torn last line waits for the next refresh. An
+    unchanged file costs one stat. The first read starts near the end of
+    the file, and only the newest `keep` records are held, so neither
+    time nor memory grow with the history. A new head (or a shrunken
+    file) means the segment was rotated; the new one is read from its
+    start.
+    """
+
+    _BLOCK = 64 * 1024
+    _HEAD = 64  # bytes that identify a segment; inodes get reused
+
+    def __init__(self, path: str, keep: int = 500):
+        self.path = str(path)
+        self.keep = keep
+        self.records: deque = deque(maxlen=keep)
+        self._offset = 0
+        self._stamp: Optional[tuple] = None
+        self._head = b""
+        self._lock = threading.Lock()
+
+    def _tail_offset(self, f, size: int) -> int:
+        # walk back block by block until `keep` whole lines are covered
+        pos, newlines = size, 0
+        while pos > 0 and newlines <= self.keep:
+            step = min(self._BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            newlines += f.read(step).count(b"\n")
+        if pos == 0:
+            return 0
+        f.seek(pos)
+        f.readline()  # skip the partial line the block boundary cut into
+        return f.tell()
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Parses whatever was appended since the last call and returns it."""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return []
+            stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if stamp == self._stamp:
+                return []
+
+            with open(self.path, "rb") as f:
+                head = f.read(self._HEAD)
+                if self._stamp is None:
+                    self._offset = self._tail_offset(f, st.st_size)
+                elif not head.startswith(self._head) or st.st_size < self._offset:
+                    self._offset = 0  # rotated or truncated: a new segment
+                self._head = head
+                f.seek(self._offset)
+                chunk = f.read(st.st_size - self._offset)
+
+            # only whole lines; the rest is re-read once it is complete
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            self._offset += len(complete)
+            self._stamp = stamp
+
+            new = list(_read_jsonl(complete.decode("utf-8", errors="replace").splitlines()))
+            self.records.extend(new)
+            return new
+
+    def latest(self, n: int) -> List[Dict[str, Any]]:
+        """The newest `n` records, newest first."""
+        self.refresh()
+        with self._lock:
+            return list(reversed(self.records))[:n]
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Run-history log maintenance")
+    parser.add_argument("command", choices=["rotate", "compact"])
+    parser.add_argument("--path", default=history_path())
+    parser.add_argument("--older-than-hours", type=float, default=24.0,
+                        help="compact only segments older than this")
+    args = parser.parse_args(argv)
+
+    log = SegmentedHistoryLog(args.path)
+    if args.command == "rotate":
+        print(log.rotate())
+    else:
+        print(log.compact(older_than_seconds=args.older_than_hours * 3600))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# app/services/history_store.py
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.history_log import SegmentedHistoryLog, history_path
+
+# Columns that can be sorted on / range-filtered; each one is indexed.
+INDEXED_COLUMNS = (
+    "timestamp",
+    "cost",
+    "toxicity_score",
+    "hallucination_score",
+    "emoji_score",
+    "duration_seconds",
+)
+
+_COLUMNS = (
+    "timestamp",
+    "input",
+    "output",
+    "toxicity_score",
+    "hallucination_score",
+    "emoji_score",
+    "cost",
+    "duration_seconds",
+    "artifact_path",
+)
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class HistoryStore:
+    """
+    Indexed run history in a local SQLite file.
+
+    Written next to history.jsonl (the JSONL stays the append-only log);
+    reads go through `query`, which pages and filters on indexed columns,
+    so the cost of a page doesn't grow with the size of the history.
+    """
+
+    def __init__(self, db_path: str = "app/storage/logs/history.sqlite3"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    input TEXT,
+                    output TEXT,
+                    toxicity_score REAL,
+                    hallucination_score REAL,
+                    emoji_score REAL,
+                    cost REAL,
+                    duration_seconds REAL,
+                    artifact_path TEXT,
+                    record TEXT NOT NULL
+                )
+                """
+            )
+            for column in INDEXED_COLUMNS:
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_runs_{column} ON runs({column})")
+            self._db.commit()
+        return self._db
+
+    def insert_many(self, entries: Iterable[Dict[str, Any]]):
+        rows = []
+        for entry in entries:
+            rows.append((
+                entry.get("timestamp"),
+                entry.get("input"),
+                entry.get("output"),
+                _number(entry.get("toxicity_score")),
+                _number(entry.get("hallucination_score")),
+                _number(entry.get("emoji_score")),
+                _number(entry.get("cost")),
+                _number(entry.get("duration_seconds")),
+                entry.get("artifact_path"),
+                json.dumps(entry),
+            ))
+        if not rows:
+            return
+
+        with self._lock:
+            db = self._conn()
+            db.executemany(
+                f"INSERT INTO runs ({', '.join(_COLUMNS)}, record) "
+                f"VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})",
+                rows,
+            )
+            db.commit()
+
+    def insert(self, entry: Dict[str, Any]):
+        self.insert_many([entry])
+
+    def count(self) -> int:
+        with self._lock:
+            (total,) = self._conn().execute("SELECT COUNT(*) FROM runs").fetchone()
+        return total
+
+    def backfill(self, records: Iterable[Dict[str, Any]], chunk_size: int = 1000) -> int:
+        """
+        Imports existing history records (e.g. SegmentedHistoryLog.iter_records)
+        in chunks. Returns the number of rows imported.
+        """
+        imported = 0
+        chunk: List[Dict[str, Any]] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                self.insert_many(chunk)
+                imported += len(chunk)
+                chunk = []
+        self.insert_many(chunk)
+        return imported + len(chunk)
+
+    def query(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        sort_by: str = "timestamp",
+        descending: bool = True,
+        ranges: Optional[Dict[str, tuple]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns one page of runs.
+
+        `ranges` maps an indexed column to a (min, max) pair; either bound
+        may be None. Pages are fetched with LIMIT/OFFSET plus one extra row
+        to report `has_more`, so no full count is needed.
+        """
+        if sort_by not in INDEXED_COLUMNS:
+            raise ValueError(f"sort_by must be one of {INDEXED_COLUMNS}")
+
+        clauses, params = [], []
+        for column, (low, high) in (ranges or {}).items():
+            if column not in INDEXED_COLUMNS:
+                raise ValueError(f"cannot filter on {column!r}")
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT record FROM runs {where} "
+            f"ORDER BY {sort_by} {direction}, id {direction} LIMIT ? OFFSET ?"
+        )
+
+        with self._lock:
+            rows = self._conn().execute(sql, (*params, limit + 1, offset)).fetchall()
+
+        items = [json.loads(row["record"]) for row in rows[:limit]]
+        return {
+            "items": items,
+            "limit": limit,
+            "offset": offset,
+            "has_more": len(rows) > limit,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """
+    Returns the process-wide history store. On first use an empty store
+    is backfilled from every segment of the history log runs are written
+    to (HISTORY_PATH).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore(os.getenv("HISTORY_DB_PATH", "app/storage/logs/history.sqlite3"))
+            if _store.count() == 0:
+                _store.backfill(SegmentedHistoryLog(history_path()).iter_records())
+        return _store
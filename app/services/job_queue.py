@@ -0,0 +1,366 @@
+# app/services/job_queue.py
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobConfig(BaseModel):
+    """
+    Job queue / worker pool settings, overridable via JOB_* env vars.
+    """
+    db_path: str = "app/storage/logs/jobs.sqlite3"
+    workers: int = 4
+    max_pending: int = 1000           # queued jobs before POST /jobs answers 503
+    poll_interval_seconds: float = 1.0
+    max_wait_seconds: float = 60.0    # cap on GET /jobs/{id}?wait=
+    retention_seconds: float = 7 * 24 * 3600  # finished jobs are purged after this
+    lease_seconds: float = 60.0       # a running job nobody renewed for this long is re-queued
+    max_attempts: int = 3             # claims before an interrupted job is failed for good
+
+    @classmethod
+    def from_env(cls) -> "JobConfig":
+        defaults = cls()
+        return cls(
+            db_path=os.getenv("JOB_DB_PATH", defaults.db_path),
+            workers=int(os.getenv("JOB_WORKERS", defaults.workers)),
+            max_pending=int(os.getenv("JOB_MAX_PENDING", defaults.max_pending)),
+            poll_interval_seconds=float(os.getenv("JOB_POLL_INTERVAL", defaults.poll_interval_seconds)),
+            max_wait_seconds=float(os.getenv("JOB_MAX_WAIT_SECONDS", defaults.max_wait_seconds)),
+            retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", defaults.retention_seconds)),
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", defaults.lease_seconds)),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", defaults.max_attempts)),
+        )
+
+
+class JobQueue:
+    """
+    Durable FIFO of run requests in a local SQLite file.
+
+    A job moves queued -> running -> succeeded | failed. `claim` takes the
+    oldest queued job in one UPDATE ... RETURNING, so two workers never get
+    the same job, and leases it for `lease_seconds`; the worker renews the
+    lease with `heartbeat` while the run lasts. A running job whose lease
+    ran out belongs to a process that died, so `recover` (also run before
+    every claim) puts it back in the queue. Jobs live in other processes
+    keep their lease and are left alone. After `max_attempts` claims an
+    interrupted job is failed instead of re-queued.
+
+    An idempotency key (the client's Idempotency-Key header) maps repeat
+    submissions of the same request onto the first job, so a client retry
+    doesn't pay for a second run.
+    """
+
+    def __init__(
+        self,
+        db_path: str = JobConfig().db_path,
+        lease_seconds: float = JobConfig().lease_seconds,
+        max_attempts: int = JobConfig().max_attempts,
+    ):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    idempotency_key TEXT UNIQUE,
+                    status TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    lease_expires REAL
+                )
+                """
+            )
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if "lease_expires" not in columns:  # files from before leases
+                self._db.execute("ALTER TABLE jobs ADD COLUMN lease_expires REAL")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+            self._db.commit()
+        return self._db
+
+    def enqueue(self, request: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Adds a job (or finds the one already filed under the key) and returns it."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            db = self._conn()
+            if idempotency_key is not None:
+                row = db.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                if row is not None:
+                    return self._to_dict(row)
+            db.execute(
+                "INSERT INTO jobs (id, idempotency_key, status, request, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, idempotency_key, QUEUED, json.dumps(request), time.time()),
+            )
+            db.commit()
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._conn()
+            now = time.time()
+            self._reclaim(db, now)
+            row = db.execute(
+                """
+                UPDATE jobs SET status = ?, started_at = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1)
+                RETURNING *
+                """,
+                (RUNNING, now, now + self.lease_seconds, QUEUED),
+            ).fetchone()
+            db.commit()
+        return self._to_dict(row) if row is not None else None
+
+    def heartbeat(self, job_id: str):
+        """Renews the lease on a job this process is running."""
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ?",
+                (time.time() + self.lease_seconds, job_id, RUNNING),
+            )
+            db.commit()
+
+    def release(self, job_ids: List[str]):
+        """Puts jobs this process stopped running back in the queue right away."""
+        if not job_ids:
+            return
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                f"UPDATE jobs SET status = ?, started_at = NULL, lease_expires = NULL "
+                f"WHERE status = ? AND id IN ({', '.join('?' * len(job_ids))})",
+                (QUEUED, RUNNING, *job_ids),
+            )
+            db.commit()
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]):
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+            db.commit()
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        self._finish(job_id, SUCCEEDED, json.dumps(result, default=str), None)
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, FAILED, None, error)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def recover(self) -> int:
+        """Re-queues jobs whose lease ran out. Returns how many."""
+        with self._lock:
+            db = self._conn()
+            recovered = self._reclaim(db, time.time())
+            db.commit()
+        return recovered
+
+    def _reclaim(self, db: sqlite3.Connection, now: float) -> int:
+        # callers hold self._lock and commit
+        cursor = db.execute(
+            """
+            UPDATE jobs SET status = ?, started_at = NULL, lease_expires = NULL
+            WHERE status = ? AND (lease_expires IS NULL OR lease_expires < ?)
+            """,
+            (QUEUED, RUNNING, now),
+        )
+        db.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND attempts >= ?",
+            (FAILED, f"interrupted {self.max_attempts} times; giving up", now, QUEUED, self.max_attempts),
+        )
+        return cursor.rowcount
+
+    def purge(self, older_than_seconds: float) -> int:
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            db = self._conn()
+            cursor = db.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND finished_at < ?",
+                (*FINISHED, cutoff),
+            )
+            db.commit()
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0, **{status: n for status, n in rows}}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = {
+            "job_id": row["id"],
+            "status": row["status"],
+            "request": json.loads(row["request"]),
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if row["result"] is not None:
+            job["state"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+
+class JobWorkers:
+    """
+    In-process worker pool over a JobQueue, on the server's event loop.
+
+    Each worker claims the next job, awaits `runner(request)` and stores
+    the final state (or the error), renewing the job's lease while it
+    runs. Workers sleep on an event that `notify()` sets when a job is
+    enqueued, with a poll interval as the fallback. `wait` lets
+    GET /jobs/{id} long-poll until a job finishes.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        runner: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        config: Optional[JobConfig] = None,
+    ):
+        self.queue = queue
+        self.runner = runner
+        self.config = config or JobConfig.from_env()
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Dict[str, Set[asyncio.Event]] = {}
+        self._running: Set[str] = set()
+        self.busy = 0
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        recovered = await asyncio.to_thread(self.queue.recover)
+        if recovered:
+            logger.info("re-queued %d interrupted jobs whose lease ran out", recovered)
+        await asyncio.to_thread(self.queue.purge, self.config.retention_seconds)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"job-worker-{i}")
+            for i in range(self.config.workers)
+        ]
+
+    async def stop(self):
+        """
+        Cancels the workers and puts the jobs they were running back in the
+        queue. A process that dies without stopping leaves them to expire
+        their lease instead.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.queue.release, sorted(self._running))
+        self._running.clear()
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            # cleared before claiming, so a notify() that lands during the
+            # claim isn't lost
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.config.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id = job["job_id"]
+            self._running.add(job_id)
+            self.busy += 1
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            try:
+                state = await self.runner(job["request"])
+            except Exception as e:
+                await asyncio.to_thread(self.queue.fail, job_id, str(e) or type(e).__name__)
+            else:
+                await asyncio.to_thread(self.queue.complete, job_id, state)
+            finally:
+                heartbeat.cancel()
+                self.busy -= 1
+            self._running.discard(job_id)
+            for event in self._finished.get(job_id, ()):
+                event.set()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            await asyncio.to_thread(self.queue.heartbeat, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """The job once finished, or as it stands when `timeout` runs out."""
+        deadline = time.monotonic() + min(timeout, self.config.max_wait_seconds)
+        event = asyncio.Event()
+        self._finished.setdefault(job_id, set()).add(event)
+        try:
+            while True:
+                job = await asyncio.to_thread(self.queue.get, job_id)
+                left = deadline - time.monotonic()
+                if job is None or job["status"] in FINISHED or left <= 0:
+                    return job
+                try:
+                    # the poll interval covers jobs finished by another process
+                    await asyncio.wait_for(event.wait(), timeout=min(left, self.config.poll_interval_seconds))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._finished[job_id]
+            waiters.discard(event)
+            if not waiters:
+                del self._finished[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "busy": self.busy,
+            "jobs": self.queue.counts(),
+        }
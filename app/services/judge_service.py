@@ -0,0 +1,174 @@
+# app/services/judge_service.py
+
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+from app.adapters.openai_adapter import AsyncOpenAIAdapter, OpenAIAdapter
+
+
+class Evaluator(BaseModel):
+    """
+    One metric graded by the judge.
+
+    `key` is the field in the judge's JSON answer, `state_key` the state
+    channel the score is written to, `criteria` the rubric shown to the
+    model and `fallback` the score used when the field is missing or
+    invalid.
+    """
+    key: str
+    state_key: str
+    criteria: str
+    fallback: float
+
+
+HALLUCINATION = Evaluator(
+    key="hallucination",
+    state_key="hallucination_score",
+    criteria=(
+        "Does the response hallucinate? Count factual inaccuracies or unsupported "
+        "claims, and treating fictional, impossible or unanswerable premises as "
+        "real without saying so. 0 = fully factual / properly handled, "
+        "1 = strongly hallucinated."
+    ),
+    fallback=0.5,
+)
+
+EMOJI = Evaluator(
+    key="emoji",
+    state_key="emoji_score",
+    criteria="Roughly what fraction of the response is emoji? 0 = none, 1 = all emoji.",
+    fallback=0.0,
+)
+
+
+class JudgeService:
+    """
+    Grades several metrics of one response in a single structured-output
+    call, so every evaluator shares one prompt (and one copy of the
+    response's input tokens) instead of paying a round-trip each.
+
+    The answer is constrained to a JSON schema built from the evaluators
+    and parsed strictly: a field that is missing, not a number or outside
+    0–1 falls back to that evaluator's default on its own, and the names
+    of such fields are reported in `judge_fallbacks`.
+    Judge responses are cached unless the state sets cache_bypass.
+    """
+
+    def __init__(
+        self,
+        adapter: Optional[OpenAIAdapter] = None,
+        async_adapter: Optional[AsyncOpenAIAdapter] = None,
+        evaluators: Sequence[Evaluator] = (HALLUCINATION, EMOJI),
+    ):
+        if not evaluators:
+            raise ValueError("JudgeService needs at least one evaluator")
+        keys = [e.key for e in evaluators]
+        if len(set(keys)) != len(keys):
+            raise ValueError(f"duplicate evaluator keys: {keys}")
+
+        self.adapter = adapter or OpenAIAdapter()
+        self.async_adapter = async_adapter or AsyncOpenAIAdapter()
+        self.evaluators = list(evaluators)
+
+    @property
+    def state_keys(self) -> List[str]:
+        return [e.state_key for e in self.evaluators]
+
+    def schema(self) -> Dict[str, Any]:
+        # strict structured outputs need every property required and no extras
+        return {
+            "type": "object",
+            "properties": {
+                e.key: {"type": "number", "description": e.criteria} for e in self.evaluators
+            },
+            "required": [e.key for e in self.evaluators],
+            "additionalProperties": False,
+        }
+
+    def judge(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        output = state.get("llm_output", "")
+        if not output:
+            return self._empty()
+
+        try:
+            resp = self.adapter.generate_json(
+                self._prompt(state.get("user_input", ""), output),
+                self.schema(),
+                name="judge",
+                use_cache=not state.get("cache_bypass"),
+            )
+            text = resp["text"]
+        except Exception:
+            text = None  # every field falls back
+
+        return self.parse(text)
+
+    async def ajudge(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        output = state.get("llm_output", "")
+        if not output:
+            return self._empty()
+
+        try:
+            resp = await self.async_adapter.generate_json(
+                self._prompt(state.get("user_input", ""), output),
+                self.schema(),
+                name="judge",
+                use_cache=not state.get("cache_bypass"),
+            )
+            text = resp["text"]
+        except Exception:
+            text = None
+
+        return self.parse(text)
+
+    def parse(self, text: Optional[str]) -> Dict[str, Any]:
+        """
+        Maps the judge's JSON answer onto state updates, field by field.
+        """
+        try:
+            data = json.loads(text) if text else {}
+        except (TypeError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+
+        update: Dict[str, Any] = {}
+        fallbacks = []
+        for e in self.evaluators:
+            value = data.get(e.key)
+            valid = (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and math.isfinite(value)
+                and 0.0 <= value <= 1.0
+            )
+            if not valid:
+                fallbacks.append(e.key)
+                value = e.fallback
+            update[e.state_key] = round(float(value), 3)
+
+        update["judge_fallbacks"] = fallbacks
+        return update
+
+    def _empty(self) -> Dict[str, Any]:
+        return {**{e.state_key: 0.0 for e in self.evaluators}, "judge_fallbacks": []}
+
+    def _prompt(self, user: str, output: str) -> str:
+        metrics = "\n".join(f"- {e.key}: {e.criteria}" for e in self.evaluators)
+        return f"""
+Grade the model's response on each metric below with a number from 0 to 1.
+
+USER QUESTION:
+\"\"\"{user}\"\"\"
+
+MODEL RESPONSE:
+\"\"\"{output}\"\"\"
+
+METRICS:
+{metrics}
+
+Respond with a JSON object holding one number per metric.
+"""
@@ -3,28 +3,61 @@
 import time
 from typing import Optional, Dict, Any
 
-from app.domain.state import GraphState
-from app.adapters.openai_adapter import OpenAIAdapter
+from langgraph.config import get_config, get_stream_writer
+
+from app.adapters.openai_adapter import AsyncOpenAIAdapter, OpenAIAdapter
 
 
 class LLMService:
     """
     Service responsible for LLM interactions plus associated cost/usage logic.
-    Runs inside LangGraph, so it must accept and return dicts.
+    Runs inside LangGraph, so it accepts the state dict and returns the
+    keys it updates.
     """
 
-    def __init__(self, adapter: Optional[OpenAIAdapter] = None):
+    def __init__(
+        self,
+        adapter: Optional[OpenAIAdapter] = None,
+        async_adapter: Optional[AsyncOpenAIAdapter] = None,
+    ):
         self.adapter = adapter or OpenAIAdapter()
+        self.async_adapter = async_adapter or AsyncOpenAIAdapter()
 
     def generate(self, state: dict) -> dict:
         """
-        LangGraph node: modifies and returns a dict-based state.
+        LangGraph node: returns the generation, token usage and cost.
         """
-        start_time = time.time()
+        # keep the caller's run start so duration covers the whole run
+        start_time = state.get("start_time") or time.time()
         user_msg = state.get("user_input")
 
         result = self.adapter.generate_text(user_msg)
 
+        return self._to_update(result, start_time)
+
+    async def agenerate(self, state: dict) -> dict:
+        """
+        Async variant of generate, used when the graph runs via ainvoke.
+        With stream_tokens set in the run's configurable, text fragments
+        are pushed to the graph's "custom" stream as {"token": ...} while
+        the response is generated.
+        """
+        # keep the caller's run start so duration covers the whole run
+        start_time = state.get("start_time") or time.time()
+        user_msg = state.get("user_input")
+
+        if get_config().get("configurable", {}).get("stream_tokens"):
+            writer = get_stream_writer()
+            result = await self.async_adapter.stream_text(
+                user_msg, on_delta=lambda delta: writer({"token": delta})
+            )
+        else:
+            result = await self.async_adapter.generate_text(user_msg)
+
+        return self._to_update(result, start_time)
+
+    @staticmethod
+    def _to_update(result: Dict[str, Any], start_time: float) -> dict:
         llm_text = result["text"]
         usage = result["usage"]
 
@@ -37,8 +70,7 @@ class LLMService:
         output_cost = output_tokens / 1000 * 0.00060
         total_cost = round(input_cost + output_cost, 6)
 
-        # Update the existing dict and return it
-        state.update({
+        return {
             "start_time": start_time,
             "llm_output": llm_text,
             "token_usage": {
@@ -47,6 +79,4 @@ class LLMService:
                 "total": total_tokens,
             },
             "cost": total_cost,
-        })
-
-        return state
\ No newline at end of file
+        }
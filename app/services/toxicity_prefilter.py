@@ -0,0 +1,244 @@
+# app/services/toxicity_prefilter.py
+
+"""
+Local first-stage toxicity classifier.
+
+A lexicon of word n-gram weights (app/services/data/toxicity_lexicon.json)
+feeds a logistic score:
+
+    p = sigmoid(bias + sum(weight of every n-gram present))
+
+The lexicon weighs words without their context, so neither end of the
+score is trusted by default and every text goes to the moderation API:
+
+- a high score means listed n-grams matched, but benign text with violent
+  vocabulary ("kill a process", "the bomb could leave millions dead")
+  matches them too; TOXICITY_LOCAL_TOXIC decides it locally
+- a low score only means no listed n-gram matched, which misspelled,
+  euphemistic or non-English abuse does too; TOXICITY_LOCAL_BENIGN
+  decides it locally
+
+Turn either on only after calibrating on your traffic. Text the lexicon
+can't read (e.g. mostly non-Latin script) always goes to the API.
+
+Calibrate the thresholds against remote scores already in the history with:
+
+    python -m app.services.toxicity_prefilter calibrate [--remote]
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(__file__), "data", "toxicity_lexicon.json")
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+class PrefilterConfig(BaseModel):
+    """
+    Pre-classifier settings, overridable via TOXICITY_* env vars.
+    """
+    enabled: bool = True
+    # decide high / low scores locally; off until calibrated on your traffic
+    local_toxic: bool = False
+    local_benign: bool = False
+    benign_threshold: float = 0.001
+    toxic_threshold: float = 0.9
+    min_coverage: float = 0.5  # share of letters the tokenizer must understand
+    lexicon_path: str = DEFAULT_LEXICON_PATH
+
+    @classmethod
+    def from_env(cls) -> "PrefilterConfig":
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("TOXICITY_PREFILTER_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on"),
+            local_toxic=os.getenv("TOXICITY_LOCAL_TOXIC", "false").strip().lower() in ("1", "true", "yes", "on"),
+            local_benign=os.getenv("TOXICITY_LOCAL_BENIGN", "false").strip().lower() in ("1", "true", "yes", "on"),
+            benign_threshold=float(os.getenv("TOXICITY_BENIGN_THRESHOLD", defaults.benign_threshold)),
+            toxic_threshold=float(os.getenv("TOXICITY_TOXIC_THRESHOLD", defaults.toxic_threshold)),
+            min_coverage=float(os.getenv("TOXICITY_MIN_COVERAGE", defaults.min_coverage)),
+            lexicon_path=os.getenv("TOXICITY_LEXICON_PATH", defaults.lexicon_path),
+        )
+
+
+class ToxicityPrefilter:
+    """
+    Lexicon/n-gram toxicity model. Weights are read once at construction.
+
+    `classify` returns (score, confident): when `confident` is False the
+    caller should ask the moderation API instead of trusting the score.
+    """
+
+    def __init__(self, config: Optional[PrefilterConfig] = None):
+        self.config = config or PrefilterConfig.from_env()
+        if not self.config.benign_threshold < self.config.toxic_threshold:
+            raise ValueError("benign_threshold must be below toxic_threshold")
+
+        with open(self.config.lexicon_path) as f:
+            lexicon = json.load(f)
+        self.bias = float(lexicon["bias"])
+        self.weights: Dict[str, float] = {k.lower(): float(v) for k, v in lexicon["weights"].items()}
+        self.max_n = max((len(k.split()) for k in self.weights), default=1)
+
+    def _ngrams(self, words: List[str]) -> Iterable[str]:
+        for n in range(1, self.max_n + 1):
+            for i in range(len(words) - n + 1):
+                yield " ".join(words[i:i + n])
+
+    def score(self, text: str) -> Tuple[float, float]:
+        """
+        Returns (probability, coverage): the logistic toxicity score and the
+        fraction of letters in `text` that the tokenizer turned into words.
+        """
+        lowered = text.lower()
+        words = _WORD.findall(lowered)
+
+        letters = sum(ch.isalpha() for ch in lowered)
+        covered = sum(sum(ch.isalpha() for ch in w) for w in words)
+        coverage = covered / letters if letters else 1.0
+
+        logit = self.bias + sum(self.weights.get(g, 0.0) for g in set(self._ngrams(words)))
+        # clamp so exp() stays finite for very long, very toxic text
+        logit = max(-50.0, min(50.0, logit))
+        return 1.0 / (1.0 + math.exp(-logit)), coverage
+
+    def classify(self, text: str) -> Tuple[float, bool]:
+        probability, coverage = self.score(text)
+        if not self.config.enabled or coverage < self.config.min_coverage:
+            return probability, False
+        confident = (
+            (self.config.local_toxic and probability >= self.config.toxic_threshold)
+            or (self.config.local_benign and probability <= self.config.benign_threshold)
+        )
+        return probability, confident
+
+
+_prefilter: Optional[ToxicityPrefilter] = None
+_prefilter_lock = threading.Lock()
+
+
+def get_toxicity_prefilter() -> ToxicityPrefilter:
+    """
+    Returns the process-wide pre-classifier, configured from the
+    environment. With TOXICITY_PREFILTER_ENABLED=false it is never
+    confident, so every text goes to the moderation API.
+    """
+    global _prefilter
+    with _prefilter_lock:
+        if _prefilter is None:
+            _prefilter = ToxicityPrefilter()
+        return _prefilter
+
+
+# ---------------------------------------------------------
+# Offline calibration
+# ---------------------------------------------------------
+def calibrate(
+    prefilter: ToxicityPrefilter,
+    samples: Sequence[Tuple[str, float]],
+    flag_threshold: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    Compares local decisions with remote moderation scores.
+
+    `samples` are (text, remote score) pairs. Reports how much traffic
+    the fast path would keep local, how often a local decision disagrees
+    with the remote flag (score >= flag_threshold) and the error on the
+    locally-decided scores.
+    """
+    local = agree = 0
+    false_benign = false_toxic = 0
+    errors: List[float] = []
+
+    for text, remote in samples:
+        probability, confident = prefilter.classify(text)
+        if not confident:
+            continue
+        local += 1
+        errors.append(abs(probability - remote))
+
+        local_flag = probability >= flag_threshold
+        remote_flag = remote >= flag_threshold
+        if local_flag == remote_flag:
+            agree += 1
+        elif remote_flag:
+            false_benign += 1
+        else:
+            false_toxic += 1
+
+    total = len(samples)
+    return {
+        "samples": total,
+        "decided_locally": local,
+        "local_fraction": round(local / total, 4) if total else 0.0,
+        "agreement": round(agree / local, 4) if local else None,
+        "false_benign": false_benign,
+        "false_toxic": false_toxic,
+        "mean_abs_error": round(sum(errors) / len(errors), 6) if errors else None,
+        "max_abs_error": round(max(errors), 6) if errors else None,
+        "benign_threshold": prefilter.config.benign_threshold,
+        "toxic_threshold": prefilter.config.toxic_threshold,
+    }
+
+
+def _history_samples(path: str, remote: bool) -> List[Tuple[str, float]]:
+    from app.services.history_log import SegmentedHistoryLog
+
+    samples = []
+    texts = []
+    for record in SegmentedHistoryLog(path).iter_records():
+        text = record.get("output")
+        if not text:
+            continue
+        if remote:
+            texts.append(text)
+        elif record.get("toxicity_source", "remote") == "remote" and record.get("toxicity_score") is not None:
+            # only scores that came from the moderation API are ground truth
+            samples.append((text, float(record["toxicity_score"])))
+
+    if remote:
+        from app.adapters.openai_adapter import OpenAIAdapter
+        from app.services.toxicity_service import ToxicityService
+
+        adapter = OpenAIAdapter()
+        for text in texts:
+            samples.append((text, ToxicityService._max_category_score(adapter.moderate_text(text))))
+
+    return samples
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Toxicity pre-classifier tools")
+    parser.add_argument("command", choices=["calibrate"])
+    parser.add_argument("--path", default="app/storage/logs/history.jsonl")
+    parser.add_argument("--remote", action="store_true",
+                        help="re-score every history output with the moderation API")
+    parser.add_argument("--flag-threshold", type=float, default=0.5)
+    parser.add_argument("--benign-threshold", type=float)
+    parser.add_argument("--toxic-threshold", type=float)
+    args = parser.parse_args(argv)
+
+    config = PrefilterConfig.from_env()
+    config.enabled = True
+    # report what both fast paths would do
+    config.local_toxic = True
+    config.local_benign = True
+    if args.benign_threshold is not None:
+        config.benign_threshold = args.benign_threshold
+    if args.toxic_threshold is not None:
+        config.toxic_threshold = args.toxic_threshold
+
+    prefilter = ToxicityPrefilter(config)
+    report = calibrate(prefilter, _history_samples(args.path, args.remote), args.flag_threshold)
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
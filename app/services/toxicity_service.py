@@ -2,7 +2,9 @@
 
 from typing import Dict, Any, Optional
 
-from app.adapters.openai_adapter import OpenAIAdapter
+from app.adapters.openai_adapter import AsyncOpenAIAdapter, OpenAIAdapter
+from app.services.toxicity_prefilter import ToxicityPrefilter, get_toxicity_prefilter
+
 #     "id": "modr-abc123",
 #     "model": "omni-moderation-latest",
 #     "results": [
@@ -38,20 +40,56 @@ from app.adapters.openai_adapter import OpenAIAdapter
 class ToxicityService:
     """
     Wraps the OpenAI moderation API and returns a numeric toxicity score
-    (0.0–1.0), consistent with the above moderation struct form
+    (0.0–1.0), consistent with the above moderation struct form.
+    Moderation results are cached unless the state sets cache_bypass.
+
+    A local pre-classifier runs first; clearly benign or clearly toxic
+    text is scored without calling the API. `toxicity_source` records
+    which path ("local" or "remote") decided the score.
     """
 
-    def __init__(self, adapter: Optional[OpenAIAdapter] = None):
+    def __init__(
+        self,
+        adapter: Optional[OpenAIAdapter] = None,
+        async_adapter: Optional[AsyncOpenAIAdapter] = None,
+        prefilter: Optional[ToxicityPrefilter] = None,
+    ):
         self.adapter = adapter or OpenAIAdapter()
+        self.async_adapter = async_adapter or AsyncOpenAIAdapter()
+        self.prefilter = prefilter or get_toxicity_prefilter()
+
+    def _local(self, text: str) -> Optional[Dict[str, Any]]:
+        if not text:
+            return {"toxicity_score": 0.0, "toxicity_source": "local"}
+        probability, confident = self.prefilter.classify(text)
+        if confident:
+            return {"toxicity_score": probability, "toxicity_source": "local"}
+        return None
 
     def score_toxicity(self, state: Dict[str, Any]) -> Dict[str, Any]:
 
         text = state.get("llm_output", "")
-        if not text:
-            state["toxicity_score"] = 0.0
-            return state
+        local = self._local(text)
+        if local is not None:
+            return local
+
+        response = self.adapter.moderate_text(text, use_cache=not state.get("cache_bypass"))
+        return {"toxicity_score": self._max_category_score(response), "toxicity_source": "remote"}
+
+    async def ascore_toxicity(self, state: Dict[str, Any]) -> Dict[str, Any]:
+
+        text = state.get("llm_output", "")
+        local = self._local(text)
+        if local is not None:
+            return local
+
+        response = await self.async_adapter.moderate_text(
+            text, use_cache=not state.get("cache_bypass")
+        )
+        return {"toxicity_score": self._max_category_score(response), "toxicity_source": "remote"}
 
-        response = self.adapter.moderate_text(text)
+    @staticmethod
+    def _max_category_score(response) -> float:
         raw = response.category_scores
 
         # Flatten possible Pydantic structure
@@ -70,5 +108,4 @@ class ToxicityService:
 
         toxicity = max(numeric_vals) if numeric_vals else 0.0
 
-        state["toxicity_score"] = float(toxicity)
-        return state
\ No newline at end of file
+        return float(toxicity)
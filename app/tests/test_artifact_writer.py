@@ -0,0 +1,71 @@
+# app/tests/test_artifact_writer.py
+
+import json
+import logging
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.artifact_service import ArtifactService
+from app.services.artifact_writer import ArtifactWriter
+
+
+def test_service_enqueues_and_writer_flushes(tmp_path, monkeypatch):
+    writer = ArtifactWriter(fsync="never")
+    service = ArtifactService(writer=writer)
+    monkeypatch.setattr(service, "artifact_dir", tmp_path)
+    monkeypatch.setattr(service, "history_path", tmp_path / "history.jsonl")
+
+    paths = [
+        service.save_artifact({"user_input": f"run {i}", "start_time": 0})["artifact_path"]
+        for i in range(20)
+    ]
+    writer.close()
+
+    # same-second runs must not overwrite each other
+    assert len(set(paths)) == 20
+    assert all(os.path.exists(p) for p in paths)
+
+    with open(tmp_path / "history.jsonl") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["input"] for line in lines] == [f"run {i}" for i in range(20)]
+
+    stats = writer.stats()
+    assert stats["records_written"] == 20
+    assert stats["queue_depth"] == 0
+    assert 1 <= stats["batches"] <= 20
+
+
+def test_flush_waits_for_pending_records(tmp_path):
+    writer = ArtifactWriter(fsync="batch")
+    history = tmp_path / "history.jsonl"
+
+    writer.submit(str(tmp_path / "a.json"), {"a": 1}, history, {"a": 1})
+    writer.flush()
+
+    assert (tmp_path / "a.json").exists()
+    assert history.read_text().count("\n") == 1
+    writer.close()
+
+
+def test_failed_batch_is_logged_and_retried_without_duplicate_lines(tmp_path, caplog):
+    store = MagicMock()
+    store.insert_many.side_effect = [OSError("disk full"), None]
+    writer = ArtifactWriter(fsync="never", history_store=store, retry_delay=0)
+    history = tmp_path / "history.jsonl"
+
+    with caplog.at_level(logging.ERROR):
+        writer.submit(str(tmp_path / "a.json"), {"a": 1}, history, {"a": 1})
+        writer.flush()
+    writer.close()
+
+    assert "batch of 1 records failed" in caplog.text
+    assert store.insert_many.call_count == 2
+    assert history.read_text().count("\n") == 1  # the retry skips the appended history
+    assert writer.stats()["errors"] == 1 and writer.stats()["records_dropped"] == 0
+
+
+def test_rejects_unknown_fsync_policy():
+    with pytest.raises(ValueError):
+        ArtifactWriter(fsync="sometimes")
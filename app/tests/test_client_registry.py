@@ -0,0 +1,69 @@
+# app/tests/test_client_registry.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.adapters.client_registry import ClientRegistry, PoolConfig
+from app.adapters.openai_adapter import OpenAIAdapter
+
+
+class ModerationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the connection is pooled
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({
+            "id": "modr-1",
+            "model": "omni-moderation-latest",
+            "results": [{
+                "flagged": False,
+                "categories": {},
+                "category_scores": {"hate": 0.001},
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_pool_config_reads_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_POOL_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("OPENAI_POOL_KEEPALIVE_EXPIRY", "2.5")
+    monkeypatch.setenv("OPENAI_HTTP2", "true")
+
+    config = PoolConfig.from_env()
+
+    assert config.max_connections == 7
+    assert config.keepalive_expiry == 2.5
+    assert config.http2 is True
+
+
+def test_adapters_share_one_pool(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ModerationHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+
+    try:
+        registry = ClientRegistry(PoolConfig(max_connections=4))
+        first = OpenAIAdapter(client=registry.openai_client())
+        second = OpenAIAdapter(client=registry.openai_client())
+
+        assert first.client is second.client
+
+        first.moderate_text("hello")
+        second.moderate_text("hello again")
+
+        stats = registry.pool_stats()
+        assert stats["requests_total"] == 2
+        assert stats["requests_in_flight"] == 0
+        assert stats["connections_idle"] == 1  # second call reused the connection
+        registry.close()
+    finally:
+        server.shutdown()
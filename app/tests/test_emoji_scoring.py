@@ -0,0 +1,41 @@
+# app/tests/test_emoji_scoring.py
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.emoji_scoring import emoji_ratio, emoji_ratios
+from app.services.emoji_service import EmojiService
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("plain text", 0.0),
+    ("\U0001F44D\U0001F3FD", 1.0),                              # thumbs up + skin tone
+    ("\U0001F468‍\U0001F469‍\U0001F467 hi", 1 / 3),   # ZWJ family
+    ("\U0001F1EF\U0001F1F5\U0001F1FA\U0001F1F8", 1.0),          # two flags
+    ("#️⃣ ok", 1 / 3),                                # keycap
+    ("❤️❤️", 1.0),                          # heart + VS16
+    ("© 2024", 0.0),                                            # text-default symbol
+    ("\u27A1", 0.0),                                            # ➡ without VS16
+    ("\u27A1\uFE0F", 1.0),                                      # ➡️
+    ("\u231A\uFE0E", 0.0),                                      # watch forced to text
+    ("\U0001F3F3\uFE0F\u200D\U0001F308", 1.0),                  # rainbow flag
+])
+def test_emoji_ratio_counts_grapheme_clusters(text, expected):
+    assert emoji_ratio(text) == pytest.approx(expected)
+
+
+def test_batch_matches_single_text_scoring():
+    texts = ["hi \U0001F600", "", "\U0001F3F4\U000E0067\U000E0062\U000E0065\U000E006E\U000E0067\U000E007F", "none"]
+
+    assert emoji_ratios(texts) == [emoji_ratio(t) for t in texts]
+
+
+def test_local_scorer_skips_the_adapter():
+    adapter = MagicMock()
+    service = EmojiService(adapter=adapter, async_adapter=MagicMock(), scorer="local")
+
+    result = service.score_emoji({"llm_output": "Hello \U0001F30D"})
+
+    assert result["emoji_score"] == 0.167
+    assert not adapter.generate_text.called
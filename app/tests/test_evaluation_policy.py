@@ -0,0 +1,97 @@
+# app/tests/test_evaluation_policy.py
+
+from unittest.mock import MagicMock
+
+from app.services.artifact_service import ArtifactService
+from app.services.emoji_service import EmojiService
+from app.services.evaluation_policy import EvaluationPolicy, EvaluationPolicyConfig, factual_risk
+from app.services.hallucination_service import HallucinationService
+from app.services.llm_service import LLMService
+from app.services.toxicity_prefilter import PrefilterConfig, ToxicityPrefilter
+from app.services.toxicity_service import ToxicityService
+
+NO_PREFILTER = ToxicityPrefilter(PrefilterConfig(enabled=False))
+
+
+def _policy(**config):
+    return EvaluationPolicy(EvaluationPolicyConfig(**config), prefilter=NO_PREFILTER)
+
+
+def test_explicit_evaluators_override_sampling():
+    policy = _policy(sample_rates={"toxicity": 0.0})
+
+    plan = policy.plan({"evaluators": ["toxicity"], "llm_output": "hi"})
+
+    assert plan == {"run": ["toxicity"], "skipped": {"hallucination": "not_requested", "emoji": "not_requested"}}
+
+
+def test_sampling_is_stable_per_run_id():
+    policy = _policy(sample_rates={"hallucination": 0.5})
+
+    picks = [
+        "hallucination" in policy.plan({"run_id": f"run-{i}", "llm_output": "hi"})["run"]
+        for i in range(200)
+    ]
+    again = [
+        "hallucination" in policy.plan({"run_id": f"run-{i}", "llm_output": "hi"})["run"]
+        for i in range(200)
+    ]
+
+    assert picks == again
+    assert 60 < sum(picks) < 140
+
+
+def test_risk_gate_skips_low_risk_output():
+    policy = _policy(risk_gated=frozenset({"hallucination"}), risk_threshold=0.3)
+
+    chatty = policy.plan({"user_input": "Say something nice", "llm_output": "you are doing great today"})
+    factual = policy.plan({
+        "user_input": "Who was the President of the United States in 1400?",
+        "llm_output": "There was no such president in 1400.",
+    })
+
+    assert chatty["skipped"] == {"hallucination": "low_risk"} and chatty["risk"] < 0.3
+    assert "hallucination" in factual["run"]
+    assert factual_risk("", "Paris is the capital of France since 987.") > 0.3
+
+
+def test_graph_only_calls_planned_scorers(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.domain.workflow_graph import build_graph
+
+    gen_adapter = MagicMock()
+    gen_adapter.generate_text.return_value = {
+        "text": "Hello world",
+        "usage": MagicMock(input_tokens=1, output_tokens=2, total_tokens=3),
+    }
+    scorer_adapter = MagicMock()
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+
+    graph = build_graph(
+        llm=LLMService(adapter=gen_adapter),
+        tox=ToxicityService(adapter=scorer_adapter, prefilter=NO_PREFILTER),
+        hal=HallucinationService(adapter=scorer_adapter),
+        art=art,
+        emoji=EmojiService(adapter=scorer_adapter),
+        policy=_policy(sample_rates={"hallucination": 0.0, "toxicity": 0.0}),
+    )
+
+    result = graph.invoke({"user_input": "hi"})
+
+    assert result["evaluation_plan"]["run"] == ["emoji"]
+    assert result["emoji_score"] == 0.0 and "hallucination_score" not in result
+    assert not scorer_adapter.method_calls  # no judge, no moderation
+    assert result["artifact_path"].startswith(str(tmp_path))
+
+
+def test_evaluator_variants_are_compiled_once(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.domain.workflow_graph import get_graph
+
+    toxicity_only = get_graph(["toxicity"])
+
+    assert get_graph({"toxicity"}) is toxicity_only
+    assert set(toxicity_only.get_graph().nodes) >= {"toxicity", "plan_evaluation"}
+    assert not {"judge", "hallucination", "score_emoji"} & set(toxicity_only.get_graph().nodes)
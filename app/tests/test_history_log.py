@@ -0,0 +1,100 @@
+# app/tests/test_history_log.py
+
+import json
+import os
+
+from app.services.history_log import HistoryLogConfig, HistoryTail, SegmentedHistoryLog
+
+
+def _line(i, day="06"):
+    return json.dumps({
+        "timestamp": f"202512{day}_1200{i:02d}",
+        "input": f"prompt {i}",
+        "toxicity_score": 0.1,
+        "cost": 1e-6,
+        "token_usage": {"input": 1, "output": 2, "total": 3},
+    }) + "\n"
+
+
+def test_rotates_by_size_and_reads_all_segments(tmp_path):
+    log = SegmentedHistoryLog(
+        str(tmp_path / "history.jsonl"),
+        HistoryLogConfig(max_segment_bytes=200, max_segment_age_seconds=1e9),
+    )
+
+    for i in range(6):
+        log.append([_line(i)])
+
+    assert len(log.cold_segments()) >= 2
+    assert all(path.endswith(".jsonl.gz") for path in log.cold_segments())
+    assert [r["input"] for r in log.iter_records()] == [f"prompt {i}" for i in range(6)]
+
+
+def test_compaction_writes_day_partitions(tmp_path):
+    log = SegmentedHistoryLog(str(tmp_path / "history.jsonl"), HistoryLogConfig())
+    log.append([_line(0, day="05"), _line(1, day="06")])
+    log.rotate()
+    log.append([_line(2, day="07")])
+
+    result = log.compact()
+
+    assert result == {"segments": 1, "records": 2}
+    assert log.cold_segments() == []
+    assert sorted(os.listdir(tmp_path / "parquet")) == ["day=2025-12-05", "day=2025-12-06"]
+
+    # parquet tier first, then the active segment
+    records = list(log.iter_records())
+    assert [r["input"] for r in records] == ["prompt 0", "prompt 1", "prompt 2"]
+    assert records[0]["token_usage"] == {"input": 1, "output": 2, "total": 3}
+
+    batches = list(log.scan(columns=["cost"], days=["2025-12-06"]))
+    assert [b.num_rows for b in batches] == [1]
+    assert batches[0].schema.names == ["cost"]
+
+
+def test_compaction_round_trip_keeps_every_field(tmp_path):
+    log = SegmentedHistoryLog(str(tmp_path / "history.jsonl"), HistoryLogConfig())
+    record = {
+        **json.loads(_line(0)),
+        "run_id": "r1",
+        "cache": {"hits": 2},
+        "toxicity_source": "remote",
+        "node_metrics": {"generate": {"wall_seconds": 0.5}},
+        "evaluation_plan": {"run": ["toxicity"], "skipped": {"emoji": "sampled_out"}},
+        "judge_fallbacks": ["emoji"],
+    }
+    log.append([json.dumps(record) + "\n"])
+    log.rotate()
+    log.compact()
+
+    assert list(log.iter_records()) == [record]
+
+
+def test_tail_parses_only_appended_lines(tmp_path):
+    path = tmp_path / "history.jsonl"
+    path.write_text("".join(_line(i) for i in range(50)))
+    tail = HistoryTail(str(path), keep=5)
+
+    assert [r["input"] for r in tail.latest(3)] == ["prompt 49", "prompt 48", "prompt 47"]
+    assert len(tail.records) == 5  # the first read starts near the end
+    assert tail.refresh() == []  # unchanged file
+
+    with open(path, "a") as f:
+        f.write(_line(50) + _line(51)[:20])  # the second line is still being written
+    assert [r["input"] for r in tail.refresh()] == ["prompt 50"]
+    with open(path, "a") as f:
+        f.write(_line(51)[20:])
+    assert [r["input"] for r in tail.refresh()] == ["prompt 51"]
+
+
+def test_tail_follows_rotation(tmp_path):
+    log = SegmentedHistoryLog(str(tmp_path / "history.jsonl"), HistoryLogConfig())
+    log.append([_line(0), _line(1)])
+    tail = HistoryTail(log.active_path)
+    tail.refresh()
+
+    log.rotate()
+    log.append([_line(2)])
+
+    assert [r["input"] for r in tail.refresh()] == ["prompt 2"]
+    assert [r["input"] for r in tail.latest(5)] == ["prompt 2", "prompt 1", "prompt 0"]
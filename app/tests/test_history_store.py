@@ -0,0 +1,71 @@
+# app/tests/test_history_store.py
+
+import json
+
+import pytest
+
+from app.services import history_store
+from app.services.artifact_service import ArtifactService
+from app.services.history_store import HistoryStore
+
+
+def _entry(i, **overrides):
+    entry = {
+        "timestamp": f"20251206_0000{i:02d}",
+        "input": f"prompt {i}",
+        "output": "out",
+        "toxicity_score": i / 100,
+        "hallucination_score": 0.0,
+        "emoji_score": 0.0,
+        "cost": i * 1e-6,
+        "duration_seconds": 1.0,
+    }
+    entry.update(overrides)
+    return entry
+
+
+def test_query_pages_newest_first(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.insert_many(_entry(i) for i in range(10))
+
+    first = store.query(limit=4)
+    second = store.query(limit=4, offset=4)
+    last = store.query(limit=4, offset=8)
+
+    assert [e["input"] for e in first["items"]] == ["prompt 9", "prompt 8", "prompt 7", "prompt 6"]
+    assert second["items"][0]["input"] == "prompt 5"
+    assert first["has_more"] and second["has_more"]
+    assert not last["has_more"] and len(last["items"]) == 2
+
+
+def test_query_filters_on_score_ranges(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.insert_many(_entry(i) for i in range(10))
+
+    page = store.query(sort_by="cost", descending=False, ranges={"toxicity_score": (0.03, 0.05)})
+
+    assert [e["input"] for e in page["items"]] == ["prompt 3", "prompt 4", "prompt 5"]
+
+    with pytest.raises(ValueError):
+        store.query(ranges={"input": ("a", None)})
+
+
+def test_backfill_streams_records_in_chunks(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+
+    assert store.backfill((_entry(i) for i in range(25)), chunk_size=10) == 25
+    assert store.count() == 25
+
+
+def test_store_backfills_from_the_log_runs_are_written_to(tmp_path, monkeypatch):
+    log_path = tmp_path / "logs" / "history.jsonl"
+    monkeypatch.setenv("HISTORY_PATH", str(log_path))
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history.sqlite3"))
+    monkeypatch.setattr(history_store, "_store", None)
+
+    service = ArtifactService()
+    assert service.history_path == str(log_path)
+    log_path.write_text("".join(json.dumps(_entry(i)) + "\n" for i in range(3)))
+
+    assert history_store.get_history_store().count() == 3
+    history_store.get_history_store().close()
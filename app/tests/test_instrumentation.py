@@ -0,0 +1,81 @@
+# app/tests/test_instrumentation.py
+
+import json
+from unittest.mock import MagicMock
+
+from openai.types.responses import ResponseUsage
+
+from app.adapters.openai_adapter import OpenAIAdapter
+from app.domain.instrumentation import MetricsRegistry, instrument
+
+
+def _usage(i, o):
+    return ResponseUsage.model_construct(input_tokens=i, output_tokens=o, total_tokens=i + o)
+
+
+def test_graph_records_per_node_metrics_into_artifact(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.domain.workflow_graph import build_graph
+    from app.services.artifact_service import ArtifactService
+    from app.services.emoji_service import EmojiService
+    from app.services.hallucination_service import HallucinationService
+    from app.services.llm_service import LLMService
+    from app.services.toxicity_service import ToxicityService
+
+    client = MagicMock()
+    client.responses.create.side_effect = lambda **kw: (
+        MagicMock(output_text='{"hallucination": 0.1}', usage=_usage(7, 3)) if "text" in kw
+        else MagicMock(output_text="Hello world", usage=_usage(5, 2))
+    )
+    adapter = OpenAIAdapter(client=client, cache=MagicMock(get=MagicMock(return_value=None)))
+
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+
+    graph = build_graph(
+        llm=LLMService(adapter=adapter),
+        tox=ToxicityService(adapter=adapter),
+        hal=HallucinationService(adapter=adapter),
+        art=art,
+        emoji=EmojiService(adapter=adapter),
+        judge_mode="combined",
+    )
+    result = graph.invoke({"user_input": "hi"})
+    metrics = result["node_metrics"]
+
+    assert metrics["generate"]["adapter_calls"] == 1
+    assert (metrics["generate"]["input_tokens"], metrics["generate"]["output_tokens"]) == (5, 2)
+    assert metrics["judge"]["input_tokens"] == 7
+    assert metrics["score_emoji"]["adapter_calls"] == 0  # local scorer
+    assert metrics["plan_evaluation"]["adapter_calls"] == 0
+    assert "make_emoji" not in metrics  # routed around without emoji_mode
+
+    with open(result["artifact_path"]) as f:
+        artifact = json.load(f)
+    assert set(artifact["node_metrics"]) >= {"generate", "judge", "toxicity", "score_emoji"}
+    # the run's own cache use: the judge and moderation calls missed
+    assert artifact["cache"] == {"hits": 0, "misses": 2}
+
+
+def test_registry_renders_prometheus_histograms_and_counters():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    func, _ = instrument("slow", lambda state: {"x": 1}, None, registry=registry)
+
+    def boom(state):
+        raise ValueError("nope")
+    failing, _ = instrument("boom", boom, None, registry=registry)
+
+    assert func({})["node_metrics"]["slow"]["adapter_calls"] == 0
+    try:
+        failing({})
+    except ValueError:
+        pass
+
+    text = registry.render()
+
+    assert "# TYPE graph_node_duration_seconds histogram" in text
+    assert 'graph_node_duration_seconds_bucket{node="slow",le="+Inf"} 1' in text
+    assert 'graph_node_duration_seconds_count{node="slow"} 1' in text
+    assert 'graph_node_errors_total{node="boom"} 1' in text
+    assert 'graph_node_tokens_total{node="slow",direction="input"} 0' in text
@@ -0,0 +1,117 @@
+# app/tests/test_job_queue.py
+
+import asyncio
+import time
+
+from app.services.job_queue import JobConfig, JobQueue, JobWorkers
+
+
+def test_jobs_are_claimed_once_in_order(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    first = queue.enqueue({"input": "a"})
+    second = queue.enqueue({"input": "b"})
+
+    assert queue.claim()["job_id"] == first["job_id"]
+    assert queue.claim()["job_id"] == second["job_id"]
+    assert queue.claim() is None
+
+    queue.complete(first["job_id"], {"llm_output": "A"})
+    queue.fail(second["job_id"], "boom")
+    assert queue.get(first["job_id"])["state"] == {"llm_output": "A"}
+    assert queue.get(second["job_id"])["error"] == "boom"
+    assert queue.counts() == {"queued": 0, "running": 0, "succeeded": 1, "failed": 1}
+
+
+def test_running_jobs_are_requeued_once_their_lease_runs_out(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path, lease_seconds=0.05)
+    job = queue.enqueue({"input": "a"})
+    queue.claim()
+    queue.close()  # the process dies mid-run
+
+    reopened = JobQueue(path)
+    assert reopened.recover() == 0  # still leased: it may be running elsewhere
+    time.sleep(0.1)
+    assert reopened.recover() == 1
+    claimed = reopened.claim()
+    assert claimed["job_id"] == job["job_id"] and claimed["attempts"] == 2
+
+
+def test_heartbeat_keeps_a_job_leased(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.1)
+    job = queue.enqueue({"input": "a"})
+    queue.claim()
+
+    time.sleep(0.06)
+    queue.heartbeat(job["job_id"])
+    time.sleep(0.06)
+
+    assert queue.recover() == 0
+    assert queue.get(job["job_id"])["status"] == "running"
+
+
+def test_jobs_interrupted_too_often_are_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0, max_attempts=2)
+    job = queue.enqueue({"input": "a"})
+
+    assert queue.claim()["attempts"] == 1
+    assert queue.claim()["attempts"] == 2  # the first lease had already expired
+    assert queue.claim() is None
+
+    failed = queue.get(job["job_id"])
+    assert failed["status"] == "failed" and "giving up" in failed["error"]
+
+
+def test_idempotency_key_returns_the_original_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job = queue.enqueue({"input": "a"}, idempotency_key="k1")
+
+    assert queue.enqueue({"input": "a"}, idempotency_key="k1")["job_id"] == job["job_id"]
+    assert queue.counts()["queued"] == 1
+
+
+def test_workers_run_jobs_and_wait_returns_the_result(tmp_path):
+    async def runner(request):
+        await asyncio.sleep(0.01)
+        if request["input"] == "boom":
+            raise RuntimeError("generation failed")
+        return {"llm_output": request["input"].upper()}
+
+    async def run():
+        config = JobConfig(workers=2, poll_interval_seconds=0.05)
+        workers = JobWorkers(JobQueue(str(tmp_path / "jobs.sqlite3")), runner, config)
+        await workers.start()
+        try:
+            ok = workers.queue.enqueue({"input": "a"})
+            bad = workers.queue.enqueue({"input": "boom"})
+            workers.notify()
+            return await workers.wait(ok["job_id"], 5), await workers.wait(bad["job_id"], 5)
+        finally:
+            await workers.stop()
+
+    ok, bad = asyncio.run(run())
+
+    assert ok["status"] == "succeeded" and ok["state"] == {"llm_output": "A"}
+    assert bad["status"] == "failed" and bad["error"] == "generation failed"
+
+
+def test_stop_requeues_running_jobs_and_wait_drops_its_event(tmp_path):
+    started = asyncio.Event()
+
+    async def runner(request):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def run():
+        config = JobConfig(workers=1, poll_interval_seconds=0.05)
+        workers = JobWorkers(JobQueue(str(tmp_path / "jobs.sqlite3")), runner, config)
+        await workers.start()
+        job = workers.queue.enqueue({"input": "a"})
+        workers.notify()
+        await started.wait()
+        assert (await workers.wait(job["job_id"], 0.01))["status"] == "running"
+        assert workers._finished == {}
+        await workers.stop()
+        return workers.queue.get(job["job_id"])
+
+    assert asyncio.run(run())["status"] == "queued"
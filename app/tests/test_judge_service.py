@@ -0,0 +1,54 @@
+# app/tests/test_judge_service.py
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.judge_service import EMOJI, HALLUCINATION, Evaluator, JudgeService
+
+
+def _judge(text, evaluators=(HALLUCINATION, EMOJI)):
+    adapter = MagicMock()
+    adapter.generate_json.return_value = {"text": text}
+    return JudgeService(adapter=adapter, async_adapter=MagicMock(), evaluators=evaluators), adapter
+
+
+def test_schema_is_strict_and_covers_every_evaluator():
+    judge, _ = _judge("{}")
+    schema = judge.schema()
+
+    assert schema["required"] == ["hallucination", "emoji"]
+    assert schema["additionalProperties"] is False
+
+
+def test_invalid_fields_fall_back_individually():
+    judge, _ = _judge('{"hallucination": 0.2, "emoji": 1.7}')
+
+    update = judge.judge({"user_input": "q", "llm_output": "a"})
+
+    assert update["hallucination_score"] == 0.2
+    assert update["emoji_score"] == EMOJI.fallback
+    assert update["judge_fallbacks"] == ["emoji"]
+
+
+@pytest.mark.parametrize("text", ["not json", "[0.1, 0.2]", '{"hallucination": true}'])
+def test_unparseable_answers_use_every_fallback(text):
+    judge, _ = _judge(text)
+
+    update = judge.judge({"llm_output": "a"})
+
+    assert update["hallucination_score"] == HALLUCINATION.fallback
+    assert update["judge_fallbacks"] == ["hallucination", "emoji"]
+
+
+def test_new_metrics_join_the_same_call():
+    relevance = Evaluator(key="relevance", state_key="relevance_score", criteria="On topic?", fallback=0.0)
+    judge, adapter = _judge('{"hallucination": 0, "relevance": 0.9}', evaluators=(HALLUCINATION, relevance))
+
+    update = judge.judge({"user_input": "q", "llm_output": "a", "cache_bypass": True})
+
+    assert update == {"hallucination_score": 0.0, "relevance_score": 0.9, "judge_fallbacks": []}
+    assert adapter.generate_json.call_count == 1
+    prompt, schema = adapter.generate_json.call_args.args
+    assert "relevance: On topic?" in prompt
+    assert adapter.generate_json.call_args.kwargs["use_cache"] is False
@@ -0,0 +1,90 @@
+# app/tests/test_moderation_batcher.py
+
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.adapters.moderation_batcher import BatcherConfig, ModerationBatcher
+from app.adapters.openai_adapter import AsyncOpenAIAdapter
+
+
+def _client():
+    client = MagicMock()
+    client.moderations.create.side_effect = lambda model, input, **kwargs: MagicMock(
+        results=[f"result:{text}" for text in input]
+    )
+    return client
+
+
+def _batcher(client, **overrides):
+    config = BatcherConfig(**{"max_wait_ms": 50, **overrides})
+    return ModerationBatcher("omni-moderation-latest", client_factory=lambda: client, config=config)
+
+
+def test_concurrent_callers_share_one_call():
+    client = _client()
+    batcher = _batcher(client)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda t: batcher.submit(t).result(timeout=5), [f"t{i}" for i in range(8)]))
+    batcher.close()
+
+    assert results == [f"result:t{i}" for i in range(8)]
+    assert client.moderations.create.call_count == 1
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 1 and stats["batch_size"]["buckets"]["8"] == 1
+    assert stats["wait_ms"]["count"] == 8
+
+
+def test_batches_are_capped_at_max_size():
+    client = _client()
+    batcher = _batcher(client, max_batch_size=3)
+
+    futures = [batcher.submit(f"t{i}") for i in range(7)]
+    results = [f.result(timeout=5) for f in futures]
+    batcher.close()
+
+    assert results == [f"result:t{i}" for i in range(7)]
+    sizes = [len(c.kwargs["input"]) for c in client.moderations.create.call_args_list]
+    assert sizes == [3, 3, 1]
+
+
+def test_failed_call_fails_every_caller_in_the_batch():
+    client = MagicMock()
+    client.moderations.create.side_effect = RuntimeError("rate limited")
+    batcher = _batcher(client)
+
+    futures = [batcher.submit("a"), batcher.submit("b")]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="rate limited"):
+            future.result(timeout=5)
+    assert batcher.stats()["errors"] == 1
+    batcher.close()
+
+
+def test_close_fails_texts_still_queued():
+    batcher = _batcher(_client())
+    future = Future()
+    batcher._queue.put(("late", future, time.perf_counter()))  # queued behind a stop
+
+    batcher.close()
+
+    with pytest.raises(RuntimeError, match="closed"):
+        future.result(timeout=0)
+
+
+def test_async_adapter_awaits_batched_results():
+    client = _client()
+    batcher = _batcher(client)
+    adapter = AsyncOpenAIAdapter(client=MagicMock(), cache=MagicMock(), batcher=batcher)
+
+    async def run():
+        return await asyncio.gather(*(adapter.moderate_text(t) for t in ("x", "y", "z")))
+
+    assert asyncio.run(run()) == ["result:x", "result:y", "result:z"]
+    assert client.moderations.create.call_count == 1
+    batcher.close()
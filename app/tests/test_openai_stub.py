@@ -0,0 +1,74 @@
+# app/tests/test_openai_stub.py
+
+import asyncio
+import socket
+import threading
+import time
+
+import openai
+import pytest
+import uvicorn
+from openai import AsyncOpenAI, OpenAI
+
+from app.adapters.openai_adapter import AsyncOpenAIAdapter, OpenAIAdapter
+from app.adapters.resilience import CallPolicy, CallPolicyConfig
+from app.adapters.response_cache import CacheConfig, ResponseCache
+from benchmarks.fake_adapter import Latency
+from benchmarks.openai_stub import StubConfig, create_app
+
+
+@pytest.fixture
+def stub_url():
+    def start(**overrides):
+        fast = Latency(kind="constant", mean_ms=1)
+        config = StubConfig(latency=fast, moderation_latency=fast, seed=0, **overrides)
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(create_app(config), log_level="warning"))
+        threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        servers.append(server)
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+
+    servers = []
+    yield start
+    for server in servers:
+        server.should_exit = True
+
+
+def _cache():
+    return ResponseCache(CacheConfig(enabled=False, db_path=None))
+
+
+def test_adapter_round_trips_through_the_stub(stub_url):
+    client = OpenAI(api_key="sk-stub", base_url=stub_url())
+    adapter = OpenAIAdapter(client=client, cache=_cache())
+
+    text = adapter.generate_text("hello")
+    judged = adapter.generate_json("grade", {"type": "object", "properties": {"hallucination": {"type": "number"}}})
+    moderation = adapter.moderate_text("hello")
+
+    assert text["text"] and text["usage"].total_tokens > 0
+    assert "hallucination" in judged["text"]
+    assert moderation.category_scores.hate < 1e-3
+
+
+def test_async_stream_follows_the_responses_event_format(stub_url):
+    adapter = AsyncOpenAIAdapter(client=AsyncOpenAI(api_key="sk-stub", base_url=stub_url()), cache=_cache())
+    deltas = []
+
+    result = asyncio.run(adapter.stream_text("hello", deltas.append))
+
+    assert "".join(deltas) == result["text"] and len(deltas) > 1
+    assert result["usage"].output_tokens > 0
+
+
+def test_injected_rate_limits_surface_as_429(stub_url):
+    client = OpenAI(api_key="sk-stub", base_url=stub_url(rate_limit_rate=1.0), max_retries=0)
+
+    with pytest.raises(openai.RateLimitError) as excinfo:
+        adapter = OpenAIAdapter(client=client, cache=_cache(), policy=CallPolicy(CallPolicyConfig(max_attempts=1)))
+        adapter.generate_text("hello")
+
+    assert excinfo.value.response.headers["retry-after"] == "1.0"
@@ -0,0 +1,91 @@
+# app/tests/test_rate_limiter.py
+
+import asyncio
+import random
+from unittest.mock import MagicMock
+
+import openai
+import pytest
+
+try:  # the HTTP stack the installed OpenAI SDK uses
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+from app.adapters.openai_adapter import OpenAIAdapter
+from app.adapters.rate_limiter import (
+    Overloaded,
+    Priority,
+    RateLimitConfig,
+    RateLimitScheduler,
+    priority_scope,
+)
+from app.adapters.resilience import CallPolicy, CallPolicyConfig
+from app.adapters.response_cache import CacheConfig, ResponseCache
+
+
+def test_interactive_calls_jump_queued_evaluators():
+    scheduler = RateLimitScheduler(RateLimitConfig(requests_per_minute=600))  # one grant per 100 ms
+    scheduler.requests.level = 0
+    order = []
+
+    async def call(name, priority):
+        with priority_scope(priority):
+            await scheduler.aacquire(10)
+        order.append(name)
+
+    async def run():
+        judge = asyncio.create_task(call("judge", Priority.EVALUATOR))
+        await asyncio.sleep(0.01)  # the judge queues first
+        await asyncio.gather(judge, call("generate", Priority.INTERACTIVE))
+
+    asyncio.run(run())
+
+    assert order == ["generate", "judge"]
+    stats = scheduler.stats()
+    assert stats["granted"] == 2 and stats["wait_ms"]["evaluator"]["count"] == 1
+
+
+def test_settle_corrects_the_token_estimate():
+    scheduler = RateLimitScheduler(RateLimitConfig(tokens_per_minute=60_000))
+    reserved = scheduler.estimate("x" * 400)  # 100 prompt + 256 expected output
+    scheduler.acquire(reserved)
+    scheduler.settle(reserved, actual=2_000)
+
+    assert reserved == 356
+    assert scheduler.tokens.level == pytest.approx(58_000, abs=50)
+
+
+def test_admission_sheds_when_the_queue_cannot_drain_in_time():
+    scheduler = RateLimitScheduler(RateLimitConfig(requests_per_minute=60, max_queue_wait_seconds=5))
+    scheduler.requests.level = -10  # ~11 s until the next request fits
+
+    with pytest.raises(Overloaded) as excinfo:
+        scheduler.admit()
+
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after > 5
+
+
+def test_failed_attempts_refund_their_reservation():
+    scheduler = RateLimitScheduler(RateLimitConfig(tokens_per_minute=60_000))
+    request = httpx.Request("POST", "http://stub/v1/responses")
+    throttled = openai.APIStatusError(
+        "stub", response=httpx.Response(429, request=request, headers={"retry-after": "0"}), body=None
+    )
+    client = MagicMock()
+    client.responses.create.side_effect = [
+        throttled,
+        throttled,
+        MagicMock(output_text="ok", usage=MagicMock(total_tokens=1_000)),
+    ]
+    adapter = OpenAIAdapter(
+        client=client,
+        cache=ResponseCache(CacheConfig(db_path=None)),
+        policy=CallPolicy(CallPolicyConfig(backoff_base_seconds=0.001), rng=random.Random(0)),
+        rate_limiter=scheduler,
+    )
+
+    assert adapter.generate_text("x" * 400)["text"] == "ok"
+    # only the successful attempt's real usage is left on the bucket
+    assert scheduler.tokens.level == pytest.approx(59_000, abs=50)
@@ -0,0 +1,120 @@
+# app/tests/test_resilience.py
+
+import asyncio
+import random
+import time
+from unittest.mock import MagicMock
+
+import openai
+import pytest
+
+try:  # the HTTP stack the installed OpenAI SDK uses
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+from app.adapters.openai_adapter import OpenAIAdapter
+from app.adapters.resilience import CallPolicy, CallPolicyConfig, DeadlineExceeded, deadline_scope
+from app.adapters.response_cache import CacheConfig, ResponseCache
+
+
+def _status_error(status: int, retry_after: str = "0"):
+    request = httpx.Request("POST", "http://stub/v1/responses")
+    response = httpx.Response(status, request=request, headers={"retry-after": retry_after})
+    return openai.APIStatusError("stub", response=response, body=None)
+
+
+def _policy(**overrides):
+    config = CallPolicyConfig(**{"backoff_base_seconds": 0.001, **overrides})
+    return CallPolicy(config, rng=random.Random(0))
+
+
+def test_rate_limit_is_retried_then_succeeds():
+    policy = _policy()
+    fn = MagicMock(side_effect=[_status_error(429), _status_error(503), "ok"])
+
+    assert policy.call("responses", fn) == "ok"
+    assert fn.call_count == 3 and policy.retries == 2
+
+
+def test_client_errors_are_not_retried():
+    policy = _policy()
+    fn = MagicMock(side_effect=_status_error(400))
+
+    with pytest.raises(openai.APIStatusError):
+        policy.call("responses", fn)
+    assert fn.call_count == 1
+
+
+def test_timeouts_shrink_to_the_deadline_and_stop_there():
+    policy = _policy(timeout_seconds=30)
+    fn = MagicMock(return_value="ok")
+
+    with deadline_scope(time.time() + 2):
+        policy.call("responses", fn)
+    assert fn.call_args.args[0] <= 2
+
+    with deadline_scope(time.time() - 1), pytest.raises(DeadlineExceeded):
+        policy.call("responses", fn)
+    assert fn.call_count == 1 and policy.deadline_exceeded == 1
+
+
+def test_retry_after_past_the_deadline_gives_up():
+    policy = _policy()
+    throttled = _status_error(429, retry_after="5")
+    fn = MagicMock(side_effect=throttled)
+
+    with deadline_scope(time.time() + 1), pytest.raises(DeadlineExceeded) as excinfo:
+        policy.call("responses", fn)
+    assert excinfo.value.__cause__ is throttled  # surfaces as a 504, not a 500
+    assert fn.call_count == 1 and policy.deadline_exceeded == 1
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    policy = _policy(hedge_enabled=True, hedge_initial_delay_seconds=0.05)
+    delays = iter([1.0, 0.0])
+
+    def fn(timeout):
+        time.sleep(next(delays))
+        return "done"
+
+    started = time.perf_counter()
+    assert policy.call("responses.json", fn, hedge=True) == "done"
+    assert time.perf_counter() - started < 0.5
+    assert policy.hedges == 1 and policy.hedge_wins == 1
+
+
+def test_async_hedge_cancels_the_loser():
+    policy = _policy(hedge_enabled=True, hedge_initial_delay_seconds=0.05)
+    cancelled = []
+    delays = iter([1.0, 0.0])
+
+    async def afn(timeout):
+        try:
+            await asyncio.sleep(next(delays))
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "done"
+
+    async def run():
+        result = await policy.acall("responses.json", afn, hedge=True)
+        await asyncio.sleep(0)  # let the cancellation land
+        return result
+
+    assert asyncio.run(run()) == "done"
+    assert cancelled == [True] and policy.hedge_wins == 1
+
+
+def test_adapter_passes_per_attempt_timeout():
+    client = MagicMock()
+    client.responses.create.side_effect = [_status_error(500), MagicMock(output_text="hi", usage=None)]
+    adapter = OpenAIAdapter(
+        client=client,
+        cache=ResponseCache(CacheConfig(enabled=False, db_path=None)),
+        policy=_policy(timeout_seconds=7),
+    )
+
+    assert adapter.generate_text("hello")["text"] == "hi"
+    assert client.responses.create.call_count == 2
+    assert client.responses.create.call_args.kwargs["timeout"] == 7
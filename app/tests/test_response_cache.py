@@ -0,0 +1,110 @@
+# app/tests/test_response_cache.py
+
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+from app.adapters.call_metrics import node_scope
+from app.adapters.openai_adapter import OpenAIAdapter
+from app.adapters.response_cache import CacheConfig, ResponseCache, cache_key
+
+
+def _cache(tmp_path, **overrides):
+    config = CacheConfig(db_path=str(tmp_path / "responses.sqlite3"), **overrides)
+    return ResponseCache(config)
+
+
+def test_cache_key_depends_on_model_and_prompt():
+    assert cache_key("responses", "m1", "hi") == cache_key("responses", "m1", "hi")
+    assert cache_key("responses", "m1", "hi") != cache_key("responses", "m2", "hi")
+    assert cache_key("responses", "m1", "hi") != cache_key("responses", "m1", "hi!")
+
+
+def test_cache_key_separates_endpoints():
+    real = cache_key("responses", "m1", "hi", "https://api.openai.com/v1/")
+    stub = cache_key("responses", "m1", "hi", "http://127.0.0.1:8081/v1/")
+    assert real != stub
+
+
+def test_lru_falls_back_to_disk_tier(tmp_path):
+    cache = _cache(tmp_path, max_entries=1)
+
+    cache.set("a", {"text": "A"})
+    cache.set("b", {"text": "B"})  # evicts "a" from memory, not from disk
+
+    assert cache.get("b") == {"text": "B"}
+    assert cache.get("a") == {"text": "A"}
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_expired_disk_entries_are_ignored(tmp_path):
+    cache = _cache(tmp_path, max_entries=1, ttl_seconds=-1)
+
+    cache.set("a", {"text": "A"})
+    cache.set("b", {"text": "B"})
+
+    assert cache.get("a") is None
+
+
+def test_adapter_serves_repeat_calls_from_cache(tmp_path):
+    client = MagicMock()
+    client.responses.create.return_value = MagicMock(output_text="0.3", usage=None)
+    adapter = OpenAIAdapter(client=client, cache=_cache(tmp_path))
+
+    first = adapter.generate_text("score this", use_cache=True)
+    second = adapter.generate_text("score this", use_cache=True)
+    bypassed = adapter.generate_text("score this", use_cache=False)
+
+    assert first["text"] == second["text"] == bypassed["text"] == "0.3"
+    assert client.responses.create.call_count == 2
+
+
+def test_cache_hits_are_not_counted_as_adapter_calls(tmp_path):
+    client = MagicMock()
+    client.responses.create.return_value = MagicMock(output_text="0.3", usage=None)
+    adapter = OpenAIAdapter(client=client, cache=_cache(tmp_path))
+
+    with node_scope() as calls:
+        adapter.generate_text("score this", use_cache=True)
+        adapter.generate_text("score this", use_cache=True)
+        adapter.generate_text("write this")
+
+    assert calls.to_dict()["adapter_calls"] == 2
+    assert (calls.cache_hits, calls.cache_misses) == (1, 1)
+
+
+def test_disk_hits_defer_their_recency_update(tmp_path):
+    cache = _cache(tmp_path, max_entries=1)
+    cache.set("a", {"text": "A"})
+    cache.set("b", {"text": "B"})
+
+    before = cache._db.total_changes
+    assert cache.get("a") == {"text": "A"}
+    assert cache._db.total_changes == before  # a read costs no write
+
+    cache.set("c", {"text": "C"})  # the touch rides along with the next write
+    assert cache._db.total_changes == before + 2
+
+
+def test_async_lookups_keep_disk_io_off_the_event_loop(tmp_path):
+    cache = _cache(tmp_path, max_entries=1)
+    loop_thread = threading.get_ident()
+    disk_threads = []
+    get_disk = cache._get_disk
+
+    def recording_get_disk(key):
+        disk_threads.append(threading.get_ident())
+        return get_disk(key)
+
+    cache._get_disk = recording_get_disk
+
+    async def run():
+        await cache.aset("a", {"text": "A"})
+        await cache.aset("b", {"text": "B"})
+        return await cache.aget("b"), await cache.aget("a")
+
+    assert asyncio.run(run()) == ({"text": "B"}, {"text": "A"})
+    assert disk_threads and loop_thread not in disk_threads
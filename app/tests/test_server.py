@@ -0,0 +1,221 @@
+# app/tests/test_server.py
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+class FakeGraph:
+    """Stands in for the compiled graph; records calls and peak concurrency."""
+    def __init__(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def ainvoke(self, state):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if state["user_input"] == "boom":
+                raise RuntimeError("generation failed")
+            return {**state, "llm_output": state["user_input"].upper()}
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.api import server
+
+    monkeypatch.setattr(server, "graph", FakeGraph())
+    return server
+
+
+def test_batch_streams_every_item_and_isolates_failures(server):
+    client = TestClient(server.app)
+    items = [{"input": "a"}, {"input": "boom"}, {"input": "c"}, {"input": "d"}]
+
+    response = client.post(
+        "/run-graph/batch", json={"items": items, "max_concurrency": 2}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_index = {line["index"]: line for line in lines}
+
+    assert sorted(by_index) == [0, 1, 2, 3]
+    assert by_index[0]["state"]["llm_output"] == "A"
+    assert by_index[1]["error"] == "generation failed"
+    assert server.graph.peak <= 2
+
+
+class StreamingAdapter:
+    """Async adapter double that streams its generation in two fragments."""
+    async def stream_text(self, prompt, on_delta):
+        for part in ("Hel", "lo"):
+            on_delta(part)
+        return {
+            "text": "Hello",
+            "usage": MagicMock(input_tokens=1, output_tokens=2, total_tokens=3),
+        }
+
+    async def generate_text(self, prompt, use_cache=False):
+        return {"text": "0.1"}
+
+    async def moderate_text(self, text, use_cache=False):
+        scores = MagicMock()
+        scores.model_dump.return_value = {"hate": 0.0}
+        return MagicMock(category_scores=scores)
+
+
+def test_stream_emits_tokens_then_node_events(server, monkeypatch, tmp_path):
+    from app.domain.workflow_graph import build_graph
+    from app.services.artifact_service import ArtifactService
+    from app.services.emoji_service import EmojiService
+    from app.services.hallucination_service import HallucinationService
+    from app.services.llm_service import LLMService
+    from app.services.toxicity_service import ToxicityService
+
+    adapter = StreamingAdapter()
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+    monkeypatch.setattr(server, "graph", build_graph(
+        llm=LLMService(adapter=MagicMock(), async_adapter=adapter),
+        tox=ToxicityService(adapter=MagicMock(), async_adapter=adapter),
+        hal=HallucinationService(adapter=MagicMock(), async_adapter=adapter),
+        art=art,
+        emoji=EmojiService(adapter=MagicMock(), async_adapter=adapter),
+    ))
+
+    response = TestClient(server.app).post("/run-graph/stream", json={"input": "hi"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0].removeprefix("event: "),
+         json.loads(block.split("\n")[1].removeprefix("data: ")))
+        for block in response.text.strip().split("\n\n")
+    ]
+    names = [name for name, _ in events]
+
+    assert names[:2] == ["token", "token"]
+    assert "".join(data["delta"] for name, data in events if name == "token") == "Hello"
+
+    nodes = {data["node"]: data for name, data in events if name == "node"}
+    assert "llm_output" in nodes["generate"]["updated_keys"]
+    assert nodes["artifact"]["elapsed_seconds"] >= nodes["generate"]["elapsed_seconds"]
+
+    assert names[-1] == "done"
+    final = events[-1][1]["state"]
+    assert final["llm_output"] == "Hello"
+    assert {"generate", "artifact"} <= set(final["node_metrics"])  # merged, not the last node's
+    assert "stream_tokens" not in final
+
+
+def test_stream_rejects_a_run_id(server):
+    response = TestClient(server.app).post("/run-graph/stream", json={"input": "hi", "run_id": "r1"})
+
+    assert response.status_code == 422
+
+
+def test_metrics_exposes_prometheus_text(server):
+    response = TestClient(server.app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE graph_node_duration_seconds histogram" in response.text
+
+
+def test_run_is_shed_with_retry_after_when_queue_is_full(server, monkeypatch):
+    from app.adapters.rate_limiter import RateLimitConfig, RateLimitScheduler
+
+    full = RateLimitScheduler(RateLimitConfig(max_queue=0))
+    monkeypatch.setattr(server, "get_rate_limiter", lambda: full)
+
+    response = TestClient(server.app).post("/run-graph", json={"input": "hi"})
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    assert full.stats()["shed"] == 1
+
+
+def test_identical_concurrent_runs_share_one_execution(server, monkeypatch):
+    from app.api import single_flight
+
+    monkeypatch.setenv("RUN_COALESCING_ENABLED", "true")
+    monkeypatch.setattr(single_flight, "_single_flight", None)
+    items = [{"input": "cold war"}] * 3 + [{"input": "cold war", "emoji_mode": True}, {"input": "cold war", "cache_bypass": True}]
+
+    response = TestClient(server.app).post("/run-graph/batch", json={"items": items})
+    lines = [json.loads(line) for line in response.text.strip().split("\n")]
+
+    assert all(line["state"]["llm_output"] == "COLD WAR" for line in lines)
+    assert server.graph.calls == 3  # one shared run, one emoji_mode run, one bypass run
+    stats = TestClient(server.app).get("/stats").json()["coalescing"]
+    assert stats["leaders"] == 2 and stats["coalesced"] == 2
+
+
+def test_fields_projects_the_returned_state(server):
+    client = TestClient(server.app)
+
+    projected = client.post("/run-graph?fields=llm_output,toxicity_score", json={"input": "hi"})
+    unknown = client.post("/run-graph?fields=llm_output,secret", json={"input": "hi"})
+
+    assert projected.status_code == 200
+    assert projected.json() == {"state": {"llm_output": "HI"}}  # no score in the fake state
+    assert unknown.status_code == 422 and "secret" in unknown.json()["detail"]
+
+
+def test_jobs_are_queued_and_polled(server, monkeypatch, tmp_path):
+    from app.services.job_queue import JobConfig, JobQueue, JobWorkers
+
+    # workers not started: the job stays queued
+    jobs = JobWorkers(JobQueue(str(tmp_path / "jobs.sqlite3")), server._run_job, JobConfig())
+    monkeypatch.setattr(server, "jobs", jobs)
+    client = TestClient(server.app)
+
+    response = client.post("/jobs", json={"input": "hi"}, headers={"Idempotency-Key": "k1"})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.headers["location"] == f"/jobs/{job_id}"
+    again = client.post("/jobs", json={"input": "hi"}, headers={"Idempotency-Key": "k1"})
+    assert again.json()["job_id"] == job_id
+
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+    assert client.get("/jobs/missing").status_code == 404
+
+    # what a worker does with it
+    job = jobs.queue.claim()
+    jobs.queue.complete(job_id, asyncio.run(server._run_job(job["request"])))
+    body = client.get(f"/jobs/{job_id}", params={"fields": "llm_output"}).json()
+    assert body["status"] == "succeeded" and body["state"] == {"llm_output": "HI"}
+
+
+def test_import_needs_no_api_key_and_defers_the_graph():
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    code = "import sys, app.api.server; print([m for m in ('langgraph', 'aiosqlite') if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_ready_waits_for_warmup(server, monkeypatch):
+    client = TestClient(server.app)
+    monkeypatch.setattr(server, "jobs", None)  # lifespan not run
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["job_workers"] is False
+    assert client.get("/health").status_code == 200
+
+    monkeypatch.setattr(server, "jobs", MagicMock())
+    assert client.get("/ready").status_code == 200
@@ -1,5 +1,8 @@
 # app/tests/test_toxicity_service.py
 
+import pytest
+
+from app.services.toxicity_prefilter import PrefilterConfig, ToxicityPrefilter
 from app.services.toxicity_service import ToxicityService
 
 
@@ -23,7 +26,7 @@ class DummyAdapter:
     def __init__(self, scores):
         self.scores = scores
 
-    def moderate_text(self, text):
+    def moderate_text(self, text, use_cache=False):
         return DummyModerationResponse(
             DummyScores(self.scores)
         )
@@ -33,13 +36,17 @@ def test_toxicity_low_score():
     # Very low toxicity mapping
     mock_scores = {"insult": 0.001, "hate": 0.002}
 
-    svc = ToxicityService(adapter=DummyAdapter(mock_scores))
+    svc = ToxicityService(
+        adapter=DummyAdapter(mock_scores),
+        prefilter=ToxicityPrefilter(PrefilterConfig(enabled=False)),
+    )
 
     state = {"llm_output": "Hello world"}
     updated = svc.score_toxicity(state)
 
     assert "toxicity_score" in updated
     assert updated["toxicity_score"] == 0.002
+    assert updated["toxicity_source"] == "remote"
 
 
 def test_toxicity_empty_output():
@@ -48,4 +55,72 @@ def test_toxicity_empty_output():
     state = {"llm_output": ""}
     updated = svc.score_toxicity(state)
 
-    assert updated["toxicity_score"] == 0.0
\ No newline at end of file
+    assert updated["toxicity_score"] == 0.0
+
+
+class CountingAdapter(DummyAdapter):
+    def __init__(self, scores):
+        super().__init__(scores)
+        self.calls = 0
+
+    def moderate_text(self, text, use_cache=False):
+        self.calls += 1
+        return super().moderate_text(text, use_cache)
+
+
+def test_benign_text_skips_moderation_api_when_opted_in():
+    adapter = CountingAdapter({"hate": 0.5})
+    svc = ToxicityService(adapter=adapter, prefilter=ToxicityPrefilter(PrefilterConfig(local_benign=True)))
+
+    updated = svc.score_toxicity({"llm_output": "The Cold War ended in 1991."})
+
+    assert updated["toxicity_source"] == "local"
+    assert updated["toxicity_score"] < 0.001
+    assert adapter.calls == 0
+
+
+def test_uncertain_text_goes_to_moderation_api():
+    adapter = CountingAdapter({"harassment": 0.3})
+    svc = ToxicityService(adapter=adapter, prefilter=ToxicityPrefilter(PrefilterConfig()))
+
+    updated = svc.score_toxicity({"llm_output": "You're like a cloud: nobody wants you around."})
+
+    assert updated == {"toxicity_score": 0.3, "toxicity_source": "remote"}
+    assert adapter.calls == 1
+
+
+@pytest.mark.parametrize("text", [
+    "The nuclear bomb was the ultimate weapon; a surprise attack could leave millions dead.",
+    "How to kill a Python process: send SIGTERM and let it die gracefully.",
+])
+def test_benign_text_with_violent_vocabulary_is_not_decided_locally(text):
+    _, confident = ToxicityPrefilter(PrefilterConfig()).classify(text)
+
+    assert not confident
+
+
+def test_toxic_text_is_decided_locally_when_opted_in():
+    prefilter = ToxicityPrefilter(PrefilterConfig(local_toxic=True))
+
+    probability, confident = prefilter.classify("You are a worthless idiot and I hate you.")
+
+    assert confident and probability >= 0.9
+
+
+def test_unreadable_script_is_never_decided_locally():
+    prefilter = ToxicityPrefilter(PrefilterConfig())
+
+    _, confident = prefilter.classify("Привет, как дела?")
+
+    assert not confident
+
+
+def test_unlisted_toxic_text_goes_to_moderation_api_by_default():
+    adapter = CountingAdapter({"harassment": 0.8})
+    svc = ToxicityService(adapter=adapter, prefilter=ToxicityPrefilter(PrefilterConfig()))
+
+    # no lexicon hit (misspelled abuse), so the local score is near zero
+    updated = svc.score_toxicity({"llm_output": "ur a worthless lozer, go awai"})
+
+    assert updated == {"toxicity_score": 0.8, "toxicity_source": "remote"}
+    assert adapter.calls == 1
@@ -0,0 +1,333 @@
+# app/tests/test_workflow_graph.py
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.artifact_service import ArtifactService
+from app.services.emoji_service import EmojiService
+from app.services.hallucination_service import HallucinationService
+from app.services.llm_service import LLMService
+from app.services.toxicity_prefilter import PrefilterConfig, ToxicityPrefilter
+from app.services.toxicity_service import ToxicityService
+
+
+# Scorers must all reach the adapter, so the local toxicity fast path is off
+NO_PREFILTER = ToxicityPrefilter(PrefilterConfig(enabled=False))
+
+
+class BarrierAdapter:
+    """
+    Every scorer call blocks on a shared barrier, so the run only completes
+    if all three scorers are in flight at the same time.
+    """
+    def __init__(self, parties=3):
+        self.barrier = threading.Barrier(parties, timeout=5)
+
+    def generate_text(self, prompt, use_cache=False):
+        self.barrier.wait()
+        return {"text": "0.25"}
+
+    def moderate_text(self, text, use_cache=False):
+        self.barrier.wait()
+        scores = MagicMock()
+        scores.model_dump.return_value = {"hate": 0.01}
+        return MagicMock(category_scores=scores)
+
+
+def _build(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.domain.workflow_graph import build_graph
+
+    gen_adapter = MagicMock()
+    gen_adapter.generate_text.return_value = {
+        "text": "Hello world",
+        "usage": MagicMock(input_tokens=1, output_tokens=2, total_tokens=3),
+    }
+    scorer_adapter = BarrierAdapter()
+
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+
+    return build_graph(
+        llm=LLMService(adapter=gen_adapter),
+        tox=ToxicityService(adapter=scorer_adapter, prefilter=NO_PREFILTER),
+        hal=HallucinationService(adapter=scorer_adapter),
+        art=art,
+        emoji=EmojiService(adapter=scorer_adapter, scorer="llm"),
+        judge_mode="separate",
+    )
+
+
+def test_scorers_fan_out_after_planning(monkeypatch, tmp_path):
+    graph = _build(monkeypatch, tmp_path)
+    edges = {(e.source, e.target) for e in graph.get_graph().edges}
+
+    assert {("generate", "make_emoji"), ("generate", "plan_evaluation"), ("make_emoji", "plan_evaluation")} <= edges
+    for node in ("score_emoji", "toxicity", "hallucination"):
+        assert ("plan_evaluation", node) in edges
+        assert (node, "artifact") in edges
+
+
+def test_scorers_run_concurrently_and_merge(monkeypatch, tmp_path):
+    graph = _build(monkeypatch, tmp_path)
+
+    result = graph.invoke({"user_input": "hi", "emoji_mode": False})
+
+    assert result["llm_output"] == "Hello world"
+    assert result["emoji_score"] == 0.25
+    assert result["hallucination_score"] == 0.25
+    assert result["toxicity_score"] == 0.01
+    assert result["artifact_path"].startswith(str(tmp_path))
+
+
+class AsyncBarrierAdapter:
+    """Async twin of BarrierAdapter for the ainvoke path."""
+    def __init__(self, parties=3):
+        self.barrier = asyncio.Barrier(parties)
+
+    async def generate_text(self, prompt, use_cache=False):
+        await asyncio.wait_for(self.barrier.wait(), timeout=5)
+        return {"text": "0.75"}
+
+    async def moderate_text(self, text, use_cache=False):
+        await asyncio.wait_for(self.barrier.wait(), timeout=5)
+        scores = MagicMock()
+        scores.model_dump.return_value = {"hate": 0.02}
+        return MagicMock(category_scores=scores)
+
+
+def test_ainvoke_uses_async_adapters(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.domain.workflow_graph import build_graph
+
+    gen_adapter = MagicMock()
+    gen_adapter.generate_text = AsyncMock(return_value={
+        "text": "Hello async",
+        "usage": MagicMock(input_tokens=1, output_tokens=2, total_tokens=3),
+    })
+    sync_adapter = MagicMock()  # must never be touched on the async path
+
+    async def run():
+        scorer_adapter = AsyncBarrierAdapter()
+        art = ArtifactService()
+        monkeypatch.setattr(art, "artifact_dir", tmp_path)
+        monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+
+        graph = build_graph(
+            llm=LLMService(adapter=sync_adapter, async_adapter=gen_adapter),
+            tox=ToxicityService(adapter=sync_adapter, async_adapter=scorer_adapter, prefilter=NO_PREFILTER),
+            hal=HallucinationService(adapter=sync_adapter, async_adapter=scorer_adapter),
+            art=art,
+            emoji=EmojiService(adapter=sync_adapter, async_adapter=scorer_adapter, scorer="llm"),
+            judge_mode="separate",
+        )
+        return await graph.ainvoke({"user_input": "hi", "emoji_mode": False})
+
+    result = asyncio.run(run())
+
+    assert result["llm_output"] == "Hello async"
+    assert result["emoji_score"] == 0.75
+    assert result["hallucination_score"] == 0.75
+    assert result["toxicity_score"] == 0.02
+    assert not sync_adapter.method_calls
+
+
+def test_combined_judge_grades_in_one_call(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.domain.workflow_graph import build_graph
+
+    gen_adapter = MagicMock()
+    gen_adapter.generate_text.return_value = {
+        "text": "Hello world",
+        "usage": MagicMock(input_tokens=1, output_tokens=2, total_tokens=3),
+    }
+    # judge and moderation must overlap: two parties, two calls in total
+    scorer_adapter = BarrierAdapter(parties=2)
+    scorer_adapter.generate_json = MagicMock(side_effect=lambda *a, **kw: (
+        scorer_adapter.barrier.wait(), {"text": '{"hallucination": 0.1, "emoji": 0.4}'}
+    )[1])
+
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+
+    graph = build_graph(
+        llm=LLMService(adapter=gen_adapter),
+        tox=ToxicityService(adapter=scorer_adapter, prefilter=NO_PREFILTER),
+        hal=HallucinationService(adapter=scorer_adapter),
+        art=art,
+        emoji=EmojiService(adapter=scorer_adapter, scorer="llm"),
+        judge_mode="combined",
+    )
+    nodes = set(graph.get_graph().nodes)
+
+    result = graph.invoke({"user_input": "hi", "emoji_mode": False})
+
+    assert "judge" in nodes and not {"hallucination", "score_emoji"} & nodes
+    assert scorer_adapter.generate_json.call_count == 1
+    assert result["hallucination_score"] == 0.1
+    assert result["emoji_score"] == 0.4
+    assert result["judge_fallbacks"] == []
+
+
+class CountingAsyncAdapter:
+    """Async adapter that numbers its generations: out1, out2, ..."""
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_text(self, prompt, use_cache=False):
+        self.prompts.append(prompt)
+        return {
+            "text": f"out{len(self.prompts)}",
+            "usage": MagicMock(input_tokens=1, output_tokens=1, total_tokens=2),
+        }
+
+    async def generate_json(self, prompt, schema, name="result", use_cache=False):
+        return {"text": '{"hallucination": 0.1}'}
+
+    async def moderate_text(self, text, use_cache=False):
+        scores = MagicMock()
+        scores.model_dump.return_value = {"hate": 0.01}
+        return MagicMock(category_scores=scores)
+
+
+def test_follow_up_resumes_after_generate(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from app.domain.checkpoints import resume_run, thread_config
+    from app.domain.workflow_graph import build_graph
+
+    adapter = CountingAsyncAdapter()
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+    graph = build_graph(
+        llm=LLMService(adapter=MagicMock(), async_adapter=adapter),
+        tox=ToxicityService(adapter=MagicMock(), async_adapter=adapter, prefilter=NO_PREFILTER),
+        hal=HallucinationService(adapter=MagicMock(), async_adapter=adapter),
+        art=art,
+        emoji=EmojiService(adapter=MagicMock(), async_adapter=adapter),
+        checkpointer=InMemorySaver(),
+    )
+
+    async def run():
+        first = await graph.ainvoke({"run_id": "r1", "user_input": "hi"}, thread_config("r1"), durability="exit")
+        second = await resume_run(graph, "r1", "hi", {"emoji_mode": True})
+        third = await resume_run(graph, "r1", "hi", {"emoji_mode": True})
+        unknown = await resume_run(graph, "r1", "a different prompt", {"emoji_mode": True})
+        return first, second, third, unknown
+
+    first, second, third, unknown = asyncio.run(run())
+
+    # one generation, then each transform works on the previous output
+    assert [first["llm_output"], second["llm_output"], third["llm_output"]] == ["out1", "out2", "out3"]
+    assert '"""out2"""' in adapter.prompts[-1]
+    assert third["cost"] == 0.0 and third["node_metrics"]["generate"] == {"reused": True}
+    assert unknown is None
+
+
+def _resumable_graph(monkeypatch, tmp_path, adapter):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from app.domain.workflow_graph import build_graph
+
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+    return build_graph(
+        llm=LLMService(adapter=MagicMock(), async_adapter=adapter),
+        tox=ToxicityService(adapter=MagicMock(), async_adapter=adapter, prefilter=NO_PREFILTER),
+        hal=HallucinationService(adapter=MagicMock(), async_adapter=adapter),
+        art=art,
+        emoji=EmojiService(adapter=MagicMock(), async_adapter=adapter),
+        checkpointer=InMemorySaver(),
+    )
+
+
+class DeadlineCheckingAdapter(CountingAsyncAdapter):
+    """Fails like the call policy does once the run's deadline has passed."""
+    async def generate_text(self, prompt, use_cache=False):
+        from app.adapters.resilience import DeadlineExceeded, remaining
+
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("run deadline passed")
+        return await super().generate_text(prompt, use_cache)
+
+
+def test_resume_drops_the_previous_deadline(monkeypatch, tmp_path):
+    import time
+
+    from app.domain.checkpoints import resume_run, thread_config
+
+    graph = _resumable_graph(monkeypatch, tmp_path, DeadlineCheckingAdapter())
+
+    async def run():
+        state = {"run_id": "r1", "user_input": "hi", "deadline": time.time() + 1}
+        await graph.ainvoke(state, thread_config("r1"), durability="exit")
+        await asyncio.sleep(1.1)  # the first run's deadline is now in the past
+        return await resume_run(graph, "r1", "hi", {"emoji_mode": True})
+
+    resumed = asyncio.run(run())
+
+    assert resumed["llm_output"] == "out2"
+    assert resumed["deadline"] is None
+
+
+def test_resume_with_fewer_evaluators_clears_old_scores(monkeypatch, tmp_path):
+    from app.domain.checkpoints import resume_run, thread_config
+
+    graph = _resumable_graph(monkeypatch, tmp_path, CountingAsyncAdapter())
+
+    async def run():
+        await graph.ainvoke({"run_id": "r1", "user_input": "hi"}, thread_config("r1"), durability="exit")
+        return await resume_run(graph, "r1", "hi", {"evaluators": ["toxicity"]})
+
+    resumed = asyncio.run(run())
+
+    assert resumed["toxicity_score"] is not None
+    assert resumed["hallucination_score"] is None and resumed["emoji_score"] is None
+    assert resumed["evaluation_plan"]["run"] == ["toxicity"]
+    assert set(resumed["node_metrics"]) == {"generate", "plan_evaluation", "toxicity", "artifact"}
+    assert resumed["node_metrics"]["generate"] == {"reused": True}
+
+
+def test_checkpoints_past_retention_are_pruned_on_open(monkeypatch, tmp_path):
+    from app.domain.checkpoints import open_checkpointer, thread_config
+    from app.domain.workflow_graph import build_graph
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("CHECKPOINT_ENABLED", "true")
+    path = str(tmp_path / "checkpoints.sqlite3")
+    art = ArtifactService()
+    monkeypatch.setattr(art, "artifact_dir", tmp_path)
+    monkeypatch.setattr(art, "history_path", tmp_path / "history.jsonl")
+    adapter = CountingAsyncAdapter()
+
+    async def run():
+        async with open_checkpointer(path) as saver:
+            graph = build_graph(
+                llm=LLMService(adapter=MagicMock(), async_adapter=adapter),
+                tox=ToxicityService(adapter=MagicMock(), async_adapter=adapter, prefilter=NO_PREFILTER),
+                hal=HallucinationService(adapter=MagicMock(), async_adapter=adapter),
+                art=art,
+                emoji=EmojiService(adapter=MagicMock(), async_adapter=adapter),
+                checkpointer=saver,
+            )
+            await graph.ainvoke({"run_id": "r1", "user_input": "hi"}, thread_config("r1"), durability="exit")
+
+        async with open_checkpointer(path) as saver:  # default retention keeps it
+            kept = await saver.aget_tuple(thread_config("r1"))
+
+        monkeypatch.setenv("CHECKPOINT_RETENTION_SECONDS", "0")
+        async with open_checkpointer(path) as saver:
+            pruned = await saver.aget_tuple(thread_config("r1"))
+        return kept, pruned
+
+    kept, pruned = asyncio.run(run())
+
+    assert kept is not None and pruned is None
@@ -3,19 +3,91 @@
 import json
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
 import base64
 import os
+import time
 
-API_URL = "http://localhost:8000/run-graph"
+from app.services.history_log import HistoryTail, history_path
+
+API_BASE = os.getenv("OBSERVER_API_URL", "http://localhost:8000")
+JOBS_URL = f"{API_BASE}/jobs"
+HISTORY_URL = f"{API_BASE}/history"
+HISTORY_PATH = history_path()
+
+REQUEST_TIMEOUT = (3.05, 30)  # connect, read (seconds)
+JOB_POLL_WAIT_SECONDS = 10
+# overall bound on one run; five of the server's longest long-polls by default
+RUN_TIMEOUT_SECONDS = float(os.getenv("OBSERVER_RUN_TIMEOUT", 5 * 60))
+RECENT_RUNS_REFRESH_SECONDS = 5
 
 
 # ---------------------------
 # Helper Functions
 # ---------------------------
 
+@st.cache_resource
+def http_session() -> requests.Session:
+    """
+    One keep-alive pool for the dashboard process, shared by every
+    browser session and rerun instead of a new connection per call.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def history_tail() -> HistoryTail:
+    # survives reruns, so each refresh parses only newly appended runs
+    return HistoryTail(HISTORY_PATH)
+
+
+def recent_runs(limit: int) -> list:
+    """Newest runs first: the local log's tail, or /history when the API runs elsewhere."""
+    if os.path.exists(HISTORY_PATH):
+        return history_tail().latest(limit)
+    response = http_session().get(HISTORY_URL, params={"limit": limit}, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json().get("items", [])
+
+
+class JobTimeout(Exception):
+    """The job didn't finish within RUN_TIMEOUT_SECONDS; it may still be running."""
+
+    def __init__(self, job_id: str):
+        super().__init__(job_id)
+        self.job_id = job_id
+
+
+def run_job(payload: dict) -> requests.Response:
+    """
+    Submits the run as a job and long-polls until it finishes, so no
+    single request has to stay open for the whole workflow. Gives up with
+    JobTimeout after RUN_TIMEOUT_SECONDS.
+    """
+    session = http_session()
+    response = session.post(JOBS_URL, json=payload, timeout=REQUEST_TIMEOUT)
+    if response.status_code != 202:
+        return response
+    job_id = response.json()["job_id"]
+    job_url = f"{JOBS_URL}/{job_id}"
+    deadline = time.monotonic() + RUN_TIMEOUT_SECONDS
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise JobTimeout(job_id)
+        wait = max(1, min(JOB_POLL_WAIT_SECONDS, int(left)))
+        response = session.get(job_url, params={"wait": wait}, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200 or response.json()["status"] in ("succeeded", "failed"):
+            return response
+
+
 def pretty_json(data: dict) -> str:
     return json.dumps(data, indent=4, ensure_ascii=False)
 
@@ -81,12 +153,15 @@ if run or make_emoji:
     elif make_emoji:
         payload = {
             "input": user_input,
-            "emoji_mode": True  # transform output to be sillier
+            "emoji_mode": True,  # transform output to be sillier
+            # continue the last run: the server re-emojifies its output
+            # instead of generating again
+            "run_id": st.session_state.get("run_id"),
         }
 
     with st.spinner("Running workflow…"):
         try:
-            response = requests.post(API_URL, json=payload)
+            response = run_job(payload)
 
             if response.status_code != 200:
                 st.error(f"API error {response.status_code}")
@@ -94,8 +169,19 @@ if run or make_emoji:
                 st.stop()
 
             result = response.json()
+            if result["status"] == "failed":
+                st.error("Workflow failed.")
+                st.write(result.get("error"))
+                st.stop()
             state = result.get("state", {})
+            st.session_state["run_id"] = state.get("run_id")
 
+        except JobTimeout as e:
+            st.error(
+                f"The run didn't finish within {RUN_TIMEOUT_SECONDS:.0f} s. "
+                f"It may still complete: check GET /jobs/{e.job_id}."
+            )
+            st.stop()
         except Exception as e:
             st.error("Failed to contact API server.")
             st.exception(e)
@@ -142,43 +228,53 @@ if run or make_emoji:
 
 
     # ---------------------------
-    # Recent Runs
+    # Full JSON State
     # ---------------------------
 
-    st.header("4. Recent Runs (Last 5)")
+    st.subheader("Full State (Pretty JSON)")
+    st.code(pretty_json(result), language="json")
 
-    history_path = "app/storage/logs/history.jsonl"
 
-    if os.path.exists(history_path):
-        df = pd.read_json(history_path, lines=True)
+# ---------------------------
+# Recent Runs
+# ---------------------------
 
-        recent = df.tail(5).copy()
+@st.fragment(run_every=RECENT_RUNS_REFRESH_SECONDS)
+def recent_runs_panel(limit: int = 5):
+    """Refreshes on its own timer; the workflow above is not re-run."""
+    st.header(f"4. Recent Runs (Last {limit})")
 
-        # Short preview helper
-        def short(t):
-            return t[:50] + "..." if isinstance(t, str) and len(t) > 50 else t
+    try:
+        rows = recent_runs(limit)
+    except Exception as e:
+        st.warning(f"Could not load run history: {e}")
+        rows = []
 
-        recent["input_preview"] = recent["input"].apply(short)
+    if not rows:
+        st.info("No history yet.")
+        return
 
-        cols = [
-            "timestamp",
-            "input_preview",
-            "emoji_score",
-            "toxicity_score",
-            "hallucination_score",
-            "duration_seconds",
-            "cost",
-        ]
-        existing_cols = [c for c in cols if c in recent.columns]
+    # newest first from the source; show oldest -> newest like before
+    recent = pd.DataFrame(list(reversed(rows)))
 
-        st.dataframe(recent[existing_cols])
-    else:
-        st.info("No history yet.")
+    # Short preview helper
+    def short(t):
+        return t[:50] + "..." if isinstance(t, str) and len(t) > 50 else t
 
+    recent["input_preview"] = recent["input"].apply(short)
 
-    # ---------------------------
-    # Full JSON State
-    # ---------------------------
+    cols = [
+        "timestamp",
+        "input_preview",
+        "emoji_score",
+        "toxicity_score",
+        "hallucination_score",
+        "duration_seconds",
+        "cost",
+    ]
+    existing_cols = [c for c in cols if c in recent.columns]
 
-    st.subheader("Full State (Pretty JSON)")
-    st.code(pretty_json(result), language="json")
\ No newline at end of file
+    st.dataframe(recent[existing_cols])
+
+
+recent_runs_panel()
@@ -0,0 +1,90 @@
+# benchmarks/bench_emoji_scorer.py
+
+"""
+Local vs LLM emoji scoring.
+
+Measures the local grapheme scorer (single-text and batch) over the
+outputs in history.jsonl plus a few emoji-heavy samples. With --llm N it
+also scores the first N texts through the LLM scorer for latency and
+agreement (needs OPENAI_API_KEY; results bypass the response cache).
+
+    python -m benchmarks.bench_emoji_scorer [--repeat 200] [--llm 10]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from app.services.emoji_scoring import emoji_ratio, emoji_ratios
+from app.services.history_log import SegmentedHistoryLog
+
+SAMPLES = [
+    "Hello! \U0001F44B How can I help you today? \U0001F60A",
+    "\U0001F468‍\U0001F469‍\U0001F467 Family trip to \U0001F1EF\U0001F1F5 ✈️\U0001F305",
+    "Great job \U0001F44D\U0001F3FD\U0001F44D\U0001F3FF #️⃣ 1️⃣",
+    "No emoji here, just a plain sentence about the Cold War.",
+]
+
+
+def load_texts(path):
+    texts = [r.get("output") for r in SegmentedHistoryLog(path).iter_records()]
+    return [t for t in texts if t] + SAMPLES
+
+
+def bench_local(texts, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            emoji_ratio(text)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        emoji_ratios(texts)
+    batch = time.perf_counter() - started
+
+    calls = repeat * len(texts)
+    return {
+        "texts": len(texts),
+        "single_us_per_text": round(single / calls * 1e6, 2),
+        "batch_us_per_text": round(batch / calls * 1e6, 2),
+    }
+
+
+def bench_llm(texts):
+    from app.services.emoji_service import EmojiService
+
+    service = EmojiService(scorer="llm")
+    latencies, diffs = [], []
+    for text in texts:
+        started = time.perf_counter()
+        score = service.score_emoji({"llm_output": text, "cache_bypass": True})["emoji_score"]
+        latencies.append(time.perf_counter() - started)
+        diffs.append(abs(score - emoji_ratio(text)))
+
+    return {
+        "texts": len(texts),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "mean_abs_diff_vs_local": round(statistics.mean(diffs), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", default="app/storage/logs/history.jsonl")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--llm", type=int, default=0, help="texts to score through the LLM")
+    args = parser.parse_args()
+
+    texts = load_texts(args.history)
+    report = {"local": bench_local(texts, args.repeat)}
+    if args.llm:
+        report["llm"] = bench_llm(texts[:args.llm])
+
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+# benchmarks/bench_graph.py
+
+"""
+Graph throughput/latency benchmark, fully offline.
+
+Drives the compiled workflow with FakeAdapter latencies at several
+concurrency levels through three paths:
+
+- sync:  graph.invoke from a thread pool
+- async: graph.ainvoke under a semaphore
+- batch: POST /run-graph/batch on the FastAPI app (in-process)
+
+and writes a JSON report with throughput, p50/p95/p99 run latency and
+per-node wall time / overhead (wall time minus simulated API time).
+
+    python -m benchmarks.bench_graph run --concurrency 1,8,32 --runs 64 \\
+        --output bench_graph.json [--baseline benchmarks/baseline.json]
+    python -m benchmarks.bench_graph compare benchmarks/baseline.json bench_graph.json
+
+`compare` (and `run --baseline`) exits with status 1 when a metric regressed
+by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline")  # default clients are built, never called
+# fake runs must never reach the production stores: the response cache
+# stays in memory, checkpoints are off, everything else goes to a scratch dir
+_SCRATCH = tempfile.mkdtemp(prefix="bench_graph_")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ.setdefault("RESPONSE_CACHE_PATH", "")
+os.environ.setdefault("CHECKPOINT_ENABLED", "false")
+os.environ.setdefault("HISTORY_PATH", os.path.join(_SCRATCH, "history.jsonl"))
+os.environ.setdefault("HISTORY_DB_PATH", os.path.join(_SCRATCH, "history.sqlite3"))
+os.environ.setdefault("ARTIFACT_DIR", os.path.join(_SCRATCH, "artifacts"))
+os.environ.setdefault("JOB_DB_PATH", os.path.join(_SCRATCH, "jobs.sqlite3"))
+
+from benchmarks.fake_adapter import AsyncFakeAdapter, FakeAdapter, Latency  # noqa: E402
+
+MODES = ("sync", "async", "batch")
+
+PROMPT = "Summarize the Cold War in one paragraph."
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+# ---------------------------------------------------------
+# Graph under test
+# ---------------------------------------------------------
+def build(args, workdir: str):
+    from app.domain.workflow_graph import build_graph
+    from app.services.artifact_service import ArtifactService
+    from app.services.artifact_writer import ArtifactWriter
+    from app.services.emoji_service import EmojiService
+    from app.services.hallucination_service import HallucinationService
+    from app.services.llm_service import LLMService
+    from app.services.toxicity_prefilter import PrefilterConfig, ToxicityPrefilter
+    from app.services.toxicity_service import ToxicityService
+
+    generate, moderate = Latency.parse(args.generate_latency), Latency.parse(args.moderate_latency)
+    adapter = FakeAdapter(generate, moderate, seed=args.seed)
+    async_adapter = AsyncFakeAdapter(generate, moderate, seed=args.seed)
+
+    writer = ArtifactWriter(fsync="never")
+    art = ArtifactService(writer=writer)
+    art.artifact_dir = workdir
+    art.history_path = os.path.join(workdir, "history.jsonl")
+
+    # TOXICITY_LOCAL_BENIGN=true measures the opt-in benign fast path too
+    prefilter = ToxicityPrefilter(PrefilterConfig.from_env().model_copy(update={"enabled": not args.no_prefilter}))
+    graph = build_graph(
+        llm=LLMService(adapter=adapter, async_adapter=async_adapter),
+        tox=ToxicityService(adapter=adapter, async_adapter=async_adapter, prefilter=prefilter),
+        hal=HallucinationService(adapter=adapter, async_adapter=async_adapter),
+        art=art,
+        emoji=EmojiService(adapter=adapter, async_adapter=async_adapter),
+        judge_mode=args.judge_mode,
+    )
+    return graph, writer
+
+
+def _state() -> Dict[str, Any]:
+    return {"user_input": PROMPT, "emoji_mode": False, "start_time": time.time()}
+
+
+# ---------------------------------------------------------
+# Drivers; each returns (per-run latencies, final states, errors, wall time)
+# ---------------------------------------------------------
+def drive_sync(graph, runs: int, concurrency: int):
+    def one(_):
+        started = time.perf_counter()
+        result = graph.invoke(_state())
+        return time.perf_counter() - started, result
+
+    started = time.perf_counter()
+    latencies, states, errors = [], [], 0
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(one, i) for i in range(runs)]:
+            try:
+                latency, state = future.result()
+                latencies.append(latency)
+                states.append(state)
+            except Exception:
+                errors += 1
+    return latencies, states, errors, time.perf_counter() - started
+
+
+def drive_async(graph, runs: int, concurrency: int):
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                result = await graph.ainvoke(_state())
+                return time.perf_counter() - started, result
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(one() for _ in range(runs)), return_exceptions=True)
+        return outcomes, time.perf_counter() - started
+
+    outcomes, wall = asyncio.run(main())
+    ok = [o for o in outcomes if not isinstance(o, BaseException)]
+    return [o[0] for o in ok], [o[1] for o in ok], len(outcomes) - len(ok), wall
+
+
+def drive_batch(graph, runs: int, concurrency: int):
+    from fastapi.testclient import TestClient
+
+    from app.api import server
+
+    payload = {"items": [{"input": PROMPT}] * runs, "max_concurrency": concurrency}
+
+    latencies, states, errors = [], [], 0
+    with TestClient(server.app) as client:
+        # after startup, which attaches the default checkpointed graph
+        server.graph, server.checkpointer = graph, None
+        started = time.perf_counter()
+        with client.stream("POST", "/run-graph/batch", json=payload) as response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                item = json.loads(line)
+                if "error" in item:
+                    errors += 1
+                else:
+                    # the server stamps start_time when the item's run begins
+                    latencies.append(item["state"]["duration_seconds"])
+                    states.append(item["state"])
+        wall = time.perf_counter() - started
+    return latencies, states, errors, wall
+
+
+DRIVERS = {"sync": drive_sync, "async": drive_async, "batch": drive_batch}
+
+
+# ---------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------
+def summarize(mode: str, concurrency: int, runs: int, latencies, states, errors: int, wall: float) -> Dict[str, Any]:
+    per_node: Dict[str, Dict[str, List[float]]] = {}
+    for state in states:
+        for node, m in (state.get("node_metrics") or {}).items():
+            entry = per_node.setdefault(node, {"wall": [], "overhead": [], "calls": []})
+            entry["wall"].append(m["wall_seconds"])
+            entry["overhead"].append(max(m["wall_seconds"] - m.get("adapter_seconds", 0.0), 0.0))
+            entry["calls"].append(m["adapter_calls"])
+
+    nodes = {
+        node: {
+            "wall_ms_p50": _ms(_percentile(v["wall"], 50)),
+            "wall_ms_p95": _ms(_percentile(v["wall"], 95)),
+            "overhead_ms_mean": _ms(sum(v["overhead"]) / len(v["overhead"])),
+            "overhead_ms_p95": _ms(_percentile(v["overhead"], 95)),
+            "adapter_calls_mean": round(sum(v["calls"]) / len(v["calls"]), 3),
+        }
+        for node, v in sorted(per_node.items())
+    }
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": errors,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(states) / wall, 3) if wall else 0.0,
+        "latency_ms": {
+            "p50": _ms(_percentile(latencies, 50)),
+            "p95": _ms(_percentile(latencies, 95)),
+            "p99": _ms(_percentile(latencies, 99)),
+            "mean": _ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        },
+        "nodes": nodes,
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    modes = [m.strip() for m in args.modes.split(",")]
+    for mode in modes:
+        if mode not in MODES:
+            raise SystemExit(f"unknown mode {mode!r}; pick from {MODES}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_graph_") as workdir:
+        graph, writer = build(args, workdir)
+        for mode in modes:
+            for concurrency in levels:
+                outcome = DRIVERS[mode](graph, args.runs, concurrency)
+                writer.flush()
+                result = summarize(mode, concurrency, args.runs, *outcome)
+                results.append(result)
+                print(
+                    f"{mode:>5} c={concurrency:<4} {result['throughput_rps']:>8.2f} rps  "
+                    f"p50={result['latency_ms']['p50']:.1f}ms p95={result['latency_ms']['p95']:.1f}ms "
+                    f"p99={result['latency_ms']['p99']:.1f}ms errors={result['errors']}",
+                    file=sys.stderr,
+                )
+        writer.close()
+
+    return {
+        "config": {
+            "runs": args.runs,
+            "generate_latency": args.generate_latency,
+            "moderate_latency": args.moderate_latency,
+            "judge_mode": args.judge_mode,
+            "prefilter": not args.no_prefilter,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Returns one message per regression: throughput down, or a latency
+    percentile / node overhead up, by more than `tolerance` (a fraction)
+    and, for times, by more than `min_delta_ms` in absolute terms.
+    """
+    def key(r):
+        return r["mode"], r["concurrency"]
+
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+
+    def slower(label, old, new):
+        if new > old * (1 + tolerance) and new - old > min_delta_ms:
+            regressions.append(f"{label}: {old:.3f}ms -> {new:.3f}ms")
+
+    for result in current["results"]:
+        old = base.get(key(result))
+        if old is None:
+            continue
+        label = f"{result['mode']} c={result['concurrency']}"
+
+        if result["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{label} throughput: {old['throughput_rps']:.3f} -> {result['throughput_rps']:.3f} rps"
+            )
+        for q in ("p50", "p95", "p99"):
+            slower(f"{label} latency {q}", old["latency_ms"][q], result["latency_ms"][q])
+        for node, metrics in result["nodes"].items():
+            if node in old["nodes"]:
+                slower(f"{label} node {node} overhead p95",
+                       old["nodes"][node]["overhead_ms_p95"], metrics["overhead_ms_p95"])
+        if result["errors"] > old["errors"]:
+            regressions.append(f"{label} errors: {old['errors']} -> {result['errors']}")
+
+    return regressions
+
+
+def _report_regressions(regressions: List[str]) -> int:
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("no regressions")
+    return 1 if regressions else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline graph benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="run the benchmark and write a JSON report")
+    run_p.add_argument("--modes", default="sync,async,batch")
+    run_p.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    run_p.add_argument("--runs", type=int, default=64, help="runs per level")
+    run_p.add_argument("--generate-latency", default="lognormal:400:200",
+                       help="kind:mean_ms[:spread_ms] for generation calls")
+    run_p.add_argument("--moderate-latency", default="lognormal:80:30",
+                       help="kind:mean_ms[:spread_ms] for moderation calls")
+    run_p.add_argument("--judge-mode", default="combined", choices=["combined", "separate"])
+    run_p.add_argument("--no-prefilter", action="store_true",
+                       help="send every output to (fake) moderation")
+    run_p.add_argument("--seed", type=int, default=0)
+    run_p.add_argument("--output", default="bench_graph.json")
+    run_p.add_argument("--baseline", help="compare against this report afterwards")
+    run_p.add_argument("--tolerance", type=float, default=0.10)
+    run_p.add_argument("--min-delta-ms", type=float, default=1.0)
+
+    cmp_p = sub.add_parser("compare", help="flag regressions between two reports")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--tolerance", type=float, default=0.10)
+    cmp_p.add_argument("--min-delta-ms", type=float, default=1.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"wrote {args.output}", file=sys.stderr)
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return _report_regressions(compare(baseline, report, args.tolerance, args.min_delta_ms))
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return _report_regressions(compare(baseline, current, args.tolerance, args.min_delta_ms))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# benchmarks/bench_serialization.py
+
+"""
+/run-graph response serialization, before and after.
+
+Runs the graph once offline (FakeAdapter, no latency) to get a realistic
+final state, then times rendering `{"state": ...}` three ways:
+
+- fastapi:        what returning the dict did: jsonable_encoder + json.dumps
+- orjson:         ORJSONResponse on the full state
+- orjson+fields:  ORJSONResponse on ?fields=llm_output,<scores>
+
+and reports microseconds per response and payload bytes.
+
+    python -m benchmarks.bench_serialization [--repeat 2000] [--output ser.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline")  # default clients are built, never called
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.api.responses import ORJSONResponse, project  # noqa: E402
+from benchmarks.fake_adapter import AsyncFakeAdapter, FakeAdapter, Latency  # noqa: E402
+
+SCORE_FIELDS = ("llm_output", "toxicity_score", "hallucination_score", "emoji_score")
+
+OUTPUT = (
+    "The Cold War (1947-1991) was a period of geopolitical tension between the "
+    "United States and the Soviet Union and their allies. 🌍 It was fought through "
+    "proxy wars, an arms race, the space race and propaganda rather than direct "
+    "conflict. 🚀🕊️ "
+) * 4
+
+
+def final_state(workdir: str) -> dict:
+    from app.domain.workflow_graph import build_graph
+    from app.services.artifact_service import ArtifactService
+    from app.services.emoji_service import EmojiService
+    from app.services.hallucination_service import HallucinationService
+    from app.services.llm_service import LLMService
+    from app.services.toxicity_service import ToxicityService
+
+    instant = Latency(kind="constant", mean_ms=0)
+    adapter = FakeAdapter(instant, instant, output=OUTPUT)
+    async_adapter = AsyncFakeAdapter(instant, instant, output=OUTPUT)
+
+    art = ArtifactService()
+    art.artifact_dir = workdir
+    art.history_path = os.path.join(workdir, "history.jsonl")
+    graph = build_graph(
+        llm=LLMService(adapter=adapter, async_adapter=async_adapter),
+        tox=ToxicityService(adapter=adapter, async_adapter=async_adapter),
+        hal=HallucinationService(adapter=adapter, async_adapter=async_adapter),
+        art=art,
+        emoji=EmojiService(adapter=adapter, async_adapter=async_adapter),
+    )
+    state = {"run_id": "bench", "user_input": "Summarize the Cold War in one paragraph.", "start_time": time.time()}
+    return asyncio.run(graph.ainvoke(state))
+
+
+def _time(render, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = render()
+        samples.append(time.perf_counter() - started)
+    return {
+        "us_per_response": round(statistics.median(samples) * 1e6, 2),
+        "bytes": len(body),
+    }
+
+
+def bench(state: dict, repeat: int) -> dict:
+    projected = project(state, SCORE_FIELDS)
+    results = {
+        "fastapi": _time(lambda: JSONResponse(jsonable_encoder({"state": state})).body, repeat),
+        "orjson": _time(lambda: ORJSONResponse({"state": state}).body, repeat),
+        "orjson+fields": _time(lambda: ORJSONResponse({"state": projected}).body, repeat),
+    }
+    base = results["fastapi"]["us_per_response"]
+    for result in results.values():
+        result["speedup"] = round(base / result["us_per_response"], 1) if result["us_per_response"] else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        state = final_state(workdir)
+    results = bench(state, args.repeat)
+
+    print(f"state keys: {len(state)}")
+    for name, result in results.items():
+        print(f"{name:14} {result['us_per_response']:9.2f} us  {result['bytes']:6d} bytes  x{result['speedup']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"state_keys": len(state), "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/bench_startup.py
+
+"""
+API cold start: import time and time until /ready.
+
+Every sample runs in a fresh interpreter so nothing is already imported:
+
+- import:  `import app.api.server` (module import + create_app)
+- ready:   import, then the lifespan warmup (checkpointer, graph compile,
+           job workers) until GET /ready answers 200
+
+and reports the median of each, plus the slowest top-level imports from
+`python -X importtime`. With --max-import-seconds the script exits 1 when
+the median import is over budget, so CI can keep startup fast.
+
+    python -m benchmarks.bench_startup [--repeat 5] [--max-import-seconds 2] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+IMPORT = """
+import json, time
+started = time.perf_counter()
+import app.api.server
+print(json.dumps({"seconds": time.perf_counter() - started}))
+"""
+
+READY = """
+import json, time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+import app.api.server as server
+imported = time.perf_counter() - started
+with TestClient(server.app) as client:
+    status = client.get("/ready").status_code
+    ready = time.perf_counter() - started
+print(json.dumps({"import_seconds": imported, "seconds": ready, "status": status}))
+"""
+
+
+def _env(workdir: str) -> dict:
+    # offline key; every store the server opens goes to a scratch dir
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": "sk-offline",
+        "CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "RESPONSE_CACHE_PATH": os.path.join(workdir, "responses.sqlite3"),
+        "HISTORY_PATH": os.path.join(workdir, "history.jsonl"),
+        "HISTORY_DB_PATH": os.path.join(workdir, "history.sqlite3"),
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+    }
+
+
+def _sample(code: str, env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    """Top-level modules imported by app.api.server, by cumulative microseconds."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.api.server"],
+        env=env, capture_output=True, text=True, check=True,
+    ).stderr
+    # "import time:  self [us] | cumulative | imported package", nesting by indent
+    rows = []
+    for line in err.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)", line)
+        if match and len(match.group(3)) <= 3:  # direct imports of the entry module
+            rows.append({"module": match.group(4), "cumulative_us": int(match.group(2))})
+    rows.sort(key=lambda r: r["cumulative_us"], reverse=True)
+    return rows[1:top + 1]  # [0] is app.api.server itself
+
+
+def bench(repeat: int, top: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        env = _env(workdir)
+        imports = [_sample(IMPORT, env)["seconds"] for _ in range(repeat)]
+        readies = [_sample(READY, env) for _ in range(repeat)]
+        modules = slowest_imports(env, top)
+
+    return {
+        "import_seconds": round(statistics.median(imports), 3),
+        "ready_seconds": round(statistics.median(r["seconds"] for r in readies), 3),
+        "ready_status": readies[-1]["status"],
+        "slowest_imports": modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="how many top-level imports to list")
+    parser.add_argument("--max-import-seconds", type=float, help="fail when the median import is slower")
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    results = bench(args.repeat, args.top)
+
+    print(f"import   {results['import_seconds']:.3f} s")
+    print(f"ready    {results['ready_seconds']:.3f} s  (/ready -> {results['ready_status']})")
+    for row in results["slowest_imports"]:
+        print(f"  {row['cumulative_us'] / 1000:8.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.max_import_seconds is not None and results["import_seconds"] > args.max_import_seconds:
+        sys.exit(f"import took {results['import_seconds']:.3f} s, budget {args.max_import_seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
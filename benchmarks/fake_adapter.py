@@ -0,0 +1,166 @@
+# benchmarks/fake_adapter.py
+
+"""
+Offline stand-ins for OpenAIAdapter / AsyncOpenAIAdapter.
+
+Every call sleeps for a latency drawn from a configurable distribution and
+returns SDK-shaped objects, so the services and graph run their real code
+paths without network access or API spend.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from openai.types import Moderation
+from openai.types.moderation import CategoryScores
+from openai.types.responses import ResponseUsage
+from pydantic import BaseModel
+
+from app.adapters.call_metrics import record_call
+
+DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+
+
+class Latency(BaseModel):
+    """
+    Latency distribution in milliseconds.
+
+    - constant:  always `mean_ms`
+    - uniform:   between `mean_ms - spread_ms` and `mean_ms + spread_ms`
+    - normal:    mean `mean_ms`, std dev `spread_ms` (clipped at 0)
+    - lognormal: median `mean_ms`, sigma `spread_ms / mean_ms` (long tail)
+    """
+    kind: str = "lognormal"
+    mean_ms: float = 50.0
+    spread_ms: float = 25.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """
+        Parses "kind:mean[:spread]", e.g. "lognormal:400:200" or "constant:0".
+        """
+        parts = spec.split(":")
+        if parts[0] not in DISTRIBUTIONS:
+            raise ValueError(f"latency kind must be one of {DISTRIBUTIONS}, got {parts[0]!r}")
+        return cls(
+            kind=parts[0],
+            mean_ms=float(parts[1]) if len(parts) > 1 else cls().mean_ms,
+            spread_ms=float(parts[2]) if len(parts) > 2 else 0.0,
+        )
+
+    def sample(self, rng: random.Random) -> float:
+        """Returns one latency in seconds."""
+        if self.kind == "constant":
+            ms = self.mean_ms
+        elif self.kind == "uniform":
+            ms = rng.uniform(self.mean_ms - self.spread_ms, self.mean_ms + self.spread_ms)
+        elif self.kind == "normal":
+            ms = rng.gauss(self.mean_ms, self.spread_ms)
+        else:
+            sigma = self.spread_ms / self.mean_ms if self.mean_ms else 0.0
+            ms = self.mean_ms * rng.lognormvariate(0.0, sigma)
+        return max(ms, 0.0) / 1000
+
+
+class _FakeBase:
+    def __init__(
+        self,
+        generate: Optional[Latency] = None,
+        moderate: Optional[Latency] = None,
+        output: str = "The Cold War was a period of geopolitical tension. 🌍🕊️",
+        seed: Optional[int] = 0,
+    ):
+        self.generate_latency = generate or Latency(mean_ms=400, spread_ms=200)
+        self.moderate_latency = moderate or Latency(mean_ms=80, spread_ms=30)
+        self.output = output
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.calls = 0
+
+    def _delay(self, latency: Latency) -> float:
+        with self._rng_lock:
+            self.calls += 1
+            return latency.sample(self._rng)
+
+    @staticmethod
+    def _usage(prompt: str, text: str) -> ResponseUsage:
+        # ~4 characters per token is close enough for accounting
+        i, o = max(len(prompt) // 4, 1), max(len(text) // 4, 1)
+        return ResponseUsage.model_construct(input_tokens=i, output_tokens=o, total_tokens=i + o)
+
+    def _text(self, prompt: str) -> str:
+        return self.output
+
+    @staticmethod
+    def _json(schema: Dict[str, Any]) -> str:
+        return json.dumps({key: 0.1 for key in schema.get("properties", {})})
+
+    @staticmethod
+    def _moderation() -> Moderation:
+        scores = CategoryScores.model_construct(harassment=1e-5, hate=2e-6, violence=3e-6)
+        return Moderation.model_construct(flagged=False, category_scores=scores)
+
+
+class FakeAdapter(_FakeBase):
+    """Sync fake: blocks the calling thread for the sampled latency."""
+
+    def _call(self, latency: Latency, usage=None):
+        seconds = self._delay(latency)
+        time.sleep(seconds)
+        record_call(usage, seconds=seconds)
+
+    def generate_text(self, prompt: str, use_cache: bool = False):
+        text = self._text(prompt)
+        usage = self._usage(prompt, text)
+        self._call(self.generate_latency, usage)
+        return {"text": text, "usage": usage}
+
+    def generate_json(self, prompt: str, schema: Dict[str, Any], name: str = "result", use_cache: bool = False):
+        text = self._json(schema)
+        usage = self._usage(prompt, text)
+        self._call(self.generate_latency, usage)
+        return {"text": text, "usage": usage}
+
+    def moderate_text(self, text: str, use_cache: bool = False):
+        self._call(self.moderate_latency)
+        return self._moderation()
+
+
+class AsyncFakeAdapter(_FakeBase):
+    """Async fake: awaits asyncio.sleep, so the event loop stays free."""
+
+    async def _call(self, latency: Latency, usage=None):
+        seconds = self._delay(latency)
+        await asyncio.sleep(seconds)
+        record_call(usage, seconds=seconds)
+
+    async def generate_text(self, prompt: str, use_cache: bool = False):
+        text = self._text(prompt)
+        usage = self._usage(prompt, text)
+        await self._call(self.generate_latency, usage)
+        return {"text": text, "usage": usage}
+
+    async def generate_json(self, prompt: str, schema: Dict[str, Any], name: str = "result", use_cache: bool = False):
+        text = self._json(schema)
+        usage = self._usage(prompt, text)
+        await self._call(self.generate_latency, usage)
+        return {"text": text, "usage": usage}
+
+    async def stream_text(self, prompt: str, on_delta: Callable[[str], None]):
+        text = self._text(prompt)
+        usage = self._usage(prompt, text)
+        seconds = self._delay(self.generate_latency)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(seconds / len(words))
+            on_delta(word if i == 0 else " " + word)
+        record_call(usage, seconds=seconds)
+        return {"text": text, "usage": usage}
+
+    async def moderate_text(self, text: str, use_cache: bool = False):
+        await self._call(self.moderate_latency)
+        return self._moderation()
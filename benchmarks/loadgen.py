@@ -0,0 +1,174 @@
+# benchmarks/loadgen.py
+
+"""
+Load generator for the FastAPI server.
+
+- closed loop: `--concurrency N` workers each send their next request as
+  soon as the previous one returns
+- open loop:   `--rps R` requests start on a Poisson schedule, whether or
+  not earlier ones have finished (so queueing shows up as latency)
+
+Reports sent/completed counts, error rate by status, achieved RPS and
+latency percentiles, optionally as JSON:
+
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000/run-graph \\
+        --rps 20 --duration 30 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+try:  # same HTTP stack as the OpenAI SDK
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+PROMPTS = [
+    "Summarize the Cold War in one paragraph.",
+    "What is the capital city of Mordor?",
+    "If I have 12 apples and eat 5, how many remain?",
+    "Write a rap battle between Socrates and Darth Vader.",
+]
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.sent = 0
+        self.dropped = 0
+
+    def record(self, status: str, latency: float):
+        self.statuses[status] += 1
+        if status == "200":
+            self.latencies.append(latency)
+
+    def report(self, wall: float, mode: str) -> Dict[str, Any]:
+        completed = sum(self.statuses.values())
+        errors = completed - self.statuses.get("200", 0)
+        ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "mode": mode,
+            "sent": self.sent,
+            "completed": completed,
+            "dropped": self.dropped,
+            "errors": errors,
+            "error_rate": round(errors / completed, 4) if completed else 0.0,
+            "statuses": dict(self.statuses),
+            "duration_seconds": round(wall, 3),
+            "achieved_rps": round(completed / wall, 3) if wall else 0.0,
+            "latency_ms": {
+                "p50": round(_percentile(ms, 50), 2),
+                "p90": round(_percentile(ms, 90), 2),
+                "p95": round(_percentile(ms, 95), 2),
+                "p99": round(_percentile(ms, 99), 2),
+                "max": round(max(ms), 2) if ms else 0.0,
+            },
+        }
+
+
+async def _send(client, url: str, payload: Dict[str, Any], stats: LoadStats):
+    stats.sent += 1
+    started = time.perf_counter()
+    try:
+        response = await client.post(url, json=payload)
+        status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    stats.record(status, time.perf_counter() - started)
+
+
+def _payload(rng: random.Random, emoji_mode: bool) -> Dict[str, Any]:
+    return {"input": rng.choice(PROMPTS), "emoji_mode": emoji_mode}
+
+
+async def closed_loop(client, args, stats: LoadStats, rng: random.Random):
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            if args.requests and stats.sent >= args.requests:
+                return
+            await _send(client, args.url, _payload(rng, args.emoji_mode), stats)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client, args, stats: LoadStats, rng: random.Random):
+    deadline = time.perf_counter() + args.duration
+    in_flight = set()
+    next_at = time.perf_counter()
+
+    while time.perf_counter() < deadline:
+        if args.requests and stats.sent + stats.dropped >= args.requests:
+            break
+        next_at += rng.expovariate(args.rps)
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+        if len(in_flight) >= args.max_outstanding:
+            stats.dropped += 1  # client-side cap, so a stalled server can't exhaust us
+            continue
+        task = asyncio.create_task(_send(client, args.url, _payload(rng, args.emoji_mode), stats))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+async def run(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=args.max_outstanding, max_keepalive_connections=args.max_outstanding)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        if args.rps:
+            await open_loop(client, args, stats, rng)
+            mode = f"open-loop {args.rps} rps"
+        else:
+            await closed_loop(client, args, stats, rng)
+            mode = f"closed-loop c={args.concurrency}"
+        wall = time.perf_counter() - started
+
+    return stats.report(wall, mode)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Load generator for the FastAPI server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/run-graph")
+    parser.add_argument("--rps", type=float, help="open loop: target arrival rate")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed loop: workers")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--max-outstanding", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--emoji-mode", action="store_true")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# benchmarks/openai_stub.py
+
+"""
+Local OpenAI-compatible stub for end-to-end and load testing.
+
+Speaks the subset of the HTTP API that OpenAIAdapter uses:
+
+- POST /v1/responses    plain, json_schema (`text.format`) and `stream: true`
+- POST /v1/moderations  string or list input
+
+with configurable latency, error rate and 429 injection. Point the app at
+it through the SDK's base URL:
+
+    python -m benchmarks.openai_stub --port 8081 --latency lognormal:400:200 \\
+        --error-rate 0.01 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8081/v1 OPENAI_API_KEY=sk-stub \\
+        uvicorn app.api.server:app
+
+Injected 429s carry a Retry-After header, which the adapters' CallPolicy
+honours when it retries (see app/adapters/resilience.py).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from benchmarks.fake_adapter import Latency
+
+DEFAULT_TEXT = "The Cold War was a period of geopolitical tension. 🌍🕊️"
+
+MODERATION_CATEGORIES = (
+    "harassment", "harassment/threatening", "hate", "hate/threatening",
+    "self-harm", "sexual", "sexual/minors", "violence", "violence/graphic",
+)
+
+
+class StubConfig(BaseModel):
+    latency: Latency = Latency(mean_ms=400, spread_ms=200)
+    moderation_latency: Latency = Latency(mean_ms=80, spread_ms=30)
+    error_rate: float = 0.0        # share of requests answered with a 500
+    rate_limit_rate: float = 0.0   # share of requests answered with a 429
+    retry_after_seconds: float = 1.0
+    text: str = DEFAULT_TEXT
+    seed: Optional[int] = None
+
+
+def _tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def _prompt_text(value: Any) -> str:
+    # `input` is a string, or a list of message/content items
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def create_app(config: Optional[StubConfig] = None) -> FastAPI:
+    config = config or StubConfig()
+    rng = random.Random(config.seed)
+    ids = itertools.count(1)
+    counts: Dict[str, int] = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    app = FastAPI(title="OpenAI stub")
+
+    def fault() -> Optional[JSONResponse]:
+        counts["requests"] += 1
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            counts["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"Retry-After": str(config.retry_after_seconds)},
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            counts["errors"] += 1
+            return JSONResponse(
+                {"error": {"message": "Injected server error (stub)", "type": "server_error"}},
+                status_code=500,
+            )
+        return None
+
+    def response_body(model: str, prompt: str, text: str) -> Dict[str, Any]:
+        n = next(ids)
+        usage = {
+            "input_tokens": _tokens(prompt),
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": _tokens(text),
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": _tokens(prompt) + _tokens(text),
+        }
+        return {
+            "id": f"resp_stub_{n}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": model,
+            "output": [{
+                "type": "message",
+                "id": f"msg_stub_{n}",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": usage,
+        }
+
+    def answer(body: Dict[str, Any]) -> str:
+        fmt = (body.get("text") or {}).get("format") or {}
+        if fmt.get("type") == "json_schema":
+            properties = fmt.get("schema", {}).get("properties", {})
+            return json.dumps({key: round(rng.random() * 0.2, 3) for key in properties})
+        return config.text
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        delay = config.latency.sample(rng)
+
+        failure = fault()
+        if failure is not None:
+            await asyncio.sleep(delay / 10)
+            return failure
+
+        model = body.get("model", "gpt-4o-mini")
+        prompt = _prompt_text(body.get("input", ""))
+        text = answer(body)
+        completed = response_body(model, prompt, text)
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return completed
+
+        async def events():
+            words = text.split(" ")
+            seq = itertools.count()
+            item_id = completed["output"][0]["id"]
+            for i, word in enumerate(words):
+                await asyncio.sleep(delay / len(words))
+                event = {
+                    "type": "response.output_text.delta",
+                    "item_id": item_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": word if i == 0 else " " + word,
+                    "sequence_number": next(seq),
+                }
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            done = {"type": "response.completed", "response": completed, "sequence_number": next(seq)}
+            yield f"event: {done['type']}\ndata: {json.dumps(done)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/moderations")
+    async def moderations(request: Request):
+        body = await request.json()
+        inputs: List[str] = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(config.moderation_latency.sample(rng))
+
+        failure = fault()
+        if failure is not None:
+            return failure
+
+        results = []
+        for _ in inputs:
+            scores = {c: round(rng.random() * 1e-4, 8) for c in MODERATION_CATEGORIES}
+            results.append({
+                "flagged": False,
+                "categories": {c: False for c in MODERATION_CATEGORIES},
+                "category_scores": scores,
+                "category_applied_input_types": {c: ["text"] for c in MODERATION_CATEGORIES},
+            })
+        return {"id": f"modr-stub-{next(ids)}", "model": body.get("model"), "results": results}
+
+    @app.get("/stub/stats")
+    def stats():
+        return counts
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", default="lognormal:400:200",
+                        help="kind:mean_ms[:spread_ms] for /v1/responses")
+    parser.add_argument("--moderation-latency", default="lognormal:80:30")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    config = StubConfig(
+        latency=Latency.parse(args.latency),
+        moderation_latency=Latency.parse(args.moderation_latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_seconds=args.retry_after,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()